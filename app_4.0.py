@@ -1,40 +1,313 @@
 
 #Bibliotecas nativas
+import time
+INICIO_SCRIPT = time.perf_counter()  # referência do --startup-profile
+
+import argparse
+import atexit
+import contextlib
 import csv
+import json
 import os
-import time
+import queue
+import socket
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import NamedTuple
+
+# Módulo do projeto, compartilhado com a GUI
+import autosiget_comum as comum
+from autosiget_comum import PAUSAS_PADRAO, CatalogoPDF, Diario, Rastro, SnapshotBlocos
 
 # Bibliotecas
-# pip install pyautogui, keyboard, tabulate
-import pyautogui
-import keyboard
-from tabulate import tabulate
+# pip install pyautogui, keyboard, tabulate, numpy
+# Importadas sob demanda: pyautogui no 1º envio de tecla (DriverPyAutoGUI), keyboard ao instalar
+# o hook (Escutador.iniciar), tabulate na 1ª tabela e numpy na validação do CSV (ValidadorCsv),
+# para o 1º prompt aparecer sem esperar por elas.
+# Opcional: pyperclip (--colar; sem ele o texto é digitado)
 
 # -------------------------
 # Configurações / Globals
 # -------------------------
 parar_execucao = False
-LOG_DIR = "AutoSiget3000/LOGs"
-os.makedirs(LOG_DIR, exist_ok=True)
-nome_arquivo_log = os.path.join(LOG_DIR, f"log_{datetime.now().strftime('%Y%m%d_%H.%M')}.txt")
+MODO_RAJADA = True       # digita cada faixa em uma única sequência de teclas (--campo-a-campo desliga)
+LIMPAR_CONSOLE = True    # limpa o console entre telas (desligado em benchmark/execução sem tela)
+PDF_ESTAVEL = 0.5        # o PDF é dado como salvo quando o tamanho fica parado por este tempo (s)
+AVANCO_AUTOMATICO = False  # digita as faixas de um bloco em sequência, parando só no fim do bloco (F9/F12 valem)
+PAUSA_ENTRE_FAIXAS = 0.5   # avanço automático: acomodação (s) do SIGET entre uma faixa e a próxima
+PARAR_A_CADA = 0           # avanço automático: também para a cada N faixas (0 = só no fim do bloco)
+CONTAGEM_BLOCO = 3       # pausa (s) antes da 1ª faixa de cada bloco para posicionar o cursor (--countdown)
+PAUSA_SALVAR_PIPELINE = 1.0  # modo pipeline: tempo (s) para a janela Salvar fechar antes de seguir
+FAILSAFE = True          # pyautogui: mouse no canto superior esquerdo aborta a digitação (--sem-failsafe desliga)
+MODO_COLAR = False       # cola (Ctrl+V) o n.º da OSO e o nome do PDF em vez de digitar (--colar)
+# As demais pausas (entre teclas, após cada ação, acomodação de campos e diálogos) e a espera máxima
+# pelo PDF vêm do PerfilTempo
+
+# Colunas do CSV: campo da Faixa -> nomes aceitos no cabeçalho (o 1º é o nome oficial)
+COLUNAS_CSV = {
+    "faixaInicio": ("FaixaInicio",),
+    "faixaFinal": ("FaixaFinal",),
+    "intervalo": ("Intervalo", "Interv"),
+    "percurso": ("Percurso", "Perc.", "Perc"),
+    "tempTerm": ("TempTerm", "T. Term"),
+    "frota": ("Frota",),
+    "linha": ("Linha",),
+    "dia": ("Dia",),
+    "sentido": ("Sentido",),
+    "oso": ("Oso",),
+    "linhaOso": ("LinhaOso",),
+}
+LOG_DIR = "AutoSiget3000/LOGs"  # criada pelo EscritorLog na 1ª gravação
+# segundos + pid: duas execuções iniciadas no mesmo minuto não dividem o arquivo
+nome_arquivo_log = os.path.join(LOG_DIR, f"log_{datetime.now().strftime('%Y%m%d_%H.%M.%S')}_{os.getpid()}.txt")
+
+# -------------------------
+# Importações sob demanda / perfil de inicialização
+# -------------------------
+def tabulate(*args, **kwargs):
+    """Importa o tabulate no 1º uso e se substitui pela função real."""
+    global tabulate
+    from tabulate import tabulate as _tabulate
+    tabulate = _tabulate
+    return _tabulate(*args, **kwargs)
+
+class PerfilInicio:
+    """Marcas de tempo desde o carregamento do script até o 1º prompt (--startup-profile)."""
+    ativo = False
+    marcas = []
+
+    @staticmethod
+    def marcar(etapa):
+        if PerfilInicio.ativo:
+            PerfilInicio.marcas.append((etapa, time.perf_counter() - INICIO_SCRIPT))
+
+    @staticmethod
+    def relatorio(etapa_final):
+        """Marca a etapa final, imprime o relatório (uma vez) e desliga o perfil."""
+        if not PerfilInicio.ativo:
+            return
+        PerfilInicio.marcar(etapa_final)
+        PerfilInicio.ativo = False
+        print("")
+        print(" |> Tempo de inicialização (desde o carregamento do script):")
+        anterior = 0.0
+        for etapa, t in PerfilInicio.marcas:
+            print(f" |>   {etapa:<28} {t * 1000:8.1f} ms  (+{(t - anterior) * 1000:.1f} ms)")
+            anterior = t
+        carregados = [m for m in ("pyautogui", "keyboard", "tabulate") if m in sys.modules]
+        print(f" |>   Bibliotecas já carregadas: {', '.join(carregados) or 'nenhuma'}")
+        print("")
+
+# -------------------------
+# Cancelamento (F12)
+# -------------------------
+class ExecucaoCancelada(Exception):
+    """Levantada por qualquer digitação ou pausa do driver de entrada depois que F12 é pressionado."""
+
+# Sinal compartilhado: marcado pelo hook do teclado no instante do F12
+cancelamento = threading.Event()
 
 # -------------------------
-# Escutador (marca parar_execucao)
+# Escutador de teclas (hook único, orientado a eventos)
+# -------------------------
+class Escutador:
+    """
+    Hook único do teclado que entrega F9/F10/F12 por uma fila bloqueante.
+    Cada tecla gera um único evento por pressionamento (borda de descida): a repetição
+    automática de uma tecla segurada é ignorada até ela ser solta.
+    """
+    TECLAS = ("F9", "F10", "F12")
+
+    def __init__(self):
+        self.fila = queue.Queue()
+        self.pressionadas = set()
+        self.trava = threading.Lock()
+        self.ativo = False
+        self.teclado = None  # módulo keyboard, importado ao instalar o hook
+        # Resposta automática (ex.: "F10") para execução sem operador; None = usa o teclado
+        self.automatico = None
+
+    def iniciar(self, forcar=False):
+        """
+        Instala o hook (uma vez por sessão). Com 'automatico' o hook só é instalado com forcar=True
+        (modo sem prompts: F10 automático, mas F12 continua parando a execução).
+        """
+        if self.automatico and not forcar:
+            return
+        with self.trava:
+            if not self.ativo:
+                import keyboard
+                self.teclado = keyboard
+                keyboard.hook(self._evento)
+                self.ativo = True
+
+    def _evento(self, ev):
+        # Executado na thread do hook do teclado
+        nome = (ev.name or "").upper()
+        if nome not in self.TECLAS:
+            return
+        if ev.event_type == self.teclado.KEY_DOWN:
+            if nome in self.pressionadas:
+                return
+            self.pressionadas.add(nome)
+            if nome == "F12":
+                # interrompe na hora qualquer digitação/pausa em andamento
+                cancelamento.set()
+            self.fila.put(nome)
+        else:
+            self.pressionadas.discard(nome)
+
+    def reiniciar(self):
+        """Descarta teclas pendentes e limpa o cancelamento (início de cada execução)."""
+        while True:
+            try:
+                self.fila.get_nowait()
+            except queue.Empty:
+                break
+        cancelamento.clear()
+
+    def verificar(self):
+        """
+        Consome (sem bloquear) as teclas pressionadas desde a última consulta.
+        Retorna 'F12' se ela estiver entre elas, senão a última tecla ou None.
+        """
+        self.iniciar()
+        ultima = None
+        while True:
+            try:
+                tecla = self.fila.get_nowait()
+            except queue.Empty:
+                return ultima
+            if tecla == "F12":
+                return tecla
+            ultima = tecla
+
+    def aguardar(self, teclas=TECLAS, timeout=None):
+        """
+        Bloqueia até uma das 'teclas' ser pressionada e a retorna (None se expirar 'timeout').
+        Pressionamentos anteriores à chamada são descartados, exceto um F12 pendente.
+        """
+        if self.automatico:
+            if self.ativo and "F12" in teclas and self.verificar() == "F12":
+                return "F12"
+            return self.automatico if self.automatico in teclas else teclas[0]
+        pendente = self.verificar()
+        if pendente == "F12" and "F12" in teclas:
+            return pendente
+        inicio = time.perf_counter()
+        try:
+            while True:
+                try:
+                    tecla = self.fila.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+                if tecla in teclas:
+                    return tecla
+        finally:
+            fim = time.perf_counter()
+            orcamento.somar("operador", fim - inicio)
+            if rastro.ativo:
+                rastro.marcar("aguardar " + "/".join(teclas), "operador", inicio, fim)
+
+escutador = Escutador()
+
+# -------------------------
+# Interruptor (marca parar_execucao)
 # -------------------------
 def interruptorGlobal():
-    """Checa F12 (encerra). Deve ser chamado periodicamente dentro dos loops."""
+    """
+    Checa F12 (encerra). Deve ser chamado periodicamente dentro dos loops.
+    Apenas marca parar_execucao: quem chamou retorna e o controle volta à máquina de estados de main().
+    """
     global parar_execucao
-    if keyboard.is_pressed("F12"):
+    if escutador.verificar() == "F12":
         parar_execucao = True
         Log.user("Tecla F12 detectada — encerrando execução.")
-        Log.user("Retornando ao menu.")
-        print("")
+        Log.flush()
         print("")
-        print("")
-        time.sleep(5)
-        parar_execucao = False
-        main()
+
+# -------------------------
+# Escritor de log em segundo plano
+# -------------------------
+class EscritorLog:
+    """
+    Grava as linhas de log em uma thread própria, alimentada por uma fila.
+    As linhas são agrupadas e gravadas ao atingir 'limite_linhas' ou após 'intervalo_flush' segundos.
+    O arquivo fica aberto durante toda a sessão.
+    """
+
+    def __init__(self, caminho: str, limite_linhas: int = 50, intervalo_flush: float = 0.5):
+        self.caminho = caminho
+        self.limite_linhas = limite_linhas
+        self.intervalo_flush = intervalo_flush
+        self.fila = queue.Queue()
+        self.thread = None
+        self.trava = threading.Lock()
+
+    def escrever(self, linha: str):
+        """Enfileira uma linha (não bloqueia)."""
+        if self.thread is None:
+            self._iniciar()
+        self.fila.put(linha)
+
+    def flush(self, timeout: float = 2.0):
+        """Bloqueia até que as linhas já enfileiradas estejam gravadas no disco."""
+        if self.thread is None:
+            return
+        feito = threading.Event()
+        self.fila.put(feito)
+        feito.wait(timeout)
+
+    def fechar(self, timeout: float = 2.0):
+        """Grava o que falta e encerra a thread (chamado na saída do programa)."""
+        with self.trava:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.fila.put(None)
+        thread.join(timeout)
+
+    def _iniciar(self):
+        with self.trava:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._executar, name="EscritorLog", daemon=True)
+                self.thread.start()
+
+    def _executar(self):
+        lote = []
+        limite_tempo = None
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            while True:
+                espera = None if not lote else max(0.0, limite_tempo - time.monotonic())
+                try:
+                    item = self.fila.get(timeout=espera)
+                except queue.Empty:
+                    # limite de tempo atingido
+                    item = False
+
+                if isinstance(item, str):
+                    if not lote:
+                        limite_tempo = time.monotonic() + self.intervalo_flush
+                    lote.append(item)
+                    if len(lote) < self.limite_linhas:
+                        continue
+
+                if lote:
+                    f.write("\n".join(lote) + "\n")
+                    f.flush()
+                    lote = []
+
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    return
+
+escritorLog = EscritorLog(nome_arquivo_log)
+atexit.register(escritorLog.fechar)
 
 # -------------------------
 # Utilitários de Log
@@ -43,25 +316,39 @@ class Log:
 
     @staticmethod
     def save(mensagem: str):
-        """Registra eventos detalhados no arquivo de log (arquivo)."""
+        """Registra eventos detalhados no arquivo de log (gravação em segundo plano)."""
+        inicio = entrada.agora() if rastro.ativo else None
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         linha = f"[{timestamp}] {mensagem}"
-        # grava imediatamente
-        with open(nome_arquivo_log, "a", encoding="utf-8") as f:
-            f.write(linha + "\n")
+        escritorLog.escrever(linha)
+        if inicio is not None:
+            rastro.marcar("log", "log", inicio, entrada.agora())
+
+    @staticmethod
+    def flush():
+        """Força a gravação das linhas pendentes (F12 / saída)."""
+        escritorLog.flush()
 
     @staticmethod
     def user(msg: str):
         """Reporte sucinto para o usuário (console). Também registra um resumo no log."""
+        inicio = entrada.agora() if rastro.ativo else None
         print(msg)
         # Log mais sucinto: registra que foi mostrado algo ao usuário
         Log.save(f"[UI] {msg}")
+        if inicio is not None:
+            rastro.marcar("console", "log", inicio, entrada.agora())
 
 # -------------------------
 # Funções utilitárias de horário
 # -------------------------
 class Util:
 
+    @staticmethod
+    def limparConsole():
+        if LIMPAR_CONSOLE:
+            os.system('cls' if os.name == 'nt' else 'clear')
+
     @staticmethod
     def formatHora_log(hora: str):
         # Formato para logs/prints: 'HHMM' ≥ 'HH:MM'
@@ -80,10 +367,773 @@ class Util:
             return f"0{h}"
         return h
 
+    @staticmethod
+    def minutos(hora: str):
+        # 'HHMM' (ou 'HMM') ≥ minutos desde 00:00; -1 se não for um horário válido
+        if hora.isdigit() and 3 <= len(hora) <= 4:
+            h, m = int(hora[:-2]), int(hora[-2:])
+            if h < 24 and m < 60:
+                return h * 60 + m
+        return -1
+
+# -------------------------
+# Registro de uma faixa do CSV
+# -------------------------
+class Faixa(NamedTuple):
+    """
+    Linha do CSV normalizada uma única vez no carregamento (LCsv.load).
+    Horários prontos para digitação (_dig), exibição (_log) e em minutos desde 00:00 (_min, -1 se inválido).
+    """
+    n_linha: int        # número da linha no arquivo (cabeçalho = 1)
+    id_bloco: str       # Linha_Dia_Sentido
+    faixaIni_dig: str
+    faixaFim_dig: str
+    faixaIni_log: str
+    faixaFim_log: str
+    ini_min: int
+    fim_min: int
+    intervalo: str
+    percurso: str
+    tempTerm: str
+    frota: str
+    linha: str
+    dia: str
+    sentido: str
+    oso: str
+    linhaOso: str
+
+# -------------------------
+# Orçamento de latência (pausas intencionais x trabalho real)
+# -------------------------
+class OrcamentoLatencia:
+    """
+    Para onde foi o tempo de uma execução. Os drivers somam cada pausa pedida, por tipo, e o
+    Escutador soma a espera pelo operador; o trabalho real é o que sobra do tempo de relógio.
+    Com um driver que não dorme (gravação) as pausas são só simuladas e não saem do relógio.
+    As esperas de threads em segundo plano (VerificadorPDF, marcada com emParalelo) correm junto
+    com a digitação: são somadas à parte e mostradas fora do total.
+    """
+    TIPOS = {
+        "acao": "Pausa após cada ação (PAUSE)",
+        "tecla": "Intervalo entre teclas",
+        "pausa": "Pausas de acomodação",
+        "arquivo": "Espera pelo PDF",
+        "operador": "Espera pelo operador (F10)",
+    }
+
+    def __init__(self):
+        self.trava = threading.Lock()     # somado pela thread da digitação e pela do VerificadorPDF
+        self.local = threading.local()    # .paralelo: a thread atual roda em segundo plano
+        self.iniciar()
+
+    def iniciar(self):
+        """Zera os contadores (início de cada execução)."""
+        with self.trava:
+            self.inicio = time.perf_counter()
+            self.segundos = dict.fromkeys(self.TIPOS, 0.0)
+            self.paralelo = dict.fromkeys(self.TIPOS, 0.0)  # fora do relógio da execução
+
+    def emParalelo(self):
+        """Marca a thread atual: o que ela somar corre em paralelo à digitação (fica fora do total)."""
+        self.local.paralelo = True
+
+    def somar(self, tipo, segundos):
+        with self.trava:
+            (self.paralelo if getattr(self.local, "paralelo", False) else self.segundos)[tipo] += segundos
+
+    def totais(self, dorme=True):
+        """[(tipo, segundos)] de cada pausa, mais o trabalho real e o total."""
+        with self.trava:
+            relogio = time.perf_counter() - self.inicio
+            segundos = dict(self.segundos)
+        pausas = sum(s for tipo, s in segundos.items() if tipo != "operador")
+        trabalho = max(0.0, relogio - segundos["operador"] - (pausas if dorme else 0.0))
+        totais = list(segundos.items()) + [("trabalho", trabalho)]
+        return totais + [("total", sum(s for _, s in totais))]
+
+    def relatorio(self):
+        """Imprime a divisão do tempo da execução e a registra no log."""
+        totais = self.totais(entrada.dorme)
+        total = totais[-1][1] or 1.0
+        rotulos = dict(self.TIPOS, trabalho="Trabalho real (teclas, log, disco)", total="Total")
+        tabela = [[rotulos[tipo], round(s, 2), f"{s / total:.0%}"] for tipo, s in totais]
+        print("")
+        print(f" |> Orçamento de latência (driver {entrada.nome}{'' if entrada.dorme else ', pausas simuladas'}):")
+        print(tabulate(tabela, headers=["Tempo", "Segundos", "%"], tablefmt="rounded_grid"))
+        with self.trava:
+            paralelo = [(tipo, s) for tipo, s in self.paralelo.items() if s]
+        for tipo, s in paralelo:
+            print(f" |> Em segundo plano, fora do total: {self.TIPOS[tipo]} {s:.2f}s")
+        Log.save("ORCAMENTO_LATENCIA " + " ".join(f"{tipo}={s:.2f}s" for tipo, s in totais)
+                 + "".join(f" paralelo_{tipo}={s:.2f}s" for tipo, s in paralelo))
+
+orcamento = OrcamentoLatencia()
+
+# -------------------------
+# Rastro da execução (Chrome Trace Event)
+# -------------------------
+rastro = Rastro(lambda: entrada, Log)  # autosiget_comum.Rastro, no relógio do driver atual
+
+# -------------------------
+# Drivers de entrada (teclado)
+# -------------------------
+class DriverEntrada(ABC):
+    """
+    Interface dos drivers de entrada: toda digitação e toda pausa da automação passam por aqui.
+    Mesma assinatura das funções do pyautogui usadas no programa.
+    Todos os drivers respeitam o 'cancelamento': antes de cada tecla e durante cada pausa
+    verificam o sinal e levantam ExecucaoCancelada.
+    Cada write/press/hotkey termina com a pausa "acao" do PerfilTempo (o PAUSE do pyautogui,
+    feito pelo driver) e toda pausa entra no orçamento de latência com o seu tipo.
+    """
+    nome = "base"
+    dorme = False   # as pausas gastam tempo de relógio de verdade
+    digita = False  # as teclas chegam de fato ao SIGET (só então o diário registra progresso)
+
+    def checar(self):
+        if cancelamento.is_set():
+            raise ExecucaoCancelada()
+
+    @staticmethod
+    def pausaAcao():
+        return PerfilTempo.pausas()["acao"]
+
+    def agora(self):
+        """Relógio do driver (s): o do sistema, ou o simulado no driver de gravação."""
+        return time.perf_counter()
+
+    @abstractmethod
+    def write(self, teclas, interval=0.0):
+        ...
+
+    @abstractmethod
+    def press(self, tecla, presses=1, interval=0.0):
+        ...
+
+    @abstractmethod
+    def hotkey(self, *teclas):
+        ...
+
+    @abstractmethod
+    def colar(self, texto):
+        """Cola 'texto' com Ctrl+V pela área de transferência; False se ela não estiver acessível."""
+
+    @abstractmethod
+    def sleep(self, segundos, tipo="pausa"):
+        ...
+
+    estadoArquivo = staticmethod(comum.estadoArquivo)  # (tamanho, mtime_ns) ou None
+
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        """
+        Espera 'caminho' ser gravado: retorna True assim que o arquivo existe, é diferente de
+        'anterior' (estadoArquivo de antes de salvar) e o tamanho fica parado por 'estavel' segundos.
+        Retorna False ao atingir o timeout. As pausas usam self.sleep (F12 interrompe).
+        """
+        limite = time.monotonic() + timeout
+        ultimo = None
+        desde = time.monotonic()
+        while True:
+            atual = self.estadoArquivo(caminho)
+            agora = time.monotonic()
+            if atual != ultimo:
+                ultimo, desde = atual, agora
+            elif atual is not None and atual != anterior and atual[0] > 0 and agora - desde >= estavel:
+                return True
+            if agora >= limite:
+                return False
+            self.sleep(intervalo, "arquivo")
+
+class DriverPyAutoGUI(DriverEntrada):
+    """
+    Driver real: envia as teclas ao sistema via pyautogui (importado só no primeiro uso).
+    As teclas são enviadas uma a uma para que o F12 interrompa entre duas teclas quaisquer.
+    O PAUSE do pyautogui fica em 0: a pausa após cada ação é dormida aqui, cancelável e contada.
+    """
+    nome = "pyautogui"
+    dorme = True
+    digita = True
+
+    def __init__(self):
+        self._pyautogui = None
+        self._pyperclip = None  # False = indisponível nesta sessão (não tenta de novo)
+
+    @property
+    def pyautogui(self):
+        if self._pyautogui is None:
+            import pyautogui
+            pyautogui.PAUSE = 0.0
+            pyautogui.FAILSAFE = FAILSAFE
+            self._pyautogui = pyautogui
+        return self._pyautogui
+
+    def _enviar(self, funcao, *teclas):
+        """Chama o pyautogui; o failsafe (mouse num canto da tela) encerra a execução como o F12."""
+        self.checar()
+        try:
+            funcao(*teclas, _pause=False)
+        except self.pyautogui.FailSafeException:
+            cancelamento.set()
+            Log.user(" >>> Failsafe do pyautogui (mouse num canto da tela): digitação interrompida.")
+            raise ExecucaoCancelada()
+
+    def write(self, teclas, interval=0.0):
+        press = self.pyautogui.press
+        for t in teclas:
+            self._enviar(press, t)
+            self.sleep(interval, "tecla")
+        self.sleep(self.pausaAcao(), "acao")
+
+    def press(self, tecla, presses=1, interval=0.0):
+        press = self.pyautogui.press
+        for _ in range(presses):
+            self._enviar(press, tecla)
+            self.sleep(interval, "tecla")
+        self.sleep(self.pausaAcao(), "acao")
+
+    def hotkey(self, *teclas):
+        self._enviar(self.pyautogui.hotkey, *teclas)
+        self.sleep(self.pausaAcao(), "acao")
+
+    def colar(self, texto):
+        self.checar()
+        if self._pyperclip is None:
+            try:
+                import pyperclip
+                self._pyperclip = pyperclip
+            except ImportError:
+                self._pyperclip = False
+        if not self._pyperclip:
+            return False
+        try:
+            self._pyperclip.copy(texto)
+            if self._pyperclip.paste() != texto:
+                return False
+        except self._pyperclip.PyperclipException:
+            return False
+        self.hotkey("ctrl", "v")
+        return True
+
+    def sleep(self, segundos, tipo="pausa"):
+        orcamento.somar(tipo, segundos)
+        inicio = time.perf_counter()
+        try:
+            # Event.wait retorna assim que o F12 marca o cancelamento
+            if cancelamento.wait(segundos):
+                raise ExecucaoCancelada()
+        finally:
+            # só as pausas explícitas; as entre teclas e após cada ação ficam dentro da digitação
+            if tipo == "pausa" and rastro.ativo:
+                rastro.marcar("sleep", "pausa", inicio, time.perf_counter(), {"s": segundos})
+
+class DriverGravacao(DriverEntrada):
+    """
+    Driver de gravação: não envia nada ao sistema e não dorme.
+    Registra o fluxo exato de teclas em 'eventos' como (t, tipo, valor), onde t é o instante
+    (s) em que a ação ocorreria numa execução real: tempo decorrido + pausas simuladas.
+    Com guardar=False mantém apenas os contadores (total_teclas, tempo_simulado).
+    """
+    nome = "gravacao"
+
+    def __init__(self, guardar=True):
+        self.guardar = guardar
+        self.eventos = []
+        self.total_teclas = 0
+        self.t0 = time.perf_counter()
+        self.tempo_simulado = 0.0
+
+    def _agora(self):
+        return time.perf_counter() - self.t0 + self.tempo_simulado
+
+    def agora(self):
+        return self._agora()
+
+    def _tecla(self, tecla, interval):
+        self.checar()
+        self.total_teclas += 1
+        if self.guardar:
+            self.eventos.append((self._agora(), "tecla", tecla))
+        self.tempo_simulado += interval
+
+    def write(self, teclas, interval=0.0):
+        for t in teclas:
+            self._tecla(t, interval)
+        orcamento.somar("tecla", len(teclas) * interval)
+        self.sleep(self.pausaAcao(), "acao")
+
+    def press(self, tecla, presses=1, interval=0.0):
+        for _ in range(presses):
+            self._tecla(tecla, interval)
+        orcamento.somar("tecla", presses * interval)
+        self.sleep(self.pausaAcao(), "acao")
+
+    def hotkey(self, *teclas):
+        self.checar()
+        self.total_teclas += 1
+        if self.guardar:
+            self.eventos.append((self._agora(), "atalho", "+".join(teclas)))
+        self.sleep(self.pausaAcao(), "acao")
+
+    def colar(self, texto):
+        self.checar()
+        if self.guardar:
+            self.eventos.append((self._agora(), "colar", texto))
+        self.hotkey("ctrl", "v")
+        return True
+
+    def sleep(self, segundos, tipo="pausa"):
+        self.checar()
+        orcamento.somar(tipo, segundos)
+        if self.guardar:
+            self.eventos.append((self._agora(), "pausa", segundos))
+        if tipo == "pausa" and rastro.ativo:
+            inicio = self._agora()
+            rastro.marcar("sleep", "pausa", inicio, inicio + segundos, {"s": segundos})
+        self.tempo_simulado += segundos
+
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        # Não espera: registra a espera e responde com o que já está no disco
+        self.checar()
+        if self.guardar:
+            self.eventos.append((self._agora(), "arquivo", caminho))
+        atual = self.estadoArquivo(caminho)
+        return atual is not None and atual != anterior
+
+    def teclas(self):
+        """Sequência de teclas/atalhos gravada (sem as pausas e esperas por arquivo)."""
+        return [valor for _, tipo, valor in self.eventos if tipo in ("tecla", "atalho")]
+
+class DriverNulo(DriverEntrada):
+    """Driver nulo: descarta toda entrada e não dorme (execução sem tela)."""
+    nome = "nulo"
+
+    def write(self, teclas, interval=0.0):
+        self.checar()
+
+    def press(self, tecla, presses=1, interval=0.0):
+        self.checar()
+
+    def hotkey(self, *teclas):
+        self.checar()
+
+    def colar(self, texto):
+        self.checar()
+        return True
+
+    def sleep(self, segundos, tipo="pausa"):
+        self.checar()
+
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        self.checar()
+        atual = self.estadoArquivo(caminho)
+        return atual is not None and atual != anterior
+
+DRIVERS_ENTRADA = {d.nome: d for d in (DriverPyAutoGUI, DriverGravacao, DriverNulo)}
+entrada = DriverPyAutoGUI()
+
+def definirEntrada(driver):
+    """Troca o driver de entrada global. Aceita o nome ('pyautogui', 'gravacao', 'nulo') ou uma instância."""
+    global entrada
+    if isinstance(driver, str):
+        driver = DRIVERS_ENTRADA[driver]()
+    entrada = driver
+    return entrada
+
+# -------------------------
+# Digitação em rajada
+# -------------------------
+class Digitacao:
+
+    @staticmethod
+    def compilarFaixa(faixaIni_dig, faixaFim_dig, Interv, tPerc, tTerm, frota, viradaIni=False, viradaFim=False):
+        """
+        Compila os campos de uma faixa em uma única sequência de teclas.
+        Campos separados por 'tab'; na virada de dia insere 'tab' + 'enter' entre pausas (float, em segundos,
+        do PerfilTempo).
+        """
+        p = PerfilTempo.pausas()
+        confirmar = [p["virada_antes"], "tab", "enter", p["virada_depois"]]
+        teclas = list(faixaIni_dig) + ["tab"]
+        if viradaIni:
+            teclas += confirmar
+        teclas += list(faixaFim_dig) + ["tab"]
+        if viradaFim:
+            teclas += confirmar
+        for valor in (Interv, tPerc, tTerm, frota):
+            teclas += list(valor) + ["tab"]
+        return teclas
+
+# -------------------------
+# Perfil de tempo por estação (calibração)
+# -------------------------
+class PerfilTempo:
+    """
+    Pausas da digitação medidas na própria estação e gravadas em AutoSiget3000/Perfis/<host>.json.
+    Sem perfil valem os padrões de PAUSAS_PADRAO (os tempos fixos de antes). 'python app_4.0.py --calibrar'
+    mede, num formulário local (tkinter), quanto o Windows leva para aceitar tecla, troca de campo
+    e confirmação de diálogo, e grava as pausas com folga sobre o p95 medido.
+    """
+    PASTA = os.path.join("AutoSiget3000", "Perfis")
+    PADRAO = PAUSAS_PADRAO  # definidos em autosiget_comum (os mesmos da GUI)
+    FOLGA = 3.0  # pausa = FOLGA x p95 medido, limitada a [mínimo, 5 x padrão]
+    # mínimos maiores nos diálogos: o formulário local é mais leve que os diálogos do SIGET
+    MINIMOS = {"acao": 0.01, "tecla": 0.005, "campo": 0.03, "foco": 0.05, "virada_antes": 0.1,
+               "virada_depois": 0.15, "popup": 0.2, "enter_popup": 0.1}
+    _valores = None
+
+    @staticmethod
+    def caminho():
+        return os.path.join(PerfilTempo.PASTA, f"{socket.gethostname()}.json")
+
+    @staticmethod
+    def pausas():
+        """Pausas em vigor (perfil desta estação sobre os padrões), lidas do disco no 1º uso."""
+        if PerfilTempo._valores is None:
+            valores = dict(PerfilTempo.PADRAO)
+            try:
+                with open(PerfilTempo.caminho(), "r", encoding="utf-8") as f:
+                    gravadas = json.load(f).get("pausas", {})
+                valores.update({k: float(v) for k, v in gravadas.items() if k in valores})
+                Log.save(f"PERFIL_TEMPO {PerfilTempo.caminho()}: {valores}")
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
+            PerfilTempo._valores = valores
+        return PerfilTempo._valores
+
+    @staticmethod
+    def _p95(amostras):
+        amostras = sorted(amostras)
+        return amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))] if amostras else None
+
+    @staticmethod
+    def calibrar(amostras=20):
+        """Mede a latência de aceitação num formulário local e grava o perfil desta estação."""
+        import tkinter as tk
+
+        pg = DriverPyAutoGUI().pyautogui
+        chegadas = queue.Queue()
+        medidas = {"tecla": [], "foco": [], "dialogo": []}
+
+        # Formulário local: três campos (tecla e tab) e um diálogo de confirmação (Enter)
+        raiz = tk.Tk()
+        raiz.title("AutoSIGET - calibração (não mexa no teclado)")
+        raiz.attributes("-topmost", True)
+        campos = [tk.Entry(raiz, width=14) for _ in range(3)]
+        for i, campo in enumerate(campos):
+            campo.grid(row=0, column=i, padx=6, pady=12)
+            campo.bind("<KeyPress>", lambda e: chegadas.put(("tecla", time.perf_counter())))
+            campo.bind("<FocusIn>", lambda e: chegadas.put(("foco", time.perf_counter())))
+
+        def abrirDialogo():
+            janela = tk.Toplevel(raiz)
+            tk.Label(janela, text="Confirmar?").pack(padx=20, pady=10)
+            janela.bind("<Return>", lambda e: (chegadas.put(("dialogo", time.perf_counter())), janela.destroy()))
+            janela.bind("<FocusIn>", lambda e: chegadas.put(("aberto", time.perf_counter())))
+            janela.focus_force()
+
+        def esperar(tipo, timeout=2.0):
+            limite = time.perf_counter() + timeout
+            while True:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    return None
+                try:
+                    evento, instante = chegadas.get(timeout=restante)
+                except queue.Empty:
+                    return None
+                if evento == tipo:
+                    return instante
+
+        def medir(tipo, tecla):
+            inicio = time.perf_counter()
+            pg.press(tecla, _pause=False)
+            instante = esperar(tipo)
+            if instante is not None:
+                medidas[tipo].append(instante - inicio)
+
+        def focarCampo():
+            raiz.after(0, campos[0].focus_force)
+            esperar("foco")
+
+        def trabalho():
+            try:
+                esperar("pronto", timeout=5.0)
+                focarCampo()
+                for i in range(amostras):
+                    medir("tecla", str(i % 10))
+                    medir("foco", "tab")
+                for _ in range(max(1, amostras // 2)):
+                    raiz.after(0, abrirDialogo)
+                    esperar("aberto")
+                    medir("dialogo", "enter")
+                    focarCampo()
+            finally:
+                raiz.after(0, raiz.destroy)
+
+        threading.Thread(target=trabalho, daemon=True).start()
+        raiz.after(300, lambda: chegadas.put(("pronto", time.perf_counter())))
+        raiz.mainloop()
+
+        # Pausas = folga sobre o p95 de cada tipo de ação
+        p95 = {tipo: PerfilTempo._p95(valores) for tipo, valores in medidas.items()}
+        fonte = {"acao": "tecla", "tecla": "tecla", "campo": "foco", "foco": "foco", "virada_antes": "dialogo",
+                 "virada_depois": "dialogo", "popup": "dialogo", "enter_popup": "dialogo"}
+        pausas = dict(PerfilTempo.pausas())
+        for chave, tipo in fonte.items():
+            if p95[tipo] is not None:
+                pausas[chave] = round(min(max(p95[tipo] * PerfilTempo.FOLGA, PerfilTempo.MINIMOS[chave]),
+                                          PerfilTempo.PADRAO[chave] * 5), 3)
+
+        os.makedirs(PerfilTempo.PASTA, exist_ok=True)
+        with open(PerfilTempo.caminho(), "w", encoding="utf-8") as f:
+            json.dump({
+                "host": socket.gethostname(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "p95_ms": {tipo: round(v * 1000, 1) if v is not None else None for tipo, v in p95.items()},
+                "amostras": {tipo: len(valores) for tipo, valores in medidas.items()},
+                "pausas": pausas,
+            }, f, indent=2, ensure_ascii=False)
+        PerfilTempo._valores = pausas
+
+        tabela = [[chave, fonte.get(chave, "-"),
+                   round(p95[fonte[chave]] * 1000, 1) if chave in fonte and p95[fonte[chave]] is not None else "-",
+                   PerfilTempo.PADRAO[chave], pausas[chave]] for chave in PerfilTempo.PADRAO]
+        print(tabulate(tabela, headers=["Pausa", "Medida", "p95 (ms)", "Padrão (s)", "Perfil (s)"], tablefmt="rounded_grid"))
+        Log.user(f" |> Perfil gravado em {PerfilTempo.caminho()}")
+        return pausas
+
+# -------------------------
+# Plano de ações (compilador CSV → operações) e executor
+# -------------------------
+class Plano(comum.Plano):
+    """
+    Compila o CSV num plano de ações explícito (formato das operações em autosiget_comum.Plano):
+    para cada faixa e cada OSO (FH e QH), as operações de teclado, pausas, linhas de log e pontos
+    de controle, na ordem exata. Fica em cache por hash do CSV (AutoSiget3000/Planos) e pode ser
+    inspecionado, comparado e cronometrado antes da execução (--plano / --plano-diff).
+    """
+
+    @staticmethod
+    def config():
+        """Configuração que muda as operações compiladas: outra configuração invalida o cache."""
+        pausas = {k: v for k, v in PerfilTempo.pausas().items() if k != "timeout_pdf"}  # não vira operação
+        return {"modo_rajada": MODO_RAJADA, "colar": MODO_COLAR, "pausas": pausas}
+
+    @staticmethod
+    def compilarFaixa(row, linha_label, viradas=(False, False)):
+        """Operações de uma faixa (o mesmo que preenFaixa digitava), com a virada de dia já planejada."""
+        faixaIni_dig, faixaFim_dig = row.faixaIni_dig, row.faixaFim_dig
+        faixaIni_log, faixaFim_log = row.faixaIni_log, row.faixaFim_log
+        Interv, tPerc, tTerm, frota = row.intervalo, row.percurso, row.tempTerm, row.frota
+        viradaIni, viradaFim = viradas
+        p = PerfilTempo.pausas()
+
+        ops = []
+        if viradaIni:
+            ops.append(["l", f"[{linha_label}] virada de dia em FaixaInicio ({faixaIni_log}) — confirmando Enter"])
+        elif viradaFim:
+            ops.append(["l", f"[{linha_label}] virada de dia em FaixaFinal ({faixaFim_log}) — confirmando Enter"])
+
+        if MODO_RAJADA:
+            # Faixa inteira numa sequência: cada trecho contínuo de teclas vai num único write
+            teclas = Digitacao.compilarFaixa(faixaIni_dig, faixaFim_dig, Interv, tPerc, tTerm, frota,
+                                             viradaIni=viradaIni, viradaFim=viradaFim)
+            trecho = []
+            for t in teclas:
+                if isinstance(t, float):
+                    if trecho:
+                        ops.append(["t", trecho, p["tecla"]])
+                        trecho = []
+                    ops.append(["s", t])
+                else:
+                    trecho.append(t)
+            if trecho:
+                ops.append(["t", trecho, p["tecla"]])
+            ops.append(["l", f"[{linha_label}] rajada enviada ({len(teclas)} teclas): "
+                             f"{faixaIni_log} | {faixaFim_log} | {Interv} | {tPerc} | {tTerm} | {frota}"])
+        else:
+            # Campo a campo
+            confirmarVirada = [["s", p["virada_antes"]], ["p", "tab", 1, 0.0], ["p", "enter", 1, 0.0],
+                               ["s", p["virada_depois"]]]
+            ops += [["t", faixaIni_dig, 0.0], ["l", f"[{linha_label}] escreveu FaixaInicio '{faixaIni_log}'"],
+                    ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo FaixaFinal"]]
+            if viradaIni:
+                ops += confirmarVirada + [["l", f"[{linha_label}] faixaIniVerif definida como VERDADEIRA"]]
+            ops += [["t", faixaFim_dig, 0.0], ["l", f"[{linha_label}] escreveu FaixaFinal '{faixaFim_log}'"],
+                    ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo Intervalo"]]
+            if viradaFim:
+                ops += confirmarVirada
+            for valor, nome, proximo in ((Interv, "Intervalo", "Tempo de Percurso"), (tPerc, "Percurso", "Terminal"),
+                                         (tTerm, "TempTerm", "Frota"), (frota, "Frota", "Linha (pronto para verificação)")):
+                ops += [["t", valor, 0.0], ["l", f"[{linha_label}] escreveu {nome} '{valor}'"], ["s", p["campo"]],
+                        ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo {proximo}"], ["s", p["campo"]]]
+
+        ops.append(["l", f"[{linha_label}] faixa preenchida ({faixaIni_log} → {faixaFim_log})"])
+        return Plano._juntarPausas(ops)
+
+    @staticmethod
+    def compilarOSO(row, fQH):
+        """
+        Operações de impressão de uma OSO (o mesmo que imprimirPDF digitava). Pontos de controle:
+        'antes_salvar' logo antes do Enter que salva o PDF e 'salvar' logo depois dele.
+        """
+        oso, oso_dig = row["oso"], row["oso_dig"]
+        NomePDF = PrintPDF.nomePDF(row, fQH)
+        p = PerfilTempo.pausas()
+
+        # Campo Insira o n.º da OSO: colado de uma vez ou dígito por dígito (para evitar erros)
+        ops = []
+        if MODO_COLAR:
+            ops += [["v", oso, p["campo"]], ["s", p["campo"]]]
+        else:
+            for ch in oso:
+                ops += [["t", ch, 0.0], ["s", p["campo"]]]
+        ops += [
+            ["l", f"[{oso_dig}] escreveu OSO '{oso}'"], ["u", f"Preenchendo OSO:     {oso_dig}"], ["s", p["foco"]],
+            ["p", "tab", 1, 0.0], ["l", f"[{oso_dig}] Insira o n.º da OSO ≥ Impressão Gráfica"], ["s", p["foco"]],
+            ["s", p["popup"]], ["p", "enter", 3, p["enter_popup"]],
+            ["l", f"[{oso_dig}] fechou o POP-UP e botou para imprimir"], ["s", p["apos_imprimir"]],
+            # Nome do PDF e confirmação de salvar
+            ["v" if MODO_COLAR else "t", NomePDF, 0.0], ["l", f"[{oso_dig}] escreveu nome do PDF '{NomePDF}'"],
+            ["u", f"Preenchendo NomePDF: {NomePDF}"], ["s", p["apos_nome"]],
+            ["c", "antes_salvar"], ["p", "enter", 1, 0.0], ["l", f"[{oso_dig}] confirmou salvar PDF"], ["c", "salvar"],
+            # Volta ao campo da OSO
+            ["h", ["shift", "tab"]], ["l", f"[{oso_dig}] botão Imprimir ≥ Informe o N° da oso"], ["s", p["foco"]],
+            ["p", "left", 6, p["campo"]], ["l", f"[{oso_dig}] 6x seta para esquerda"], ["s", p["campo"]],
+        ]
+        return Plano._juntarPausas(ops)
+
+    @staticmethod
+    def compilar(linhas, hash_csv=None):
+        """Plano completo do CSV: faixas de cada bloco (genBlocos) e OSOs válidas para FH e QH."""
+        blocos = []
+        for bloco in ProgramaLinha.genBlocos(linhas):
+            trecho = linhas[bloco["inicio"]:bloco["fim"] + 1]
+            blocos.append({
+                "id_bloco": bloco["id_bloco"],
+                "inicio": bloco["inicio"],
+                "faixas": [Plano.compilarFaixa(row, bloco["id_bloco"], viradas)
+                           for row, viradas in zip(trecho, bloco["viradas"])],
+            })
+
+        osos = {"FH": {}, "QH": {}}
+        for i, row in enumerate(linhas):
+            dados = PrintPDF.dadosOSO(row, i + 1)
+            if dados is not None:
+                for fQH in osos:
+                    osos[fQH][dados["oso"]] = Plano.compilarOSO(dados, fQH)
+
+        return {"versao": Plano.VERSAO, "csv": hash_csv, "config": Plano.config(), "blocos": blocos, "osos": osos}
+
+    @staticmethod
+    def caminho(hash_csv):
+        return os.path.join(Plano.PASTA, f"{hash_csv[:16]}.json")
+
+    @staticmethod
+    def doCsv(linhas, hash_csv):
+        """Plano do CSV: lido do cache quando versão e configuração batem; senão compilado e gravado."""
+        return Plano.doCache(Plano.caminho(hash_csv), Plano.config(), lambda: Plano.compilar(linhas, hash_csv), Log)
+
+    @staticmethod
+    def medir(ops):
+        """(teclas enviadas, segundos previstos em pausas, intervalos entre teclas e pausas após cada ação)."""
+        acao = PerfilTempo.pausas()["acao"]
+        teclas = 0
+        segundos = 0.0
+        for op in ops:
+            codigo = op[0]
+            if codigo == "t":
+                teclas += len(op[1])
+                segundos += len(op[1]) * op[2] + acao
+            elif codigo == "p":
+                teclas += op[2]
+                segundos += op[2] * op[3] + acao
+            elif codigo == "h":
+                teclas += len(op[1])
+                segundos += acao
+            elif codigo == "v":
+                teclas += 2  # ctrl+v
+                segundos += acao
+            elif codigo == "s":
+                segundos += op[1]
+        return teclas, segundos
+
+    @staticmethod
+    def resumo(plano):
+        """Tabela por bloco (faixas, operações, teclas, tempo previsto) e total das OSOs."""
+        tabela = []
+        for b in plano["blocos"]:
+            ops = [op for faixa in b["faixas"] for op in faixa]
+            teclas, segundos = Plano.medir(ops)
+            tabela.append([b["id_bloco"], len(b["faixas"]), len(ops), teclas, round(segundos, 1)])
+        for fQH, osos in plano["osos"].items():
+            ops = [op for oso in osos.values() for op in oso]
+            teclas, segundos = Plano.medir(ops)
+            tabela.append([f"OSOs {fQH}", len(osos), len(ops), teclas, round(segundos, 1)])
+        print(tabulate(tabela, headers=["Bloco", "Faixas", "Operações", "Teclas", "Previsto (s)"], tablefmt="rounded_grid"))
+        print("(previsto = pausas + intervalos entre teclas + pausa após cada ação; não inclui esperas por F10 nem pelo PDF)")
+
+class Executor:
+    """Executa operações compiladas pelo Plano num laço curto sobre o driver de entrada atual."""
+    # Trechos do rastro por operação de teclado ("s" é marcada pelo driver; "l"/"u" pelo Log)
+    TRECHOS = {"t": "write", "p": "press", "h": "hotkey", "v": "colar"}
+
+    @staticmethod
+    def executar(ops, pontos=None):
+        """'pontos' associa o nome de cada ponto de controle ("c") à função chamada nele."""
+        if rastro.ativo:
+            Executor._executarRastreado(ops, pontos)
+        else:
+            Executor._laco(ops, pontos)
+
+    @staticmethod
+    def _laco(ops, pontos):
+        write, press, hotkey, sleep, colar = entrada.write, entrada.press, entrada.hotkey, entrada.sleep, entrada.colar
+        salvar, usuario = Log.save, Log.user
+        for op in ops:
+            codigo = op[0]
+            if codigo == "t":
+                write(op[1], interval=op[2])
+            elif codigo == "s":
+                sleep(op[1])
+            elif codigo == "l":
+                salvar(op[1])
+            elif codigo == "p":
+                press(op[1], presses=op[2], interval=op[3])
+            elif codigo == "h":
+                hotkey(*op[1])
+            elif codigo == "v":
+                if not colar(op[1]):
+                    salvar(f"COLAR indisponível (pyperclip), digitando '{op[1]}'")
+                    write(op[1], interval=op[2])
+            elif codigo == "u":
+                usuario(op[1])
+            elif codigo == "c":
+                if pontos and op[1] in pontos:
+                    pontos[op[1]]()
+
+    @staticmethod
+    def _executarRastreado(ops, pontos):
+        """O mesmo laço, operação a operação, com um trecho no rastro para cada envio de teclas."""
+        agora = entrada.agora
+        for op in ops:
+            nome = Executor.TRECHOS.get(op[0])
+            if nome is None:
+                Executor._laco([op], pontos)
+                continue
+            inicio = agora()
+            try:
+                Executor._laco([op], pontos)
+            finally:
+                teclas = op[1] if isinstance(op[1], str) else "+".join(op[1])
+                rastro.marcar(nome, "digitacao", inicio, agora(), {"teclas": teclas})
+
 # -------------------------
 # Funções utilitárias gerais
 # -------------------------
 class Menu:
+    VOLTAR = -16  # retornado por blocoInicial quando o usuário escolhe [0]
+
     @staticmethod
     def escolha(texto1, texto2):
         resposta = str
@@ -123,7 +1173,8 @@ class Menu:
                     bloco_inicial = n
                     deNovo = False
                 elif n == 0:
-                    bloco_inicial = -16
+                    bloco_inicial = Menu.VOLTAR
+                    deNovo = False
                 else:
                     Log.user("Entrada inválida")
                     print("")
@@ -147,8 +1198,9 @@ class LCsv:
         print(" |> Selecione o arquivo csv |")
         print(" |>    F10 para continuar   | ")
         print("")
+        PerfilInicio.relatorio("1º prompt (seleção do CSV)")
 
-        keyboard.wait('F10')
+        escutador.aguardar(("F10",))
 
         while True:
             caminho_csv = input("Digite o nome do arquivo CSV (sem '.csv'): ").strip() + ".csv"
@@ -164,39 +1216,103 @@ class LCsv:
             break
 
         linhas, fieldnames = LCsv.load(caminho_csv)
-        return linhas, fieldnames
+        return linhas, fieldnames, caminho_csv
+
+    @staticmethod
+    def colunasFaltando(fieldnames):
+        """Retorna os nomes oficiais das colunas obrigatórias ausentes do cabeçalho (aceita os nomes alternativos)."""
+        presentes = set(fieldnames or [])
+        return [nomes[0] for nomes in COLUNAS_CSV.values() if not presentes.intersection(nomes)]
 
     @staticmethod
     def load(caminho_csv: str):
         """
-        Lê CSV com header; normaliza nomes das chaves (strip) e valores (strip).
-        Retorna (lista de dicionários, lista de cabeçalhos normalizados) ou (None, None) se arquivo não encontrado.
+        Lê CSV com header; normaliza nomes das colunas e valores (strip).
+        Retorna (lista de Faixa, lista de cabeçalhos normalizados).
         """
 
+        intern = sys.intern
         with open(caminho_csv, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter=";")
+            reader = csv.reader(f, delimiter=";")
             # Normaliza fieldnames (strip spaces)
-            fieldnames = [fn.strip() for fn in (reader.fieldnames or [])]
+            fieldnames = [fn.strip() for fn in next(reader, [])]
+
+            # posição de cada campo no arquivo (None = coluna ausente)
+            posicoes = []
+            for nomes in COLUNAS_CSV.values():
+                posicoes.append(next((fieldnames.index(n) for n in nomes if n in fieldnames), None))
+
             linhas = []
-            for row in reader:
-                # cria nova dict com chaves normalizadas e valores limpos (strip)
-                nova = {}
-                for k, v in row.items():
-                    key = (k or "").strip()
-                    # Retira possíveis espaços
-                    nova[key] = (v or "").strip()
-                linhas.append(nova)
+            for valores in reader:
+                if not valores:
+                    continue
+                total = len(valores)
+                # valores limpos (strip) e internados: os campos se repetem muito entre as linhas
+                ini, fim, interv, perc, term, frota, linha, dia, sentido, oso, linhaOso = [
+                    intern(valores[p].strip()) if p is not None and p < total else ""
+                    for p in posicoes
+                ]
+                ini_dig = Util.formatHora_dig(ini)
+                fim_dig = Util.formatHora_dig(fim)
+                linhas.append(Faixa(
+                    reader.line_num,
+                    intern(f"{linha}_{dia}_{sentido}"),
+                    ini_dig,
+                    fim_dig,
+                    intern(Util.formatHora_log(ini)),
+                    intern(Util.formatHora_log(fim)),
+                    Util.minutos(ini_dig),
+                    Util.minutos(fim_dig),
+                    interv, perc, term, frota, linha, dia, sentido, oso, linhaOso,
+                ))
 
         Log.save(f"CSV '{caminho_csv}' carregado. Registros: {len(linhas)}. Campos: {fieldnames}")
         return linhas, fieldnames
 
+# -------------------------
+# Validação prévia do CSV (antes de qualquer tecla)
+# -------------------------
+class ValidadorCsv(comum.ValidadorCsv):
+    """Validação do autosiget_comum, com os problemas mostrados numa tabela no console."""
+
+    def mostrar(self, erros):
+        """Mostra todos os problemas de uma vez e registra cada um no log."""
+        for n_linha, problema in erros:
+            self.log.save(f"CSV_INVALIDO linha {n_linha}: {problema}")
+        print(tabulate(erros, headers=["Linha", "Problema"], tablefmt="rounded_grid"))
+        self.log.user(f" |> {len(erros)} problema(s) no CSV. Nada foi digitado: corrija o arquivo e carregue de novo.")
+
+validador = ValidadorCsv(Log)
+
+# -------------------------
+# Histórico de execuções (SQLite)
+# -------------------------
+class Historico(comum.Historico):
+    """Histórico do autosiget_comum, com as consultas (--historico) impressas no console."""
+
+    def mostrar(self, nome, limite=20):
+        """Imprime a consulta 'nome' (--historico). Retorna False se o banco não puder ser lido."""
+        try:
+            descricao, cabecalho, linhas = self.consultar(nome, limite)
+        except (sqlite3.Error, OSError) as e:
+            self.log.user(f" |> Histórico indisponível ({self.caminho}): {e}")
+            return False
+        print(f" |> {descricao} — {self.caminho}")
+        if not linhas:
+            print(" |> Nenhum registro (as consultas agregadas só contam execuções com o driver pyautogui).")
+            return True
+        print(tabulate(linhas, headers=cabecalho, tablefmt="rounded_grid", missingval="-"))
+        return True
+
+historico = Historico(Log, lambda: entrada, "cli")
+
 class ProgramaLinha:
 
     @staticmethod
     def instrucao():
 
         # Limpa o console
-        os.system('cls' if os.name == 'nt' else 'clear')
+        Util.limparConsole()
 
         # Instruções antes de iniciar o programa
         print("REQUISITOS E INSTRUÇÕES:")
@@ -214,7 +1330,7 @@ class ProgramaLinha:
         ''')
 
         print("Pressione F10 para continuar...")
-        keyboard.wait("F10")
+        escutador.aguardar(("F10",))
 
         print('''
         INSTRUÇÕES E AVISOS:
@@ -228,7 +1344,7 @@ class ProgramaLinha:
         ''')
 
         print("Pressione F10 para continuar...")
-        keyboard.wait("F10")
+        escutador.aguardar(("F10",))
 
         return None
     
@@ -238,7 +1354,7 @@ class ProgramaLinha:
     @staticmethod
     def genBlocos(linhas):
         """
-        Recebe lista de dicts (cada linha do CSV com campos normalizados).
+        Recebe lista de Faixa (cada linha do CSV já normalizada).
         Retorna lista de blocos com estrutura:
         {'id_bloco': '1001_Sab_0', 'inicio': i0, 'fim': i1, 'count': n}
         Mantém ordem original do csv.
@@ -249,12 +1365,8 @@ class ProgramaLinha:
         inicio = 0
 
         for i, row in enumerate(linhas):
-            # Acessa campos com nomes esperados (compatível com seu CSV unificado)
-            linha = row.get("Linha", row.get("Linha ", "")).strip()
-            dia = row.get("Dia", "").strip()
-            sentido = row.get("Sentido", "").strip()
-
-            id_atual = f"{linha}_{dia}_{sentido}"
+            # id Linha_Dia_Sentido já calculado no carregamento
+            id_atual = row.id_bloco
 
             if chave_anterior is None:
                 chave_anterior = id_atual
@@ -280,9 +1392,32 @@ class ProgramaLinha:
                 "count": len(linhas) - inicio
             })
 
+        # plano de virada de dia de cada bloco (lido pela digitação, sem comparar horários)
+        for bloco in blocos:
+            bloco["viradas"] = ProgramaLinha.planejarViradas(linhas, bloco)
+
         Log.save(f"{len(blocos)} blocos gerados.")
         return blocos
 
+    # -------------------------
+    # Diferenças em relação ao último conteúdo digitado
+    # -------------------------
+    @staticmethod
+    def mostrarDiff(diff):
+        """Exibe os blocos novos/alterados do diff de SnapshotBlocos."""
+        headers = ["N:", "ID Bloco", "Qtd. Faixas Horárias", "Situação"]
+        tabela = [
+            [i + 1, b["id_bloco"], b["count"], situacao]
+            for i, (b, situacao) in enumerate(diff) if situacao != "igual"
+        ]
+        iguais = len(diff) - len(tabela)
+        print("")
+        print("  Blocos alterados desde a última digitação:")
+        if tabela:
+            print("  " + tabulate(tabela, headers=headers, tablefmt="rounded_grid"))
+        print(f"  {iguais} bloco(s) sem alteração serão pulados.")
+        print("")
+
     # -------------------------
     # Seleção dos blocos
     # -------------------------
@@ -290,7 +1425,7 @@ class ProgramaLinha:
     def select_Blocos(linhas, blocos):
         
         # Limpa o console
-        os.system('cls' if os.name == 'nt' else 'clear')
+        Util.limparConsole()
         
         '''Escolha do bloco_inicial_index pelo usuário, definido o bloco de partida para execução dos preenchimentos'''
         # exibe blocos (resumido)
@@ -308,7 +1443,7 @@ class ProgramaLinha:
         # escolhe bloco inicial
         bloco_inicial = Menu.blocoInicial(blocos)
 
-        if bloco_inicial == -16:
+        if bloco_inicial == Menu.VOLTAR:
             return linhas, blocos, bloco_inicial
 
         # Corrige inicio do bloco inicial ignorando o cabeçalho
@@ -324,125 +1459,64 @@ class ProgramaLinha:
     # Preenchimento de uma faixa
     # -------------------------
     @staticmethod
-    def preenFaixa(row, linha_label, faixaFimAnterior=None):
+    def planejarViradas(linhas, bloco):
         """
-        Executa os comandos de pyautogui para preencher uma faixa com base em 'row' (dict).
-        Recebe faixaFimAnterior strings (FaixaInicio) para detectar virada de dia.
+        Calcula uma única vez, em minutos desde 00:00, onde o bloco passa da meia-noite:
+        viradaIni quando a faixa começa antes do fim da faixa anterior do bloco e
+        viradaFim quando ela termina antes de começar. Retorna um par (viradaIni, viradaFim) por faixa.
+        """
+        viradas = []
+        fim_anterior = -1
+        for row in linhas[bloco["inicio"]:bloco["fim"] + 1]:
+            viradaIni = 0 <= row.ini_min < fim_anterior
+            viradaFim = not viradaIni and 0 <= row.fim_min < row.ini_min
+            viradas.append((viradaIni, viradaFim))
+            if row.fim_min >= 0:
+                fim_anterior = row.fim_min
+        return tuple(viradas)
+
+    @staticmethod
+    def preenFaixa(row, linha_label, viradas=(False, False), ops=None):
+        """
+        Preenche uma faixa com base em 'row' (Faixa): mostra a faixa e executa as operações do
+        plano ('ops', de Plano.compilarFaixa), compiladas aqui com 'viradas' quando não vierem prontas.
         Observação: não faz waits por F10 aqui — apenas executa o preenchimento da faixa.
         """
 
-        # preserva strings originais
-        faixaIni_raw = row.get("FaixaInicio", row.get("FaixaInicio ", "")).strip()
-        faixaFim_raw = row.get("FaixaFinal", row.get("FaixaFinal ", "")).strip()
-        Interv = row.get("Intervalo", row.get("Intervalo", "")).strip()
-        tPerc = row.get("Percurso", row.get("Perc.", row.get("Perc", ""))).strip()
-        tTerm = row.get("TempTerm", row.get("T. Term", row.get("T. Term ", ""))).strip()
-        frota = row.get("Frota", "").strip()
-
-        # formata para print/log
-        faixaIni_log = Util.formatHora_log(faixaIni_raw)
-        faixaFim_log = Util.formatHora_log(faixaFim_raw)
-
-        # prepara valores para digitar (mantendo a lógica existente)
-        faixaIni_dig = Util.formatHora_dig(faixaIni_raw)
-        faixaFim_dig = Util.formatHora_dig(faixaFim_raw)
-
-        # --------------------------
-        # Início do preenchimento (mesma sequência de ações)
-        pyautogui.write(faixaIni_dig)
-        Log.save(f"[{linha_label}] escreveu FaixaInicio '{faixaIni_log}'")
-        
         # console
-            #log.user(f"{linha_label} • Preenchendo faixa de {faixaIni_log} à {faixaFim_log}")
-        print(tabulate([[faixaIni_log, faixaFim_log, Interv, tPerc, tTerm, frota]],
+        print(tabulate([[row.faixaIni_log, row.faixaFim_log, row.intervalo, row.percurso, row.tempTerm, row.frota]],
                        headers=["F. Inicio", "F. Final", "Interv.", "T. Perc.", "T. Term", "Frota"],
                        tablefmt="rounded_grid"))
 
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo FaixaFinal")
-
-        # variável para evitar dupla verificação de faixa para o dia seguinte
-        faixaIniVerif = False
-
-        # Detecta virada de dia: se faixaFimAnterior existe e hora atual < anterior (0000 case)
-        if faixaFimAnterior:
-            prev_ini = (faixaFimAnterior[0] or "").strip()
-            if prev_ini.isdigit() and faixaIni_raw.isdigit():
-                if int(faixaIni_raw) < int(prev_ini):
-                    Log.save(f"[{linha_label}] virada detectada em Faixa Inicio ({faixaIni_raw} < {prev_ini}) — confirmando Enter")
-                    time.sleep(0.25)
-                    pyautogui.press("tab")
-                    pyautogui.press("enter")
-                    time.sleep(0.4)
-                    faixaIniVerif = True
-                    Log.save(f"[{linha_label}] faixaIniVerif definida como VERDADEIRA")
-
-        pyautogui.write(faixaFim_dig)
-        Log.save(f"[{linha_label}] escreveu FaixaFinal '{faixaFim_log}'")
-
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo Intervalo")
-
-        # Detecta virada de dia no FaixaFinal em relação ao anterior
-        if faixaFimAnterior and not faixaIniVerif:
-            prev_fim = faixaIni_dig
-            if prev_fim.isdigit() and faixaFim_dig.isdigit():
-                if int(faixaFim_dig) < int(prev_fim):
-                    Log.save(f"[{linha_label}] virada detectada em FaixaFinal ({faixaFim_dig} < {prev_fim}) — confirmando Enter")
-                    time.sleep(0.25)
-                    pyautogui.press("tab")
-                    pyautogui.press("enter")
-                    time.sleep(0.4)
-
-        pyautogui.write(Interv)
-        Log.save(f"[{linha_label}] escreveu Intervalo '{Interv}'")
-        time.sleep(0.1)
-
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo Tempo de Percurso")
-        time.sleep(0.1)
-
-        pyautogui.write(tPerc)
-        Log.save(f"[{linha_label}] escreveu Percurso '{tPerc}'")
-        time.sleep(0.1)
-
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo Terminal")
-        time.sleep(0.1)
-
-        pyautogui.write(tTerm)
-        Log.save(f"[{linha_label}] escreveu TempTerm '{tTerm}'")
-        time.sleep(0.1)
-
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo Frota")
-        time.sleep(0.1)
-
-        pyautogui.write(frota)
-        Log.save(f"[{linha_label}] escreveu Frota '{frota}'")
-        time.sleep(0.1)
-
-        pyautogui.press("tab")
-        Log.save(f"[{linha_label}] tab → campo Linha (pronto para verificação)")
-        time.sleep(0.1)
+        if ops is None:
+            ops = Plano.compilarFaixa(row, linha_label, viradas)
+        Executor.executar(ops)
 
         # final do preenchimento da faixa
-        Log.save(f"[{linha_label}] faixa preenchida ({faixaIni_log} → {faixaFim_log})")
         Log.user(f"{linha_label} • Faixa preenchida | F10 para continuar | F9 para repetir | F12 para parar ")
 
     # -------------------------
     # Preenchimento de blocos (controle de interação F10/F12)
     # -------------------------
     @staticmethod
-    def preenBlocos(linhas, blocos, bloco_inicio_index):
+    def preenBlocos(linhas, blocos, bloco_inicio_index, diario=None, retomar=False, snapshot=None, plano=None):
         """
         Percorre blocos a partir de bloco_inicio_index (0-based index na lista 'blocos').
-        Para cada faixa dentro do bloco chama PragmaLinha_preenFaixa().
+        Para cada faixa dentro do bloco chama PragmaLinha_preenFaixa() com as operações do 'plano'
+        (Plano.doCsv); sem plano, cada faixa é compilada na hora.
         Aguarda F10 entre faixas; F12 encerra tudo.
+        Cada F10 é registrado no 'diario'; com retomar=True cada bloco começa após as faixas
+        já confirmadas e os blocos completos são pulados.
+        Cada bloco concluído é gravado no 'snapshot' (SnapshotBlocos) para a re-execução incremental.
         """
 
         global parar_execucao
 
+        # nova execução: descarta teclas antigas e limpa o cancelamento
+        escutador.reiniciar()
+        faixas_plano = Plano.faixasPorInicio(plano)
+        parar_execucao = False
+
         total_blocos = len(blocos)
         # itera blocos a partir da escolha do usuário
         for idx_bloco, bloco in enumerate(blocos[bloco_inicio_index:], start=bloco_inicio_index): # Mantive 'start' ajustado
@@ -452,9 +1526,10 @@ class ProgramaLinha:
             count = bloco["count"]
 
             Log.save(f"INICIO_BLOCO {id_bloco} linhas {inicio + 1}-{fim + 1}")
+            inicio_bloco = entrada.agora()  # trecho do bloco no rastro
 
             # Limpa o console
-            os.system('cls' if os.name == 'nt' else 'clear')
+            Util.limparConsole()
 
             print(tabulate([[id_bloco]],
                         headers=["Bloco"],
@@ -462,10 +1537,24 @@ class ProgramaLinha:
 
             # itera dentro do bloco: trecho de linhas
             trecho = linhas[inicio:fim+1]
-            faixaFimAnterior = None  # para detectar virada comparando com a faixa anterior dentro do bloco
+            viradas = bloco["viradas"]  # plano de virada de dia (genBlocos)
+            ops_bloco = faixas_plano.get(inicio)  # operações compiladas de cada faixa (Plano)
+            if ops_bloco is not None and len(ops_bloco) != count:
+                ops_bloco = None
             prox_id_bloco = None # Zera o próximo bloco[ID]
 
-            offset = 0 # Inicializa o índice relativo dentro do 'trecho'
+            # Inicializa o índice relativo dentro do 'trecho' (na retomada, após as faixas já confirmadas)
+            offset_inicial = diario.faixasConcluidas(id_bloco) if (diario and retomar) else 0
+            if offset_inicial >= count:
+                Log.user(f" [+] Bloco {id_bloco} já concluído — pulando. [+] ")
+                Log.save(f"RETOMADA bloco {id_bloco} completo no diário, pulado")
+                continue
+            if offset_inicial:
+                Log.user(f" [+] Retomando o bloco {id_bloco} na faixa {offset_inicial + 1}/{count} [+] ")
+                Log.save(f"RETOMADA bloco {id_bloco} a partir da faixa {offset_inicial + 1}")
+            historico.iniciarBloco(linhas, bloco)
+
+            offset = offset_inicial
             while offset < count: # count é o len(trecho)
 
                 row = trecho[offset]
@@ -477,46 +1566,69 @@ class ProgramaLinha:
                     return None
 
                 linha_label = bloco["id_bloco"]  # label amigável para logs e prints
-
-                # timer antes de iniciar na primeira vez
-                if offset == 0:
-                    Log.user("")
-                    Log.user("  [+] Tempo de 3s para ajustar o cursor no SIGET [+] ")
-                    Log.user("")
-                    time.sleep(3)
-
-                # imprime resumo ao usuário: ação principal
-                Log.user(f">>> Processando faixa {offset + 1}/{count}")
-
-                # chama a rotina que faz os pyautogui.write / press, etc.
-                ProgramaLinha.preenFaixa(row, linha_label, faixaFimAnterior=faixaFimAnterior)
-
-                # atualiza faixaFimAnterior para a próxima iteração (usa raw values)
-                faixaFimAnterior = (row.get("FaixaFim", ""))
+                inicio_faixa = None  # histórico: início da tentativa (após a contagem)
+
+                try:
+                    # timer antes de iniciar na primeira vez
+                    if offset == offset_inicial:
+                        Log.user("")
+                        Log.user(f"  [+] Tempo de {CONTAGEM_BLOCO:g}s para ajustar o cursor no SIGET [+] ")
+                        Log.user("")
+                        entrada.sleep(CONTAGEM_BLOCO)
+
+                    # imprime resumo ao usuário: ação principal
+                    Log.user(f">>> Processando faixa {offset + 1}/{count}")
+
+                    # chama a rotina que faz os write / press (driver de entrada), etc.
+                    inicio_faixa = time.time()
+                    with rastro.trecho(f"faixa {offset + 1}/{count}", "faixa", {"bloco": id_bloco}):
+                        ProgramaLinha.preenFaixa(row, linha_label, viradas[offset],
+                                                 ops_bloco[offset] if ops_bloco is not None else None)
+                    digitada = time.time()
+                except ExecucaoCancelada:
+                    # F12 durante a digitação: nenhuma tecla é enviada depois dele
+                    if inicio_faixa is not None:
+                        historico.faixa(row, offset, inicio_faixa, None, "abortada")
+                    Log.save(f"Parada solicitada (F12) durante a digitação da faixa {offset + 1} do bloco {id_bloco}.")
+                    Log.user(" >>> Execução encerrada pelo usuário.")
+                    Log.flush()
+                    return None
 
                 # controle de avanço: se não é a última faixa do bloco, espera F10;
                 # se for a última, espera F10 para ir ao próximo bloco (ou F12)
                 is_last = (offset == count - 1)
-                
-                Log.save(f"AGUARDANDO_F10_F9_F12 faixa {offset + 1} do bloco {id_bloco}")
-                
-                # loop leve aguardando tecla
-                while True:
-                    if keyboard.is_pressed("F12"):
-                        Log.save("Parada solicitada durante espera de F10.")
-                        Log.user(" >>> Execução encerrada pelo usuário.")
-                        return None
-                    if keyboard.is_pressed("F10"):
-                        time.sleep(0.18)
-                        Log.save(f" >>> F10 pressionado — avançando para faixa {offset + 2} do bloco {id_bloco}")
-                        offset += 1 
-                        break
-                    if keyboard.is_pressed("F9"):
-                        time.sleep(0.18)
-                        Log.save(f" >>> F9 pressionado — repetindo faixa {offset + 1} do bloco {id_bloco}")
-                        is_last = False
-                        break
-                    time.sleep(0.06)
+                digitadas = offset + 1 - offset_inicial
+                parada = is_last or not AVANCO_AUTOMATICO or (PARAR_A_CADA and digitadas % PARAR_A_CADA == 0)
+
+                if parada and not escutador.automatico:
+                    Log.save(f"AGUARDANDO_F10_F9_F12 faixa {offset + 1} do bloco {id_bloco}")
+
+                    # aguarda a tecla (bloqueante, sem polling)
+                    tecla = escutador.aguardar()
+                else:
+                    # avanço automático (--per-block ou --auto-advance, sem operador para o F10):
+                    # pausa de acomodação; um F9/F12 pressionado até aqui ainda vale
+                    try:
+                        entrada.sleep(PAUSA_ENTRE_FAIXAS)
+                    except ExecucaoCancelada:
+                        tecla = "F12"
+                    else:
+                        tecla = escutador.verificar() or "F10"
+
+                historico.faixa(row, offset, inicio_faixa, digitada, Historico.RESULTADO_TECLA.get(tecla, "ok"))
+                if tecla == "F12":
+                    Log.save("Parada solicitada durante espera de F10.")
+                    Log.user(" >>> Execução encerrada pelo usuário.")
+                    Log.flush()
+                    return None
+                if tecla == "F10":
+                    Log.save(f" >>> F10 pressionado — avançando para faixa {offset + 2} do bloco {id_bloco}")
+                    if diario and entrada.digita:  # ensaio (gravação/nulo) não conta como digitado
+                        diario.registrarFaixa(id_bloco, offset)
+                    offset += 1
+                elif tecla == "F9":
+                    Log.save(f" >>> F9 pressionado — repetindo faixa {offset + 1} do bloco {id_bloco}")
+                    is_last = False
 
                 if is_last:
                     # último da lista do bloco
@@ -525,6 +1637,11 @@ class ProgramaLinha:
                     print("")
                     Log.user(f" [+] Bloco {id_bloco} finalizado ({count} faixas horárias).  [+] ")
                     Log.save(f"FIM_BLOCO {id_bloco}")
+                    historico.concluirBloco("ok")
+                    if rastro.ativo:
+                        rastro.marcar(f"bloco {id_bloco}", "bloco", inicio_bloco, entrada.agora(), {"faixas": count})
+                    if snapshot and entrada.digita:  # ensaio não conta como digitado
+                        snapshot.registrarBloco(linhas, bloco)
                     print("")
                     
                     # Verifica se há um próximo bloco
@@ -542,28 +1659,24 @@ class ProgramaLinha:
                         Log.user(">>> Este foi o último bloco.")
                     Log.user(">>> Pressione F10 para iniciar o próximo bloco | F9 para selecionar bloco | F12 para encerrar")
                     # Espera F10, F9 ou F12
-                    while True:
-                        if keyboard.is_pressed("F12"):
-                            Log.save("Parada solicitada na finalização de bloco.")
-                            Log.user("Execução encerrada pelo usuário.")
-                            return None
-                        if keyboard.is_pressed("F10"):
-                            time.sleep(0.18)
-                            if prox_id_bloco:
-                                Log.save(f" >>> F10 pressionado — iniciando próximo bloco ({prox_id_bloco})")
-                            else:
-                                Log.save(" >>> F10 pressionado — não há próximo bloco (fim).")
-                            break
-                        if keyboard.is_pressed("F9"):
-                            time.sleep(0.18)
-                            Log.save(f" >>> F9 pressionado iniciando seletor de blocos")
-                            gerarBlocos = True
-                            return gerarBlocos
-                        time.sleep(0.06)
+                    tecla = escutador.aguardar()
+                    if tecla == "F12":
+                        Log.save("Parada solicitada na finalização de bloco.")
+                        Log.user("Execução encerrada pelo usuário.")
+                        Log.flush()
+                        return None
+                    if tecla == "F9":
+                        Log.save(f" >>> F9 pressionado iniciando seletor de blocos")
+                        gerarBlocos = True
+                        return gerarBlocos
+                    if prox_id_bloco:
+                        Log.save(f" >>> F10 pressionado — iniciando próximo bloco ({prox_id_bloco})")
+                    else:
+                        Log.save(" >>> F10 pressionado — não há próximo bloco (fim).")
             
             # fim do bloco — segue para próximo bloco no for
             # pequeno delay entre blocos
-            time.sleep(0.15)
+            entrada.sleep(0.15)
             
         # todos blocos processados
         print("")
@@ -573,6 +1686,64 @@ class ProgramaLinha:
         gerarBlocos = False
         return gerarBlocos
 
+class VerificadorPDF:
+    """
+    Modo pipeline da impressão: confere os PDFs numa thread própria enquanto a próxima OSO é digitada.
+    Cada PDF enfileirado espera estabilizar (entrada.aguardarArquivo) e passa por PrintPDF.pdfValido;
+    as OSOs que falharem ficam em 'falhas' para a reimpressão no final.
+    """
+
+    def __init__(self, diario=None, catalogo=None):
+        self.diario = diario
+        self.catalogo = catalogo
+        self.fila = queue.Queue()
+        self.falhas = {}  # caminho do PDF -> OSO (um F9 que confirma o PDF tira a OSO daqui)
+        self.confirmados = 0
+        self.thread = threading.Thread(target=self._executar, name="VerificadorPDF", daemon=True)
+        self.thread.start()
+
+    def enfileirar(self, row, caminho_pdf, anterior):
+        """'anterior' é o entrada.estadoArquivo() do PDF antes de confirmar o Salvar."""
+        self.fila.put((row, caminho_pdf, anterior))
+
+    def concluir(self):
+        """Espera as verificações pendentes, encerra a thread e retorna as OSOs que falharam."""
+        self.fila.put(None)
+        inicio = time.perf_counter()
+        self.thread.join()
+        orcamento.somar("arquivo", time.perf_counter() - inicio)  # só aqui a digitação espera pelos PDFs
+        Log.save(f"VERIFICADOR_PDF confirmados={self.confirmados} falhas={len(self.falhas)}")
+        return list(self.falhas.values())
+
+    def _executar(self):
+        orcamento.emParalelo()
+        while True:
+            item = self.fila.get()
+            if item is None:
+                return
+            row, caminho_pdf, anterior = item
+            nome_pdf = os.path.basename(caminho_pdf)
+            try:
+                with rastro.trecho("aguardar PDF", "arquivo", {"pdf": nome_pdf}):
+                    salvo = (entrada.aguardarArquivo(caminho_pdf, anterior, timeout=PerfilTempo.pausas()["timeout_pdf"],
+                                                     estavel=PDF_ESTAVEL)
+                             and PrintPDF.pdfValido(caminho_pdf))
+            except ExecucaoCancelada:
+                salvo = False  # F12: a OSO entra na lista de reimpressão
+            historico.pdfConferido(nome_pdf, salvo)
+            if salvo:
+                self.confirmados += 1
+                self.falhas.pop(caminho_pdf, None)
+                if self.diario:
+                    self.diario.registrarPdf(nome_pdf)
+                if self.catalogo:
+                    self.catalogo.registrar(nome_pdf)
+                Log.save(f"[{row['oso_dig']}] PDF salvo com sucesso: {nome_pdf}")
+            else:
+                self.falhas[caminho_pdf] = row
+                Log.save(f"[{row['oso_dig']}] ERRO: PDF não confirmado ({nome_pdf}) — reimpressão no final")
+                Log.user(f"   ERRO: {nome_pdf} | PDF não confirmado — será reimpresso no final")
+
 class PrintPDF:
 
     @staticmethod
@@ -584,44 +1755,19 @@ class PrintPDF:
         """
         
         QuantidadeDeOsos = 0
-        for i , row in enumerate(osoBruta):
-            oso = row.get("Oso", row.get("Oso ", "")).strip()
-            if oso != "":
+        for row in osoBruta:
+            if row.oso != "":
                 QuantidadeDeOsos = QuantidadeDeOsos + 1
         
         osos = []
 
         for i, row in enumerate(osoBruta[:QuantidadeDeOsos]):
 
-            linha = row.get("LinhaOso", row.get("LinhaOso ", "")).strip()
-            oso = row.get("Oso", row.get("Oso ", "")).strip()
-
-            if len(oso) == 6 and oso.isdigit():
-                fimOso = int(oso[4:])
-
-                if fimOso == 00:
-                    oso_dig = oso[:4]
-                    linha_dig = linha[:4]
-                    osos.append({
-                        "n_oso": i + 1,
-                        "linha": linha_dig,
-                        "oso_dig": oso_dig,
-                        "oso": oso,
-                        "tipo": "BASE"
-                    })
-                else:
-                    oso_dig = oso[:4] + "-" + oso[4:]
-                    linha_dig = linha[:4] + "-" + linha[4:]
-                    osos.append({
-                        "n_oso": i + 1,
-                        "linha": linha_dig,
-                        "oso_dig": oso_dig,
-                        "oso": oso,
-                        "tipo": "DERIVADA"
-                    })
-            else:
-                Log.user(f"OSO [{oso}] | formato inválido seguir o formato: [123456]")
+            dados = PrintPDF.dadosOSO(row, i + 1)
+            if dados is None:
+                Log.user(f"OSO [{row.oso}] | formato inválido seguir o formato: [123456]")
                 return None
+            osos.append(dados)
                 
         filtroB = lambda x: x["tipo"] == "BASE"
         filtroD = lambda x: x["tipo"] == "DERIVADA"
@@ -631,9 +1777,28 @@ class PrintPDF:
         print("")
         Log.user(f"{len(osos)} Osos identificadas | B:{len(ososBase)} D:{len(ososDerivada)} ")
         print("")
-        time.sleep(1)  # import time
+        entrada.sleep(1)
         return osos
 
+    @staticmethod
+    def dadosOSO(row, n_oso):
+        """OSO da linha 'row' (Faixa) pronta para digitação, ou None se não tiver o formato [123456]."""
+        linha = row.linhaOso
+        oso = row.oso
+
+        if not (len(oso) == 6 and oso.isdigit()):
+            return None
+
+        if int(oso[4:]) == 00:
+            return {"n_oso": n_oso, "linha": linha[:4], "oso_dig": oso[:4], "oso": oso, "tipo": "BASE"}
+        return {
+            "n_oso": n_oso,
+            "linha": linha[:4] + "-" + linha[4:],
+            "oso_dig": oso[:4] + "-" + oso[4:],
+            "oso": oso,
+            "tipo": "DERIVADA"
+        }
+
     @staticmethod
     def SelecionarFQH():
         fQH = ""
@@ -686,98 +1851,137 @@ class PrintPDF:
     # Impressão de OSOs (controle de interação F10/F12)
     # -------------------------
     @staticmethod
-    def preencher_PDFs(osos, oso_inicial_index, fQH, OsoAtiva):
+    def preencher_PDFs(osos, oso_inicial_index, fQH, OsoAtiva, pipeline=False, diario=None, retomar=False, catalogo=None,
+                       plano=None):
         """
         Percorre osos a partir de oso_inicial_index (0-based index na lista 'osos').
-        Para cada faixa dentro do OSO chama PragmaLinha_preenFaixa().
-        Aguarda F10 entre faixas; F12 encerra tudo.
+        Para cada OSO chama PrintPDF.imprimirPDF().
+        Aguarda F10 entre OSOs; F12 encerra tudo.
+        Com pipeline=True os PDFs são conferidos pelo VerificadorPDF enquanto a próxima OSO
+        é digitada; os que não se confirmarem são reimpressos no final (conferindo um a um).
+        PDFs conferidos são registrados no 'diario' e no 'catalogo'; com retomar=True as OSOs cujo
+        PDF já consta no diário ou já está (válido) na pasta FQHs são puladas.
+        As teclas de cada OSO vêm do 'plano' (Plano.doCsv) quando ele é informado.
         """
 
         global parar_execucao
-        
-        # itera osos a partir da escolha do usuário
-        for idx_oso, OSO in enumerate(osos[oso_inicial_index:], start=oso_inicial_index):
-            
-            n_oso = OSO["n_oso"]
-            oso = OSO["oso"]
-            oso_label = OSO["oso_dig"]  # label amigável para logs e prints
-            linha = OSO["linha"]
-
-            Log.save(f"INICIO OSO: {oso} | Linha: {linha}")
-
-            tabela = [[n_oso ,oso_label, linha]]
-            print(tabulate(tabela, headers=["n.º", "OSO", "LINHA"],tablefmt="rounded_grid"))
-            print("")
-
-            RepetirOso = True
-            while RepetirOso:
-                
-                interruptorGlobal()
-                if parar_execucao:
-                    Log.save("Parada solicitada — encerrando preenchimento.")
-                    Log.user("Execução encerrada pelo usuário.")
-                    return
+        parar_execucao = False
+        ops_osos = plano["osos"].get(fQH, {}) if plano else {}
 
-                # imprime resumo ao usuário: ação principal
-                Log.user(f">>> Processando OSO {oso_label}")
+        verificador = VerificadorPDF(diario, catalogo) if pipeline else None
+        try:
+            # itera osos a partir da escolha do usuário
+            for idx_oso, OSO in enumerate(osos[oso_inicial_index:], start=oso_inicial_index):
 
-                row = osos[idx_oso]
+                n_oso = OSO["n_oso"]
+                oso = OSO["oso"]
+                oso_label = OSO["oso_dig"]  # label amigável para logs e prints
+                linha = OSO["linha"]
+                nome_pdf = PrintPDF.nomePDF(OSO, fQH) + ".pdf"
 
-                ## Verifica se tem OSO derivada após a OSO base atual
-                #OsoDerivada = False
-                #prox_oso = None
-                #if row["tipo"] == "BASE":
-                #    prox_idx = idx_oso + 1
-                #    if prox_idx < len(osos):
-                #        prox_oso = osos[prox_idx]
-                #        if prox_oso["tipo"] == "DERIVADA":
-                #            OsoDerivada = True
+                if retomar and PrintPDF.jaImpresso(nome_pdf, diario, catalogo):
+                    Log.save(f"RETOMADA OSO {oso_label} já impressa ({nome_pdf}), pulada")
+                    continue
 
-                prox_oso = osos[idx_oso + 1]
-
-                # chama a rotina que faz os pyautogui.write / press, etc.
-                PrintPDF.imprimirPDF(row, fQH, OsoAtiva)
-                
-                print("Próxima OSO:")
-                n_oso = prox_oso["n_oso"]
-                oso = prox_oso["oso"]
-                oso_label = prox_oso["oso_dig"]  # label amigável para logs e prints
-                linha = prox_oso["linha"]
+                Log.save(f"INICIO OSO: {oso} | Linha: {linha}")
 
                 tabela = [[n_oso ,oso_label, linha]]
                 print(tabulate(tabela, headers=["n.º", "OSO", "LINHA"],tablefmt="rounded_grid"))
                 print("")
 
-                Log.save(f"AGUARDANDO_F10_F9_F12 OSO {oso_label}")
-                
-                # loop leve aguardando tecla
-                while True:
-                    if keyboard.is_pressed("F12"):
+                prox_oso = osos[idx_oso + 1] if idx_oso + 1 < len(osos) else None
+
+                RepetirOso = True
+                while RepetirOso:
+
+                    interruptorGlobal()
+                    if parar_execucao:
+                        Log.save("Parada solicitada — encerrando preenchimento.")
+                        Log.user("Execução encerrada pelo usuário.")
+                        return
+
+                    # imprime resumo ao usuário: ação principal
+                    Log.user(f">>> Processando OSO {oso_label}")
+
+                    # chama a rotina que faz os write / press (driver de entrada), etc.
+                    id_oso = historico.iniciarOso(OSO, fQH, nome_pdf)
+                    try:
+                        with rastro.trecho(f"OSO {oso_label}", "oso", {"pdf": nome_pdf}):
+                            pdf_salvo = PrintPDF.imprimirPDF(OSO, fQH, OsoAtiva, verificador, ops_osos.get(oso))
+                        impressa = time.time()
+                    except ExecucaoCancelada:
+                        # F12 durante a impressão: nenhuma tecla é enviada depois dele
+                        historico.concluirOso(id_oso, None, None, "abortada")
+                        Log.save(f"Parada solicitada (F12) durante a impressão da OSO {oso_label}.")
+                        Log.user(" >>> Execução encerrada pelo usuário.")
+                        Log.flush()
+                        return
+                    if pdf_salvo:
+                        if diario:
+                            diario.registrarPdf(nome_pdf)
+                        if catalogo:
+                            catalogo.registrar(nome_pdf)
+
+                    if prox_oso is not None:
+                        print("Próxima OSO:")
+                        tabela = [[prox_oso["n_oso"], prox_oso["oso_dig"], prox_oso["linha"]]]
+                        print(tabulate(tabela, headers=["n.º", "OSO", "LINHA"],tablefmt="rounded_grid"))
+                        print("")
+
+                    Log.save(f"AGUARDANDO_F10_F9_F12 OSO {oso_label}")
+
+                    # aguarda a tecla (bloqueante, sem polling)
+                    tecla = escutador.aguardar()
+                    historico.concluirOso(id_oso, impressa, pdf_salvo, Historico.RESULTADO_TECLA.get(tecla, "ok"))
+                    if tecla == "F12":
                         Log.save("Parada solicitada durante espera de F10.")
                         Log.user(" >>> Execução encerrada pelo usuário.")
+                        Log.flush()
                         return
-                    if keyboard.is_pressed("F10"):
-                        time.sleep(0.18)
+                    if tecla == "F10":
                         Log.save(f" >>> F10 pressionado — preenchendo oso do OSO {oso}")
                         RepetirOso = False
-                        break
-                    if keyboard.is_pressed("F9"):
-                        time.sleep(0.18)
+                    elif tecla == "F9":
                         Log.save(f" >>> F9 pressionado — repetindo faixa do OSO {oso}")
                         RepetirOso = True
-                        break
-                    time.sleep(0.06)
-            # fim da OSO — segue para próxima OSO no for
-            # pequeno delay entre osos
-            time.sleep(0.15)
-            
+                # fim da OSO — segue para próxima OSO no for
+                # pequeno delay entre osos
+                entrada.sleep(0.15)
+
+            falhas = verificador.concluir() if verificador else []
+            verificador = None
+        finally:
+            if verificador is not None:
+                verificador.concluir()
+
         # todos osos processados
         print("")
         Log.user("Todas as OSOs processados.")
         print("")
-        time.sleep(1)
+        with contextlib.suppress(ExecucaoCancelada):
+            entrada.sleep(1)  # pausa só de tela: tudo já foi impresso, um F12 aqui não interrompe nada
         Log.save("PROCESSAMENTO_COMPLETO")
 
+        if falhas:
+            # fila de reimpressão do modo pipeline
+            Log.user(f" >>> {len(falhas)} PDF(s) não confirmado(s): {', '.join(o['oso_dig'] for o in falhas)}")
+            Log.user(" >>> F10 para reimprimir (conferindo cada PDF) | F12 para encerrar")
+            if escutador.aguardar(("F10", "F12")) == "F10":
+                Log.save(f"REIMPRESSAO {len(falhas)} OSOs")
+                PrintPDF.preencher_PDFs(falhas, 0, fQH, OsoAtiva, diario=diario, catalogo=catalogo, plano=plano)
+
+    @staticmethod
+    def jaImpresso(nome_pdf, diario=None, catalogo=None):
+        """PDF conferido numa execução anterior (diário) ou já presente e válido na pasta FQHs."""
+        return bool((diario and nome_pdf in diario.pdfs) or (catalogo and catalogo.existe(nome_pdf)))
+
+    @staticmethod
+    def nomePDF(row, fQH):
+        """Nome do PDF (sem extensão) salvo na pasta FQHs para a OSO."""
+        return f"{fQH} {row['linha']} {row['oso_dig']}"
+
+    pdfValido = staticmethod(comum.pdfValido)  # cabeçalho %PDF- e final %%EOF
+
     # -------------------------
     # Selecionar OSO a ser preenchida
     # -------------------------
@@ -797,58 +2001,44 @@ class PrintPDF:
         # escolhe OSO inicial
         oso_inicial = Menu.blocoInicial(OSOs)
 
+        if oso_inicial == Menu.VOLTAR:
+            return OSOs, oso_inicial
+
         oso_inicial_index=oso_inicial-1
         return OSOs, oso_inicial_index
 
     @staticmethod
-    def imprimirPDF(row, fQH, OsoAtiva):
-        # Impressão de um PDF.
-
-        # preserva strings originais
-        linha = row.get("linha", row.get("linha ", "")).strip()
-        oso = row.get("oso", row.get("oso ", "")).strip()
-        oso_dig = row.get("oso_dig", row.get("oso_dig ", "")).strip()
-        NomePDF = f"{fQH} {linha} {oso_dig}"
+    def imprimirPDF(row, fQH, OsoAtiva, verificador=None, ops=None):
+        # Impressão de um PDF. Retorna True/False conforme o PDF foi conferido.
+        # Com 'verificador' (modo pipeline) a conferência do arquivo fica com o VerificadorPDF
+        # e a função retorna None sem esperar o PDF ser gravado.
+        # As teclas vêm do plano ('ops', de Plano.compilarOSO); sem plano são compiladas aqui.
+
+        # valores já tratados em tratarOSOs
+        oso_dig = row["oso_dig"]
+        NomePDF = PrintPDF.nomePDF(row, fQH)
         caminho_pdf = os.path.join("AutoSiget3000", "FQHs", f"{NomePDF}.pdf")
+        estado = {"anterior": None, "salvo": None}
+
+        def antesSalvar():
+            estado["anterior"] = entrada.estadoArquivo(caminho_pdf)  # F9 regrava um PDF que já existe
+
+        def salvar():
+            if verificador is None:
+                # Espera o PDF aparecer na pasta FQHs, parar de crescer e estar completo
+                with rastro.trecho("aguardar PDF", "arquivo", {"pdf": NomePDF}):
+                    estado["salvo"] = bool(entrada.aguardarArquivo(caminho_pdf, estado["anterior"],
+                                                                   timeout=PerfilTempo.pausas()["timeout_pdf"],
+                                                                   estavel=PDF_ESTAVEL)
+                                           and PrintPDF.pdfValido(caminho_pdf))
+            else:
+                verificador.enfileirar(row, caminho_pdf, estado["anterior"])
+                entrada.sleep(PAUSA_SALVAR_PIPELINE)
 
-        # --------------------------
-        # Início do preenchimento
-        # --------------------------
-
-        # Preenche o campo Insira o n.º da OSO (Dígito por dígito, para evitar erros)
-        for ch in oso:
-            pyautogui.write(ch)
-            time.sleep(0.1)
-        Log.save(f"[{oso_dig}] escreveu OSO '{oso}'")
-        Log.user(f"Preenchendo OSO:     {oso_dig}")
-        time.sleep(0.2)
-
-        pyautogui.press('tab')
-        Log.save(f"[{oso_dig}] Insira o n.º da OSO ≥ Impressão Gráfica")
-        time.sleep(0.2)
-
-        time.sleep(0.5)
-        pyautogui.press("enter", presses=3, interval=0.3)
-        Log.save(f"[{oso_dig}] fechou o POP-UP e botou para imprimir")
-        time.sleep(3)
-
-        # Digita o nome do PDF e confirma salvar
-        pyautogui.write(NomePDF)
-        Log.save(f"[{oso_dig}] escreveu nome do PDF '{NomePDF}'")
-        Log.user(f"Preenchendo NomePDF: {NomePDF}")
-        time.sleep(0.3)
-        
-        pyautogui.press("enter")
-        Log.save(f"[{oso_dig}] confirmou salvar PDF")
-        time.sleep(3.5)
-
-        pyautogui.hotkey('shift', 'tab')
-        Log.save(f"[{oso_dig}] botão Imprimir ≥ Informe o N° da oso")
-        time.sleep(0.2)
-
-        pyautogui.press('left', presses=6, interval=0.1)
-        Log.save(f"[{oso_dig}] 6x seta para esquerda")
-        time.sleep(0.1)
+        if ops is None:
+            ops = Plano.compilarOSO(row, fQH)
+        Executor.executar(ops, {"antes_salvar": antesSalvar, "salvar": salvar})
+        pdf_salvo = estado["salvo"]
 
         ''''
         # Cria um PDF fake (arquivo vazio ou com texto de teste)
@@ -856,18 +2046,23 @@ class PrintPDF:
             f.write(f"Arquivo fake para debug: {NomePDF}.pdf\n")
         '''
         
-        if os.path.exists(caminho_pdf):
+        if verificador is not None:
+            Log.save(f"[{oso_dig}] PDF enviado ao verificador: {NomePDF}.pdf")
+            Log.user(f"   {NomePDF}.pdf | Conferindo em segundo plano")
+            Log.user(f"[{oso_dig}] • F10 para continuar | F9 para repetir | F12 para parar ")
+        elif pdf_salvo:
             Log.save(f"[{oso_dig}] PDF salvo com sucesso: {NomePDF}.pdf")
             Log.user(f"   {NomePDF}.pdf | Salvo com sucesso")
             Log.user(f"[{oso_dig}] • F10 para continuar | F9 para repetir | F12 para parar ")
         else:
-            Log.save(f"[{oso_dig}] ERRO: PDF não encontrado ({NomePDF}.pdf)")
+            Log.save(f"[{oso_dig}] ERRO: PDF não encontrado após {PerfilTempo.pausas()['timeout_pdf']:.0f}s ({NomePDF}.pdf)")
             Log.user("===============================================")
             Log.user(f"   ERRO: {NomePDF}.pdf | PDF não encontrado   ")
             Log.user("===============================================")
             Log.user(f"[{oso_dig}] • F10 para continuar | F9 para repetir | F12 para parar ")
 
         # final do preenchimento da faixa
+        return None if verificador is not None else pdf_salvo
 
     @staticmethod
     def Instrucao():
@@ -892,7 +2087,7 @@ class PrintPDF:
         ''')
 
         print("Pressione F10 para continuar...")
-        keyboard.wait("F10")
+        escutador.aguardar(("F10",))
 
         print('''
         INSTRUÇÕES E AVISOS:
@@ -906,17 +2101,32 @@ class PrintPDF:
         ''')
 
         print("Pressione F10 para continuar...")
-        keyboard.wait("F10")
+        escutador.aguardar(("F10",))
         print("")
         return None
 
-def IniciarModulo_printPDF(dados):
+# -------------------------
+# Estados da sessão (máquina de estados de main)
+# -------------------------
+ESTADO_MENU = "menu"            # introdução + pedido do CSV
+ESTADO_MODULO = "modulo"        # seleção do módulo para o CSV carregado
+ESTADO_PROG_LINHA = "prog_linha"
+ESTADO_PRINT_PDF = "print_pdf"
+ESTADO_SAIR = "sair"
+
+def IniciarModulo_printPDF(dados, diario=None, plano=None):
+    """Executa o módulo de impressão e retorna o próximo estado da sessão."""
     
     log_dir = "AutoSiget3000/FQHs"
     os.makedirs(log_dir, exist_ok=True)
 
     # Tratar osos e adicionar dados calculados
     OSOs = PrintPDF.tratarOSOs(dados)
+    if not OSOs:
+        # None: OSO fora do formato (o erro já foi mostrado por tratarOSOs)
+        if OSOs is not None:
+            Log.user("Nenhuma OSO identificada no CSV.")
+        return ESTADO_MODULO
 
     #Instruções para o usuário
     PrintPDF.Instrucao()
@@ -924,80 +2134,131 @@ def IniciarModulo_printPDF(dados):
     #Seleciona o Tipo de preenchimento
     fQH, OsoAtiva = PrintPDF.SelecionarFQH()
 
+    #Modo pipeline: confere os PDFs em segundo plano enquanto digita a próxima OSO
+    pipeline = Menu.escolha("Conferir cada PDF antes de seguir", "Pipeline (confere em segundo plano)") == 2
+
+    # Catálogo da pasta FQHs (uma passada de scandir; atualizado a cada PDF conferido)
+    catalogo = CatalogoPDF()
+
     while True:
-        # Iniciar o preenchimento de PDFs
-        OSOs, oso_inicial_index = PrintPDF.seletorOsos(OSOs)
+        # Oferece imprimir só as OSOs sem PDF (conferido no diário ou já salvo na pasta FQHs)
+        feitos = sum(PrintPDF.jaImpresso(PrintPDF.nomePDF(o, fQH) + ".pdf", diario, catalogo) for o in OSOs)
+        if feitos == len(OSOs):
+            Log.user(f"Todas as {feitos} OSOs já têm PDF {fQH} na pasta FQHs.")
+            if Menu.escolha("Reimprimir (escolher a OSO)", "Voltar à escolha do módulo") == 2:
+                return ESTADO_MODULO
+        retomar = 0 < feitos < len(OSOs) and Menu.escolha(
+            f"Imprimir só as {len(OSOs) - feitos} OSO(s) sem PDF (pula {feitos} já impressa(s))", "Escolher a OSO") == 1
 
-        #Tempo para o usuário trocar de tela Programa ≥ SIGET
+        # Iniciar o preenchimento de PDFs
+        if retomar:
+            oso_inicial_index = 0
+        else:
+            OSOs, oso_inicial_index = PrintPDF.seletorOsos(OSOs)
+            if oso_inicial_index == Menu.VOLTAR:
+                return ESTADO_MENU
+
+        #Tempo para o usuário trocar de tela Programa ≥ SIGET (F12 cancela)
+        escutador.reiniciar()
+        orcamento.iniciar()
+        rastro.iniciar()
+        historico.iniciar("pdf", diario.hash_csv if diario else None)
         print("Aguardando 5s para posicionar o CURSOR no SIGET...", end=",\n")
-        time.sleep(5)
-
-        # Preenchimento das OSOs
-        PrintPDF.preencher_PDFs(OSOs, oso_inicial_index, fQH, OsoAtiva)
+        try:
+            entrada.sleep(5)
+
+            # Preenchimento das OSOs
+            PrintPDF.preencher_PDFs(OSOs, oso_inicial_index, fQH, OsoAtiva, pipeline, diario, retomar, catalogo, plano)
+        except ExecucaoCancelada:
+            Log.user(" >>> Execução encerrada pelo usuário.")
+            Log.flush()
+        orcamento.relatorio()
+        rastro.concluir()
+        historico.concluir("abortada" if parar_execucao or cancelamento.is_set() else "ok")
 
         resposta = Menu.escolha("Encerrar programa", "Iniciar outra OSO")
+        if resposta == 1:
+            return ESTADO_MENU
 
-        if resposta == '1':
-            break
-        else:
-            continue
-    
-    main()
-
-def IniciarModulo_ProgramaLinha(dados):
-    #Inicia o processamento do Módulo de programação de linha
+def IniciarModulo_ProgramaLinha(dados, diario=None, plano=None):
+    """Executa o módulo de programação de linha e retorna o próximo estado da sessão."""
     # gera Blocos
     blocos = ProgramaLinha.genBlocos(dados)
 
     if not blocos:
         Log.user("Nenhum OSO identificado no CSV.")
-        return
+        return ESTADO_MODULO
     
     # Instruções para o uso
     ProgramaLinha.instrucao()
+
+    # Último conteúdo digitado de cada bloco (re-execução incremental)
+    snapshot = SnapshotBlocos()
+
+    # Confirmação por faixa (F10 a cada faixa) ou por bloco (avança sozinho dentro do bloco)
+    global AVANCO_AUTOMATICO
+    AVANCO_AUTOMATICO = Menu.escolha("Confirmar cada faixa (F10)", "Confirmar por bloco (avança sozinho)") == 2
     
     while True:
+        # Oferece a retomada se o diário deste CSV tem faixas confirmadas
+        ponto = diario.retomada(blocos) if diario else None
+        retomar = ponto is not None and Menu.escolha(
+            f"Retomar no bloco {blocos[ponto[0]]['id_bloco']}, faixa {ponto[1] + 1}", "Escolher o bloco") == 1
+
+        # Re-execução incremental: só os blocos novos/alterados desde a última digitação
+        alterados = []
+        if not retomar and snapshot.blocos:
+            diff = snapshot.diff(dados, blocos)
+            alterados = [b for b, situacao in diff if situacao != "igual"]
+            if len(alterados) == len(blocos):
+                alterados = []  # nada em comum com o que já foi digitado: segue o fluxo normal
+            else:
+                ProgramaLinha.mostrarDiff(diff)
+                if not alterados:
+                    Log.user("Nenhum bloco alterado desde a última digitação.")
+                elif Menu.escolha(f"Digitar só os blocos alterados ({len(alterados)} de {len(blocos)})",
+                                  "Escolher o bloco") != 1:
+                    alterados = []
+
         #Seleciona os Blocos
-        linhas, blocos, bloco_inicio_index = ProgramaLinha.select_Blocos(dados, blocos)
+        if retomar:
+            linhas, fila_blocos, bloco_inicio_index = dados, blocos, ponto[0]
+        elif alterados:
+            linhas, fila_blocos, bloco_inicio_index = dados, alterados, 0
+            Log.save(f"INCREMENTAL {len(alterados)} de {len(blocos)} blocos: {', '.join(b['id_bloco'] for b in alterados)}")
+        else:
+            linhas, fila_blocos, bloco_inicio_index = ProgramaLinha.select_Blocos(dados, blocos)
+            if bloco_inicio_index == Menu.VOLTAR:
+                return ESTADO_MENU
 
         #Preenche a partir do bloco selecionado
-        gerarBlocos = ProgramaLinha.preenBlocos(linhas, blocos, bloco_inicio_index)
+        orcamento.iniciar()
+        rastro.iniciar()
+        historico.iniciar("linha", diario.hash_csv if diario else None)
+        try:
+            gerarBlocos = ProgramaLinha.preenBlocos(linhas, fila_blocos, bloco_inicio_index, diario, retomar, snapshot,
+                                                    plano)
+        except ExecucaoCancelada:
+            # F12 numa pausa entre blocos
+            Log.user(" >>> Execução encerrada pelo usuário.")
+            Log.flush()
+            gerarBlocos = None
+        orcamento.relatorio()
+        rastro.concluir()
+        historico.concluir("abortada" if gerarBlocos is None else "ok")
 
         if gerarBlocos:
             continue
-        else:
-            resposta = Menu.escolha("Encerrar programa", "Iniciar outra OSO")
-            if resposta == "1":
-                break
-            else:
-                continue
-    
-    main()
+        resposta = Menu.escolha("Encerrar programa", "Iniciar outra OSO")
+        if resposta == 1:
+            return ESTADO_MENU
 
 # -------------------------
 # Interface principal
 # -------------------------
-def main():
-
-    intro()
-
-    '''Módulo central do programa, menu inicial'''
-    dados, cabecalho = LCsv.pedir()
-    if dados is None:
-        return
-
-    # valida campos mínimos (esperados)
-    chavesObrigatorias = {"FaixaInicio", "FaixaFinal", "Intervalo", "Percurso", "TempTerm", "Frota", "Linha", "Dia", "Sentido", "Oso", "LinhaOso"}
-    
-    # Normaliza chavesCabecalho
-    chavesCabecalho = set(h.strip() for h in (cabecalho or []))
-    chaveFaltando = chavesObrigatorias - chavesCabecalho
-    if chaveFaltando:
-        Log.user(f"Erro: o CSV está faltando colunas obrigatórias: {', '.join(chaveFaltando)}")
-        main()
-    
-    while True:
-        print('''
+def escolherModulo():
+    """Menu de módulos; retorna o estado correspondente à escolha."""
+    print('''
  Selecione o módulo:
     [1] - Digitar programação de linha
     [2] - Imprimir PDF
@@ -1005,28 +2266,173 @@ def main():
     [0] - Voltar ao MENU
         ''')
 
-        # escolhe módulo
-        deNovo = True
-        while deNovo:
-            escolha = input(">>> Digite o número do módulo: ").strip()
-            time.sleep(0.5)
-            if escolha and escolha.isdigit():
-                n = int(escolha)
-                if n == 1:
-                    IniciarModulo_ProgramaLinha(dados)
-                elif n == 2:
-                    IniciarModulo_printPDF(dados)
-                elif n == 0:
-                    main()
-                else:
-                    Log.user("Entrada inválida")
-                    print("")
-                    continue
-            else:
-                Log.user("Entrada inválida")
-                print("")
+    while True:
+        escolha = input(">>> Digite o número do módulo: ").strip()
+        time.sleep(0.5)
+        if escolha == "1":
+            return ESTADO_PROG_LINHA
+        if escolha == "2":
+            return ESTADO_PRINT_PDF
+        if escolha == "0":
+            return ESTADO_MENU
+        Log.user("Entrada inválida")
+        print("")
+
+def main():
+    '''
+    Módulo central do programa: máquina de estados menu → CSV → módulo → execução.
+    Cada módulo retorna o próximo estado em vez de chamar main() de novo, então a pilha
+    fica constante e só o CSV atual permanece em memória durante a sessão.
+    '''
+    estado = ESTADO_MENU
+    dados = None
+    diario = None
+    plano = None
+
+    while estado != ESTADO_SAIR:
+        if estado == ESTADO_MENU:
+            dados = diario = plano = None  # libera o CSV anterior antes de ler o próximo
+            intro()
+            dados, cabecalho, caminho_csv = LCsv.pedir()
+            if dados is None:
+                estado = ESTADO_SAIR
                 continue
 
+            # valida campos mínimos (esperados)
+            chaveFaltando = LCsv.colunasFaltando(cabecalho)
+            if chaveFaltando:
+                Log.user(f"Erro: o CSV está faltando colunas obrigatórias: {', '.join(chaveFaltando)}")
+                continue
+
+            # confere o CSV inteiro antes de qualquer tecla
+            erros = validador.validar(dados)
+            if erros:
+                validador.mostrar(erros)
+                continue
+            diario = Diario.doCsv(caminho_csv)
+            plano = Plano.doCsv(dados, diario.hash_csv)  # o que será digitado, compilado uma vez (cache)
+            estado = ESTADO_MODULO
+
+        elif estado == ESTADO_MODULO:
+            estado = escolherModulo()
+            # um F12 da execução anterior não vale para o módulo escolhido (tratarOSOs, instruções...)
+            escutador.reiniciar()
+
+        elif estado == ESTADO_PROG_LINHA:
+            estado = IniciarModulo_ProgramaLinha(dados, diario, plano)
+
+        elif estado == ESTADO_PRINT_PDF:
+            estado = IniciarModulo_printPDF(dados, diario, plano)
+
+# -------------------------
+# Modo sem prompts (--csv)
+# -------------------------
+def executarSemPrompt(args):
+    """
+    Executa um módulo direto pelos argumentos de linha de comando, sem input() nem telas de F10.
+    Retorna o código de saída: 0 concluído, 1 erro no CSV/argumentos, 130 parado com F12.
+    """
+    global CONTAGEM_BLOCO, AVANCO_AUTOMATICO, PAUSA_ENTRE_FAIXAS, PARAR_A_CADA
+
+    if not os.path.exists(args.csv):
+        Log.user(f" |> Arquivo '{args.csv}' não encontrado.")
+        return 1
+    dados, cabecalho = LCsv.load(args.csv)
+    chaveFaltando = LCsv.colunasFaltando(cabecalho)
+    if chaveFaltando:
+        Log.user(f"Erro: o CSV está faltando colunas obrigatórias: {', '.join(chaveFaltando)}")
+        return 1
+    erros = validador.validar(dados)
+    if erros:
+        validador.mostrar(erros)
+        return 1
+    diario = Diario.doCsv(args.csv)
+    Log.save(f"SEM_PROMPT {' '.join(sys.argv[1:])}")
+    plano = Plano.doCsv(dados, diario.hash_csv)
+
+    # Só inspeção do plano: nada é digitado
+    if args.plano:
+        Plano.resumo(plano)
+        print(f"Plano: {Plano.caminho(diario.hash_csv)}")
+        return 0
+    if args.plano_diff:
+        if not os.path.exists(args.plano_diff):
+            Log.user(f" |> Arquivo '{args.plano_diff}' não encontrado.")
+            return 1
+        outro = Plano.doCsv(LCsv.load(args.plano_diff)[0], Diario.doCsv(args.plano_diff).hash_csv)
+        print(tabulate(Plano.diff(plano, outro), headers=["Bloco", f"Em relação a {args.plano_diff}"],
+                       tablefmt="rounded_grid"))
+        return 0
+
+    definirEntrada(args.driver)
+    if args.auto_advance:
+        escutador.automatico = "F10"
+        if args.driver == "pyautogui":
+            # F10 automático, mas o F12 continua parando a digitação real
+            try:
+                escutador.iniciar(forcar=True)
+            except Exception as e:
+                Log.user(f"Aviso: F12 indisponível neste terminal ({e}).")
+    escutador.reiniciar()
+    orcamento.iniciar()
+    rastro.iniciar()
+
+    if args.module == "linha":
+        blocos = ProgramaLinha.genBlocos(dados)
+        if not blocos:
+            Log.user("Nenhum bloco identificado no CSV.")
+            return 1
+        if not 1 <= args.from_block <= len(blocos):
+            Log.user(f"--from-block deve estar entre 1 e {len(blocos)}.")
+            return 1
+
+        CONTAGEM_BLOCO = args.countdown
+        AVANCO_AUTOMATICO = args.per_block
+        PAUSA_ENTRE_FAIXAS = args.settle
+        PARAR_A_CADA = args.stop_every
+        snapshot = SnapshotBlocos()
+        fila_blocos, inicio = blocos, args.from_block - 1
+        ponto = diario.retomada(blocos) if args.retomar else None
+        if ponto:
+            inicio = ponto[0]
+        elif args.incremental:
+            fila_blocos = [b for b, situacao in snapshot.diff(dados, blocos)[inicio:] if situacao != "igual"]
+            inicio = 0
+            Log.user(f"{len(fila_blocos)} bloco(s) novo(s)/alterado(s) a digitar.")
+
+        historico.iniciar("linha", diario.hash_csv)
+        try:
+            resultado = ProgramaLinha.preenBlocos(dados, fila_blocos, inicio, diario, bool(ponto), snapshot, plano)
+        except ExecucaoCancelada:
+            resultado = None
+        orcamento.relatorio()
+        rastro.concluir()
+        historico.concluir("abortada" if resultado is None else "ok")
+        return 0 if resultado is not None else 130
+
+    # módulo pdf
+    OSOs = PrintPDF.tratarOSOs(dados)
+    if not OSOs:
+        return 1
+    if not 1 <= args.from_block <= len(OSOs):
+        Log.user(f"--from-block deve estar entre 1 e {len(OSOs)}.")
+        return 1
+    os.makedirs(CatalogoPDF.PASTA, exist_ok=True)
+
+    historico.iniciar("pdf", diario.hash_csv)
+    print(f"Aguardando {args.countdown:g}s para posicionar o CURSOR no SIGET...")
+    try:
+        entrada.sleep(args.countdown)
+        PrintPDF.preencher_PDFs(OSOs, args.from_block - 1, args.tipo, not args.inativas,
+                                args.pipeline, diario, args.retomar, CatalogoPDF(), plano)
+        cancelado = parar_execucao or cancelamento.is_set()
+    except ExecucaoCancelada:
+        cancelado = True
+    orcamento.relatorio()
+    rastro.concluir()
+    historico.concluir("abortada" if cancelado else "ok")
+    return 130 if cancelado else 0
+
 def intro():
     # Mensagem de introdução ao sistema
     global parar_execucao
@@ -1049,6 +2455,93 @@ def intro():
 # Roda a introdução
 # -------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="AutoSIGET 3000 - modo console",
+        epilog="Sem --csv abre o menu interativo. Ex.: --csv faixas.csv --module linha --from-block 3 --auto-advance --countdown 3")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="mostra o tempo do carregamento do script até o 1º prompt")
+    parser.add_argument("--calibrar", action="store_true",
+                        help="mede a velocidade desta estação num formulário local e grava o perfil de tempo")
+    parser.add_argument("--colar", action="store_true",
+                        help="cola (Ctrl+V) o n.º da OSO e o nome do PDF em vez de digitar (requer pyperclip)")
+    parser.add_argument("--campo-a-campo", action="store_true",
+                        help="digita a faixa campo a campo, com a pausa de troca de campo entre eles, "
+                             "em vez de uma sequência única (para estações em que a rajada perde teclas)")
+    parser.add_argument("--rastro", nargs="?", const="", metavar="ARQUIVO",
+                        help="grava o rastro de cada execução (Chrome Trace Event, abrir em ui.perfetto.dev); "
+                             f"sem ARQUIVO, um por execução em {Rastro.PASTA}")
+    parser.add_argument("--timeout-pdf", type=float, metavar="S",
+                        help="espera máxima (s) pelo PDF na pasta FQHs nesta execução, no lugar da do perfil "
+                             f"(padrão sem perfil: {PerfilTempo.PADRAO['timeout_pdf']:g})")
+    parser.add_argument("--pausa-acao", type=float, metavar="S",
+                        help="pausa (s) após cada write/press/hotkey nesta execução, no lugar da do perfil "
+                             f"(padrão sem perfil: {PerfilTempo.PADRAO['acao']:g})")
+    parser.add_argument("--sem-failsafe", action="store_true",
+                        help="desliga o failsafe do pyautogui (mouse num canto da tela encerra a digitação)")
+    sem_prompt = parser.add_argument_group("modo sem prompts")
+    sem_prompt.add_argument("--csv", help="arquivo CSV (ativa o modo sem prompts)")
+    sem_prompt.add_argument("--module", choices=("linha", "pdf"), default="linha",
+                            help="linha = programação de linha | pdf = impressão de PDFs (padrão: linha)")
+    sem_prompt.add_argument("--from-block", type=int, default=1,
+                            help="bloco (ou OSO, no módulo pdf) inicial, contando de 1 (padrão: 1)")
+    sem_prompt.add_argument("--auto-advance", action="store_true",
+                            help="avança sozinho em vez de esperar F10 (F12 continua parando)")
+    sem_prompt.add_argument("--per-block", action="store_true",
+                            help="módulo linha: avança sozinho dentro do bloco e só espera F10 no fim do bloco")
+    sem_prompt.add_argument("--settle", type=float, default=PAUSA_ENTRE_FAIXAS,
+                            help=f"pausa (s) de acomodação entre faixas com --per-block ou --auto-advance "
+                                 f"(padrão: {PAUSA_ENTRE_FAIXAS:g})")
+    sem_prompt.add_argument("--stop-every", type=int, default=0,
+                            help="com --per-block: também espera F10 a cada N faixas (padrão: 0 = só no fim do bloco)")
+    sem_prompt.add_argument("--countdown", type=float, default=None,
+                            help="segundos para posicionar o cursor no SIGET (padrão: 3 linha / 5 pdf)")
+    sem_prompt.add_argument("--driver", choices=sorted(DRIVERS_ENTRADA), default="pyautogui",
+                            help="driver de entrada; 'gravacao'/'nulo' não digitam nada (ensaio)")
+    sem_prompt.add_argument("--retomar", action="store_true",
+                            help="continua do diário de progresso deste CSV (pula o que já foi confirmado)")
+    sem_prompt.add_argument("--incremental", action="store_true",
+                            help="módulo linha: digita só os blocos novos/alterados desde a última digitação")
+    sem_prompt.add_argument("--tipo", choices=("FH", "QH"), default="FH", help="módulo pdf: FH ou QH (padrão: FH)")
+    sem_prompt.add_argument("--inativas", action="store_true", help="módulo pdf: OSOs desativadas")
+    sem_prompt.add_argument("--pipeline", action="store_true",
+                            help="módulo pdf: confere os PDFs em segundo plano enquanto digita a próxima OSO")
+    plano_acoes = parser.add_argument_group("plano de ações (com --csv; só inspeciona, nada é digitado)")
+    plano_acoes.add_argument("--plano", action="store_true",
+                             help="mostra o plano compilado: operações, teclas e tempo previsto por bloco")
+    plano_acoes.add_argument("--plano-diff", metavar="OUTRO_CSV",
+                             help="compara o plano do --csv com o de outro CSV, bloco a bloco")
+    consulta = parser.add_argument_group(f"histórico de execuções ({Historico.CAMINHO}; só consulta, nada é digitado)")
+    consulta.add_argument("--historico", choices=list(Historico.CONSULTAS), metavar="CONSULTA",
+                          help="execucoes (últimas execuções), vazao (faixas/OSOs por hora, por dia), "
+                               "linhas-lentas (tempo médio por faixa) ou repeticoes (F9/F12 por operador)")
+    consulta.add_argument("--limite", type=int, default=20, help="linhas da consulta (padrão: 20)")
+    args = parser.parse_args()
+    PerfilInicio.ativo = args.startup_profile
+    PerfilInicio.marcar("script carregado")
+
+    if args.calibrar:
+        PerfilTempo.calibrar()
+        Log.flush()
+        sys.exit(0)
+    if args.historico:
+        sys.exit(0 if historico.mostrar(args.historico, args.limite) else 1)
+    if args.pausa_acao is not None:
+        PerfilTempo.pausas()["acao"] = max(0.0, args.pausa_acao)
+    if args.timeout_pdf is not None:
+        PerfilTempo.pausas()["timeout_pdf"] = max(0.0, args.timeout_pdf)
+    MODO_COLAR = args.colar
+    MODO_RAJADA = not args.campo_a_campo
+    FAILSAFE = not args.sem_failsafe
+    if args.rastro is not None:
+        rastro.habilitado = True
+        rastro.caminho = args.rastro or None
+    if args.csv:
+        if args.countdown is None:
+            args.countdown = 3 if args.module == "linha" else 5
+        LIMPAR_CONSOLE = False
+        codigo = executarSemPrompt(args)
+        Log.flush()
+        sys.exit(codigo)
     main()
 
 
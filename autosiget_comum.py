@@ -0,0 +1,737 @@
+"""
+Definições e classes compartilhadas entre o modo console (app_4.0.py) e a interface gráfica
+(autosiget_gui_v3.py): pausas padrão, rastro, plano (cache), validação do CSV, diário, snapshot,
+histórico e catálogo de PDFs.
+Nada aqui usa os globais de uma interface: o registro de log (objeto com save/user: a classe Log
+do console ou o LogModel da GUI) e o driver de entrada atual (função sem argumentos que o retorna)
+são recebidos na construção.
+Só biblioteca padrão (o numpy é importado na validação): importar este módulo não atrasa o
+1º prompt nem a 1ª janela.
+"""
+import contextlib
+import getpass
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# -------------------------
+# Pausas da digitação
+# -------------------------
+# Padrões (s) sem perfil da estação; o perfil gravado por --calibrar vale por cima deles
+PAUSAS_PADRAO = {
+    "acao": 0.1,             # após cada write/press/hotkey (o PAUSE padrão do pyautogui)
+    "tecla": 0.02,           # entre teclas no modo rajada
+    "campo": 0.1,            # após cada campo/dígito e entre as setas
+    "foco": 0.2,             # após trocar de controle (tab, shift+tab)
+    "virada_antes": 0.25,    # antes de confirmar a virada de dia (diálogo do SIGET)
+    "virada_depois": 0.4,    # depois de confirmar a virada de dia
+    "popup": 0.5,            # antes de fechar o pop-up de impressão
+    "enter_popup": 0.3,      # entre os Enter do pop-up de impressão
+    "apos_imprimir": 3.0,    # até a janela Salvar abrir (não calibrado: depende do spooler)
+    "apos_nome": 0.3,        # após digitar o nome do PDF (não calibrado)
+    "timeout_pdf": 30.0,     # espera máxima pelo PDF na pasta FQHs (não calibrado; --timeout-pdf)
+}
+
+# -------------------------
+# Arquivos da pasta FQHs
+# -------------------------
+def estadoArquivo(caminho):
+    """(tamanho, mtime_ns) do arquivo ou None se ele não existir."""
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def pdfValido(caminho_pdf):
+    """Confere o cabeçalho (%PDF-) e o final (%%EOF) do arquivo, sem ler o PDF inteiro."""
+    try:
+        with open(caminho_pdf, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                return False
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+# -------------------------
+# Rastro da execução (--rastro)
+# -------------------------
+class Rastro:
+    """
+    Trechos (spans) de uma execução: digitação, pausas, esperas pelo operador e pelo PDF, log,
+    faixas, blocos e OSOs. Exportado no formato Chrome Trace Event (abrir em ui.perfetto.dev
+    ou chrome://tracing). Desligado, cada ponto instrumentado custa um teste de 'ativo'.
+    O relógio é o do driver de entrada: com o driver de gravação o rastro mostra a linha do
+    tempo simulada (pausas incluídas).
+    """
+    PASTA = os.path.join("AutoSiget3000", "Rastros")
+    habilitado = False  # --rastro
+    caminho = None      # --rastro ARQUIVO; senão um arquivo por execução em PASTA
+
+    def __init__(self, driver, log=None):
+        self.driver = driver  # função que retorna o driver de entrada atual
+        self.log = log        # save/user do arquivo gravado (None = quem chama informa)
+        self.ativo = False
+        self.eventos = []
+        self.t0 = 0.0
+
+    def agora(self):
+        return self.driver().agora()
+
+    def iniciar(self):
+        """Começa um rastro novo (início de cada execução), se habilitado."""
+        self.ativo = self.habilitado
+        self.eventos = []
+        self.t0 = self.agora()
+
+    def marcar(self, nome, categoria, inicio, fim, args=None):
+        self.eventos.append((nome, categoria, inicio, fim, threading.current_thread().name, args))
+
+    @contextlib.contextmanager
+    def trecho(self, nome, categoria, args=None):
+        """Marca o bloco 'with' como um trecho (também quando ele termina com exceção)."""
+        if not self.ativo:
+            yield
+            return
+        inicio = self.agora()
+        try:
+            yield
+        finally:
+            self.marcar(nome, categoria, inicio, self.agora(), args)
+
+    def concluir(self):
+        """Grava o rastro da execução e retorna o caminho do arquivo (None se desligado)."""
+        if not self.ativo:
+            return None
+        self.ativo = False
+        entrada = self.driver()
+        pid = os.getpid()
+        threads = {}
+        eventos = []
+        for nome, categoria, inicio, fim, thread, args in self.eventos:
+            evento = {"name": nome, "cat": categoria, "ph": "X", "pid": pid,
+                      "tid": threads.setdefault(thread, len(threads) + 1),
+                      "ts": round((inicio - self.t0) * 1e6, 1), "dur": round((fim - inicio) * 1e6, 1)}
+            if args:
+                evento["args"] = args
+            eventos.append(evento)
+        eventos += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}}
+                    for thread, tid in threads.items()]
+
+        caminho = self.caminho or os.path.join(self.PASTA, f"rastro_{datetime.now().strftime('%Y%m%d_%H.%M.%S.%f')[:-3]}.json")
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms",
+                       "otherData": {"driver": entrada.nome, "simulado": not entrada.dorme}},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        if self.log is not None:
+            self.log.save(f"RASTRO {len(self.eventos)} trechos -> {caminho}")
+            self.log.user(f" |> Rastro da execução: {caminho} (abrir em ui.perfetto.dev)")
+        return caminho
+
+# -------------------------
+# Plano de ações (formato e cache)
+# -------------------------
+class Plano:
+    """
+    Compila o CSV num plano de ações explícito: para cada faixa e cada OSO (FH e QH), a lista
+    de operações de teclado, pausas, linhas de log e pontos de controle, na ordem exata.
+    O plano é JSON, fica em cache por hash do CSV (AutoSiget3000/Planos) e pode ser inspecionado,
+    comparado e cronometrado antes da execução (--plano / --plano-diff).
+
+    Operações (listas, para sobreviver ao JSON sem conversão):
+        ["t", teclas, intervalo]      write (texto ou lista de teclas)
+        ["p", tecla, vezes, intervalo] press
+        ["h", [teclas]]               hotkey
+        ["v", texto, intervalo]       colar (Ctrl+V); sem área de transferência, write(texto, intervalo)
+        ["s", segundos]               pausa
+        ["l", texto] / ["u", texto]   save / user do log
+        ["c", nome]                   ponto de controle (tratado por quem executa)
+
+    A compilação fica em cada interface (a sequência da OSO na GUI difere da do console);
+    aqui ficam o cache em disco e o que só lê o plano.
+    """
+    VERSAO = 1
+    PASTA = os.path.join("AutoSiget3000", "Planos")
+
+    @staticmethod
+    def _juntarPausas(ops):
+        """Pausas consecutivas viram uma só (mesmo tempo total, uma chamada a menos)."""
+        saida = []
+        for op in ops:
+            if op[0] == "s" and saida and saida[-1][0] == "s":
+                saida[-1] = ["s", round(saida[-1][1] + op[1], 3)]
+            else:
+                saida.append(op)
+        return saida
+
+    @classmethod
+    def doCache(cls, caminho, config, compilar, log):
+        """
+        Plano gravado em 'caminho' quando a versão e a 'config' batem; senão o de compilar(),
+        gravado no lugar (arquivo temporário + replace).
+        """
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                plano = json.load(f)
+            if plano.get("versao") == cls.VERSAO and plano.get("config") == config:
+                log.save(f"PLANO carregado do cache {caminho}")
+                return plano
+        except (OSError, ValueError):
+            pass
+
+        plano = compilar()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(plano, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, caminho)
+        log.save(f"PLANO compilado: {len(plano['blocos'])} blocos, {len(plano['osos']['FH'])} OSOs -> {caminho}")
+        return plano
+
+    @staticmethod
+    def faixasPorInicio(plano):
+        """{inicio do bloco: operações de cada faixa}, para achar o bloco pela posição no CSV."""
+        return {b["inicio"]: b["faixas"] for b in plano["blocos"]} if plano else {}
+
+    @staticmethod
+    def diff(plano, outro):
+        """[(id_bloco, situação)] entre dois planos: igual, alterado (nº de faixas diferentes), novo ou removido."""
+        antes = {b["id_bloco"]: b["faixas"] for b in outro["blocos"]}
+        depois = {b["id_bloco"]: b["faixas"] for b in plano["blocos"]}
+        resultado = []
+        for id_bloco, faixas in depois.items():
+            if id_bloco not in antes:
+                resultado.append((id_bloco, "novo"))
+                continue
+            anteriores = antes[id_bloco]
+            diferentes = sum(a != b for a, b in zip(faixas, anteriores)) + abs(len(faixas) - len(anteriores))
+            resultado.append((id_bloco, f"alterado ({diferentes} faixa(s))" if diferentes else "igual"))
+        resultado += [(id_bloco, "removido") for id_bloco in antes if id_bloco not in depois]
+        return resultado
+
+# -------------------------
+# Validação prévia do CSV (antes de qualquer tecla)
+# -------------------------
+class ValidadorCsv:
+    """
+    Confere o CSV inteiro antes da digitação, com operações vetorizadas do NumPy, e reúne
+    todos os problemas com o número da linha no arquivo: horários HHMM, Interv (inteiro,
+    divisor da faixa, 0 só em faixa de uma viagem ou até 00:00), virada de dia dentro do bloco, formato
+    e posição das OSOs e chaves repetidas (faixa no bloco, bloco separado, OSO).
+    """
+
+    def __init__(self, log):
+        self.log = log
+
+    def validar(self, linhas):
+        """Retorna a lista [(n_linha, problema)] ordenada pela linha; vazia se o CSV está válido."""
+        try:
+            import numpy as np
+        except ImportError:
+            self.log.user("Aviso: numpy não instalado (pip install numpy); o CSV não foi validado antes da digitação.")
+            return []
+
+        erros = []
+        n = len(linhas)
+        if n == 0:
+            return erros
+
+        indices = np.arange(n)
+        n_linha = np.fromiter((r.n_linha for r in linhas), dtype=np.int64, count=n)
+        ini = np.fromiter((r.ini_min for r in linhas), dtype=np.int64, count=n)
+        fim = np.fromiter((r.fim_min for r in linhas), dtype=np.int64, count=n)
+        ids = np.array([r.id_bloco for r in linhas], dtype=str)
+        interv_txt = np.array([r.intervalo for r in linhas], dtype=str)
+        oso = np.array([r.oso for r in linhas], dtype=str)
+        linha_oso = np.array([r.linhaOso for r in linhas], dtype=str)
+
+        def reportar(mascara, problema):
+            for i in np.flatnonzero(mascara):
+                erros.append((int(n_linha[i]), problema(i)))
+
+        def repetidos(chaves, considerar):
+            """(índices repetidos, índice da 1ª ocorrência de cada um) entre as linhas em 'considerar'."""
+            idx = np.flatnonzero(considerar)
+            _, primeiro, inverso = np.unique(chaves[idx], return_index=True, return_inverse=True)
+            origem = idx[primeiro][inverso.reshape(-1)]
+            dup = origem != idx
+            return idx[dup], origem[dup]
+
+        # Horários HHMM
+        reportar(ini < 0, lambda i: f"FaixaInicio '{linhas[i].faixaIni_dig}' não é um horário HHMM válido")
+        reportar(fim < 0, lambda i: f"FaixaFinal '{linhas[i].faixaFim_dig}' não é um horário HHMM válido")
+        horarios = (ini >= 0) & (fim >= 0)
+
+        # Interv: inteiro; 0 só em faixa de uma viagem ou de encerramento (até 00:00);
+        # a faixa é múltipla do intervalo
+        numerico = np.char.isdigit(interv_txt)
+        interv = np.where(numerico, interv_txt, "0").astype(np.int64)
+        duracao = (fim - ini) % 1440
+        reportar(~numerico, lambda i: f"Interv '{interv_txt[i]}' não é um número inteiro")
+        reportar(numerico & horarios & (interv == 0) & (duracao != 0) & (fim != 0),
+                 lambda i: f"Interv 0 só vale para faixa de uma viagem ou até 00:00 ({linhas[i].faixaIni_log} a {linhas[i].faixaFim_log})")
+        reportar(horarios & (interv > 0) & (duracao % np.maximum(interv, 1) != 0),
+                 lambda i: f"faixa de {duracao[i]} min ({linhas[i].faixaIni_log} a {linhas[i].faixaFim_log}) não é múltipla do Interv {interv[i]}")
+
+        # Virada de dia: dentro do bloco os horários (início, fim, início, fim...) só podem
+        # voltar uma vez (meia-noite) e, depois dela, não alcançar o 1º horário do bloco (24 h)
+        inicio_bloco = np.ones(n, dtype=bool)
+        inicio_bloco[1:] = ids[1:] != ids[:-1]
+        primeira = np.maximum.accumulate(np.where(inicio_bloco, indices, 0))
+        sequencia = np.empty(2 * n, dtype=np.int64)
+        sequencia[0::2] = ini
+        sequencia[1::2] = fim
+        volta = (sequencia[1:] < sequencia[:-1]) & (sequencia[1:] >= 0) & (sequencia[:-1] >= 0)
+        volta[2 * np.flatnonzero(inicio_bloco[1:]) + 1] = False  # fim do bloco anterior -> início do próximo
+        acumulado = np.concatenate(([0], np.cumsum(volta)))
+        viradas = acumulado[2 * indices + 1] - acumulado[2 * primeira]
+        nesta_linha = acumulado[2 * indices + 1] > acumulado[2 * indices]
+        nesta_linha[1:] |= acumulado[2 * indices[1:]] > acumulado[2 * indices[1:] - 1]
+        reportar(nesta_linha & (viradas > 1),
+                 lambda i: f"horário volta no tempo depois da virada de dia do bloco {ids[i]}")
+        excede = np.flatnonzero(horarios & (viradas == 1) & (fim >= ini[primeira]) & (ini[primeira] >= 0))
+        _, primeiro_excesso = np.unique(primeira[excede], return_index=True)  # só a 1ª linha de cada bloco
+        for i in excede[primeiro_excesso]:
+            erros.append((int(n_linha[i]), f"bloco {ids[i]} passa de 24 h (começa às {linhas[primeira[i]].faixaIni_log}): "
+                                            f"FaixaFinal antes da FaixaInicio ou horário fora de ordem"))
+
+        # Faixas de um bloco juntas e sem FaixaInicio repetida
+        for i, j in zip(*repetidos(ids, inicio_bloco)):
+            erros.append((int(n_linha[i]), f"bloco {ids[i]} aparece de novo (começou na linha {n_linha[j]}); as faixas de um bloco devem estar juntas"))
+        chaves = np.char.add(np.char.add(ids, "|"), ini.astype(str))
+        for i, j in zip(*repetidos(chaves, ini >= 0)):
+            erros.append((int(n_linha[i]), f"faixa {linhas[i].faixaIni_log} repetida no bloco {ids[i]} (linha {n_linha[j]})"))
+
+        # OSOs: 6 dígitos, com LinhaOso, sem repetição, em linhas seguidas no início do CSV (tratarOSOs)
+        tem_oso = np.char.str_len(oso) > 0
+        quantidade = int(tem_oso.sum())
+        reportar(tem_oso & ~(np.char.isdigit(oso) & (np.char.str_len(oso) == 6)),
+                 lambda i: f"Oso '{oso[i]}' fora do formato [123456]")
+        reportar(tem_oso & (np.char.str_len(linha_oso) == 0), lambda i: f"LinhaOso vazia para a Oso {oso[i]}")
+        reportar(~tem_oso & (indices < quantidade),
+                 lambda i: "Oso vazia entre as OSOs; as OSOs devem ocupar as primeiras linhas do CSV, sem falhas")
+        for i, j in zip(*repetidos(oso, tem_oso)):
+            erros.append((int(n_linha[i]), f"Oso {oso[i]} repetida (linha {n_linha[j]})"))
+
+        erros.sort(key=lambda e: e[0])
+        return erros
+
+    def resumo(self, erros, limite=5):
+        """Registra todos os problemas no log e devolve o texto curto com os 'limite' primeiros."""
+        for n_linha, problema in erros:
+            self.log.save(f"CSV_INVALIDO linha {n_linha}: {problema}")
+        linhas = [f"linha {n_linha}: {problema}" for n_linha, problema in erros[:limite]]
+        if len(erros) > limite:
+            linhas.append(f"... e mais {len(erros) - limite} (lista completa no log)")
+        return f"{len(erros)} problema(s) no CSV, nada foi digitado:\n" + "\n".join(linhas)
+
+# -------------------------
+# Diário de progresso (retomada após F12/queda)
+# -------------------------
+class Diario:
+    """
+    Diário de progresso de um CSV, identificado pelo SHA-256 do conteúdo.
+    Só acrescenta linhas (JSON por linha) e faz fsync a cada registro, então uma queda perde no
+    máximo o registro em andamento. Registra cada faixa concluída com o driver real (F10 ou avanço
+    automático, sem F9/F12) e cada PDF conferido; ensaios com gravação/nulo não entram.
+    """
+    PASTA = os.path.join("AutoSiget3000", "Progresso")
+
+    def __init__(self, hash_csv: str):
+        self.hash_csv = hash_csv
+        self.caminho = os.path.join(Diario.PASTA, f"{hash_csv[:16]}.jsonl")
+        self.faixas = {}          # id_bloco -> quantidade de faixas confirmadas (do início do bloco)
+        self.ultima_faixa = None  # (id_bloco, offset) do último registro
+        self.pdfs = set()         # nomes dos PDFs conferidos
+        self.quebra_pendente = False
+        self.trava = threading.Lock()
+        self._carregar()
+
+    @staticmethod
+    def doCsv(caminho_csv):
+        """Abre (ou cria) o diário do CSV em 'caminho_csv'."""
+        sha = hashlib.sha256()
+        with open(caminho_csv, "rb") as f:
+            for pedaco in iter(lambda: f.read(1 << 16), b""):
+                sha.update(pedaco)
+        return Diario(sha.hexdigest())
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                conteudo = f.read()
+        except FileNotFoundError:
+            return
+        # uma linha cortada por queda fica sem "\n": é ignorada e o próximo registro começa numa linha nova
+        self.quebra_pendente = bool(conteudo) and not conteudo.endswith("\n")
+        for linha in conteudo.splitlines():
+            try:
+                reg = json.loads(linha)
+            except ValueError:
+                continue
+            self._aplicar(reg)
+
+    def _aplicar(self, reg):
+        if reg.get("t") == "faixa":
+            id_bloco, offset = reg["bloco"], reg["offset"]
+            self.faixas[id_bloco] = max(self.faixas.get(id_bloco, 0), offset + 1)
+            self.ultima_faixa = (id_bloco, offset)
+        elif reg.get("t") == "pdf":
+            self.pdfs.add(reg["arquivo"])
+
+    def _registrar(self, reg):
+        linha = json.dumps(reg, ensure_ascii=False) + "\n"
+        with self.trava:
+            os.makedirs(Diario.PASTA, exist_ok=True)
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                if self.quebra_pendente:
+                    f.write("\n")
+                    self.quebra_pendente = False
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+            self._aplicar(reg)
+
+    def registrarFaixa(self, id_bloco, offset):
+        self._registrar({"t": "faixa", "bloco": id_bloco, "offset": offset, "em": datetime.now().isoformat(timespec="seconds")})
+
+    def registrarPdf(self, nome_pdf):
+        self._registrar({"t": "pdf", "arquivo": nome_pdf, "em": datetime.now().isoformat(timespec="seconds")})
+
+    def faixasConcluidas(self, id_bloco):
+        return self.faixas.get(id_bloco, 0)
+
+    def retomada(self, blocos):
+        """
+        (índice do bloco, faixa) logo após a última faixa confirmada, pulando blocos já completos;
+        None se não há progresso ou se todos os blocos a partir dali estão completos.
+        """
+        if self.ultima_faixa is None:
+            return None
+        ids = [b["id_bloco"] for b in blocos]
+        if self.ultima_faixa[0] not in ids:
+            return None
+        for idx in range(ids.index(self.ultima_faixa[0]), len(blocos)):
+            feitas = self.faixasConcluidas(blocos[idx]["id_bloco"])
+            if feitas < blocos[idx]["count"]:
+                return idx, feitas
+        return None
+
+# -------------------------
+# Snapshot dos blocos digitados (re-execução incremental)
+# -------------------------
+class SnapshotBlocos:
+    """
+    Último conteúdo digitado de cada bloco (Linha_Dia_Sentido), como a lista de hashes das faixas.
+    Vale entre CSVs diferentes: um CSV novo é comparado bloco a bloco com o que já está no SIGET
+    e só os blocos novos ou alterados precisam ser digitados.
+    """
+    CAMINHO = os.path.join("AutoSiget3000", "Progresso", "snapshot_blocos.json")
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or SnapshotBlocos.CAMINHO
+        self.blocos = {}  # id_bloco -> {"faixas": [hash, ...], "em": data}
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                self.blocos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    @staticmethod
+    def hashFaixa(row):
+        """Hash dos campos digitados da faixa (o que o SIGET recebe)."""
+        campos = "|".join((row.faixaIni_dig, row.faixaFim_dig, row.intervalo, row.percurso, row.tempTerm, row.frota))
+        return hashlib.sha1(campos.encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def hashesBloco(linhas, bloco):
+        return [SnapshotBlocos.hashFaixa(row) for row in linhas[bloco["inicio"]:bloco["fim"] + 1]]
+
+    def situacao(self, linhas, bloco):
+        """'novo' (nunca digitado), 'alterado' ou 'igual' ao último conteúdo digitado."""
+        anterior = self.blocos.get(bloco["id_bloco"])
+        if anterior is None:
+            return "novo"
+        return "igual" if anterior["faixas"] == SnapshotBlocos.hashesBloco(linhas, bloco) else "alterado"
+
+    def diff(self, linhas, blocos):
+        """Lista [(bloco, situação)] de todos os blocos, na ordem do CSV."""
+        return [(bloco, self.situacao(linhas, bloco)) for bloco in blocos]
+
+    def registrarBloco(self, linhas, bloco):
+        """Grava o conteúdo do bloco como digitado (gravação atômica: arquivo temporário + replace)."""
+        self.blocos[bloco["id_bloco"]] = {
+            "faixas": SnapshotBlocos.hashesBloco(linhas, bloco),
+            "em": datetime.now().isoformat(timespec="seconds"),
+        }
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.blocos, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
+
+# -------------------------
+# Histórico de execuções (SQLite)
+# -------------------------
+class Historico:
+    """
+    Histórico de todas as execuções num banco SQLite indexado: cada execução, bloco, tentativa de
+    faixa e tentativa de OSO, com início/fim (epoch), resultado e hash do CSV.
+    Resultados: ok, repetida (F9), abortada (F12) e sem_pdf (PDF não conferido).
+    Fora de uma execução (iniciar ... concluir) nada é gravado; uma falha do banco vai para o log
+    e desliga o histórico até a próxima execução, sem interromper a digitação.
+    """
+    CAMINHO = os.path.join("AutoSiget3000", "historico.sqlite3")
+    VERSAO = 1
+    RESULTADO_TECLA = {"F10": "ok", "F9": "repetida", "F12": "abortada"}  # tecla que encerrou a tentativa
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS execucoes (
+            id INTEGER PRIMARY KEY, inicio REAL NOT NULL, fim REAL, modulo TEXT NOT NULL,
+            interface TEXT NOT NULL, csv_hash TEXT, operador TEXT, host TEXT, driver TEXT, resultado TEXT);
+        CREATE TABLE IF NOT EXISTS blocos (
+            id INTEGER PRIMARY KEY, execucao INTEGER NOT NULL REFERENCES execucoes(id),
+            id_bloco TEXT NOT NULL, linha TEXT, faixas INTEGER, inicio REAL NOT NULL, fim REAL, resultado TEXT);
+        CREATE TABLE IF NOT EXISTS faixas (
+            id INTEGER PRIMARY KEY, execucao INTEGER NOT NULL REFERENCES execucoes(id),
+            bloco INTEGER REFERENCES blocos(id), id_bloco TEXT, linha TEXT, n_linha INTEGER, faixa INTEGER,
+            inicio REAL NOT NULL, digitada REAL, fim REAL, resultado TEXT);
+        CREATE TABLE IF NOT EXISTS osos (
+            id INTEGER PRIMARY KEY, execucao INTEGER NOT NULL REFERENCES execucoes(id),
+            oso TEXT, linha TEXT, tipo TEXT, pdf TEXT, inicio REAL NOT NULL, impressa REAL, fim REAL,
+            pdf_ok INTEGER, resultado TEXT);
+        CREATE INDEX IF NOT EXISTS execucoes_inicio ON execucoes(inicio);
+        CREATE INDEX IF NOT EXISTS execucoes_csv ON execucoes(csv_hash);
+        CREATE INDEX IF NOT EXISTS blocos_execucao ON blocos(execucao);
+        CREATE INDEX IF NOT EXISTS blocos_id_bloco ON blocos(id_bloco);
+        CREATE INDEX IF NOT EXISTS faixas_execucao ON faixas(execucao);
+        CREATE INDEX IF NOT EXISTS faixas_linha ON faixas(linha);
+        CREATE INDEX IF NOT EXISTS osos_execucao ON osos(execucao, pdf);
+        CREATE INDEX IF NOT EXISTS osos_oso ON osos(oso);
+    """
+    # Tentativas de faixa e de OSO num formato só (consultas agregadas)
+    ITENS = """
+        WITH itens AS (
+            SELECT execucao, 'faixa' AS item, linha, inicio, fim, resultado FROM faixas
+            UNION ALL
+            SELECT execucao, 'oso', linha, inicio, fim, resultado FROM osos)
+    """
+    # nome -> (descrição, cabeçalho, SQL com um parâmetro: o limite de linhas)
+    # As agregadas só consideram o driver pyautogui (ensaios com gravação/nulo ficam de fora)
+    CONSULTAS = {
+        "execucoes": (
+            "Últimas execuções",
+            ["Id", "Início", "Módulo", "Interface", "Driver", "Operador", "Duração (s)", "Resultado",
+             "Blocos", "Faixas ok", "OSOs ok", "CSV"],
+            """SELECT e.id, datetime(e.inicio, 'unixepoch', 'localtime'), e.modulo, e.interface, e.driver,
+                      e.operador, round(e.fim - e.inicio, 1), e.resultado,
+                      (SELECT count(*) FROM blocos b WHERE b.execucao = e.id),
+                      (SELECT count(*) FROM faixas f WHERE f.execucao = e.id AND f.resultado = 'ok'),
+                      (SELECT count(*) FROM osos o WHERE o.execucao = e.id AND o.resultado = 'ok'),
+                      substr(e.csv_hash, 1, 12)
+               FROM execucoes e ORDER BY e.id DESC LIMIT ?"""),
+        "vazao": (
+            "Vazão por dia (faixas/OSOs concluídas por hora de digitação, esperas incluídas)",
+            ["Dia", "Item", "Execuções", "Concluídas", "Repetidas", "Minutos", "Por hora"],
+            ITENS + """
+               SELECT date(e.inicio, 'unixepoch', 'localtime') AS dia, i.item, count(DISTINCT e.id),
+                      sum(i.resultado = 'ok'), sum(i.resultado = 'repetida'), round(sum(i.fim - i.inicio) / 60, 1),
+                      round(3600 * sum(i.resultado = 'ok') / nullif(sum(i.fim - i.inicio), 0))
+               FROM execucoes e JOIN itens i ON i.execucao = e.id
+               WHERE e.driver = 'pyautogui' AND i.fim IS NOT NULL
+               GROUP BY dia, i.item ORDER BY dia DESC, i.item LIMIT ?"""),
+        "linhas-lentas": (
+            "Linhas mais lentas (tempo médio por faixa)",
+            ["Linha", "Faixas", "Digitação (s)", "Até o F10 (s)", "Repetidas", "Execuções"],
+            """SELECT f.linha, count(*), round(avg(f.digitada - f.inicio), 2), round(avg(f.fim - f.inicio), 2),
+                      sum(f.resultado = 'repetida'), count(DISTINCT f.execucao)
+               FROM faixas f JOIN execucoes e ON e.id = f.execucao
+               WHERE e.driver = 'pyautogui' AND f.fim IS NOT NULL AND f.digitada IS NOT NULL
+               GROUP BY f.linha ORDER BY avg(f.fim - f.inicio) DESC LIMIT ?"""),
+        "repeticoes": (
+            "Repetições (F9) por operador",
+            ["Operador", "Execuções", "Tentativas", "Repetidas (F9)", "% repetidas", "Abortadas (F12)", "Sem PDF"],
+            ITENS + """
+               SELECT e.operador, count(DISTINCT e.id), count(*), sum(i.resultado = 'repetida'),
+                      round(100.0 * sum(i.resultado = 'repetida') / count(*), 1),
+                      sum(i.resultado = 'abortada'), sum(i.resultado = 'sem_pdf')
+               FROM execucoes e JOIN itens i ON i.execucao = e.id
+               WHERE e.driver = 'pyautogui'
+               GROUP BY e.operador ORDER BY sum(i.resultado = 'repetida') DESC LIMIT ?"""),
+    }
+
+    def __init__(self, log, driver, interface, caminho=None):
+        self.log = log              # save(): falhas do banco
+        self.driver = driver        # função que retorna o driver de entrada atual (nome gravado na execução)
+        self.interface = interface  # "cli" ou "gui"
+        self.caminho = caminho or Historico.CAMINHO
+        self.conexao = None
+        self.execucao = None  # id da execução em andamento (None = nada é gravado)
+        self.bloco = None     # id do bloco em andamento
+        self.trava = threading.Lock()  # a conexão é compartilhada com o VerificadorPDF
+
+    def _conectar(self):
+        if self.conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            if conexao.execute("PRAGMA user_version").fetchone()[0] < Historico.VERSAO:
+                conexao.executescript(Historico.ESQUEMA)
+                conexao.execute(f"PRAGMA user_version={Historico.VERSAO}")
+            self.conexao = conexao
+        return self.conexao
+
+    def _gravar(self, sql, parametros):
+        """Executa um INSERT/UPDATE e retorna o id da linha (None se o banco falhar)."""
+        with self.trava:
+            try:
+                return self._conectar().execute(sql, parametros).lastrowid
+            except (sqlite3.Error, OSError) as e:  # banco corrompido/travado, pasta sem permissão, disco cheio
+                self.execucao = self.bloco = None
+                self.log.save(f"HISTORICO desligado nesta execução: {e}")
+                return None
+
+    @staticmethod
+    def operador():
+        try:
+            return getpass.getuser()
+        except (OSError, KeyError, ImportError):
+            return None
+
+    def iniciar(self, modulo, hash_csv=None):
+        """Abre o registro de uma execução ('linha' ou 'pdf')."""
+        self.execucao = self.bloco = None
+        self.execucao = self._gravar(
+            "INSERT INTO execucoes (inicio, modulo, interface, csv_hash, operador, host, driver) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), modulo, self.interface, hash_csv, Historico.operador(), socket.gethostname(),
+             self.driver().nome))
+
+    def concluir(self, resultado):
+        """Fecha a execução (e o bloco que ficou aberto) com 'resultado'."""
+        if self.execucao is None:
+            return
+        self.concluirBloco(resultado)
+        self._gravar("UPDATE execucoes SET fim = ?, resultado = ? WHERE id = ?", (time.time(), resultado, self.execucao))
+        self.execucao = None
+
+    def iniciarBloco(self, linhas, bloco):
+        if self.execucao is None:
+            return
+        self.concluirBloco("abortada")
+        self.bloco = self._gravar(
+            "INSERT INTO blocos (execucao, id_bloco, linha, faixas, inicio) VALUES (?, ?, ?, ?, ?)",
+            (self.execucao, bloco["id_bloco"], linhas[bloco["inicio"]].linha, bloco["count"], time.time()))
+
+    def concluirBloco(self, resultado="ok"):
+        if self.bloco is None:
+            return
+        self._gravar("UPDATE blocos SET fim = ?, resultado = ? WHERE id = ?", (time.time(), resultado, self.bloco))
+        self.bloco = None
+
+    def faixa(self, row, offset, inicio, digitada, resultado):
+        """Uma tentativa de faixa: 'inicio' antes da 1ª tecla, 'digitada' após a última (None se abortada)."""
+        if self.execucao is None:
+            return
+        self._gravar(
+            "INSERT INTO faixas (execucao, bloco, id_bloco, linha, n_linha, faixa, inicio, digitada, fim, resultado)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.execucao, self.bloco, row.id_bloco, row.linha, row.n_linha, offset + 1, inicio, digitada,
+             time.time(), resultado))
+
+    def iniciarOso(self, row, tipo, nome_pdf):
+        """Abre uma tentativa de OSO e retorna o id dela (None fora de uma execução)."""
+        if self.execucao is None:
+            return None
+        return self._gravar(
+            "INSERT INTO osos (execucao, oso, linha, tipo, pdf, inicio) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.execucao, row["oso_dig"], row["linha"], tipo, nome_pdf, time.time()))
+
+    def concluirOso(self, id_oso, impressa, pdf_salvo, resultado):
+        """
+        Fecha a tentativa 'id_oso'. No pipeline 'pdf_salvo' é None e a conferência chega por
+        pdfConferido (antes ou depois deste fechamento): um F10 sem PDF fica como sem_pdf.
+        """
+        if id_oso is None:
+            return
+        self._gravar(
+            "UPDATE osos SET impressa = ?, fim = ?, pdf_ok = coalesce(?, pdf_ok),"
+            " resultado = CASE WHEN ? = 'ok' AND coalesce(?, pdf_ok) = 0 THEN 'sem_pdf' ELSE ? END WHERE id = ?",
+            (impressa, time.time(), pdf_salvo, resultado, pdf_salvo, resultado, id_oso))
+
+    def pdfConferido(self, nome_pdf, salvo):
+        """Resultado do VerificadorPDF para a última tentativa da OSO de 'nome_pdf'."""
+        if self.execucao is None:
+            return
+        self._gravar(
+            "UPDATE osos SET pdf_ok = ?, resultado = CASE WHEN ? = 0 AND resultado = 'ok' THEN 'sem_pdf' ELSE resultado END"
+            " WHERE id = (SELECT max(id) FROM osos WHERE execucao = ? AND pdf = ?)",
+            (int(salvo), int(salvo), self.execucao, nome_pdf))
+
+    def consultar(self, nome, limite=20):
+        """(descrição, cabeçalho, linhas) da consulta 'nome' (ver CONSULTAS)."""
+        descricao, cabecalho, sql = Historico.CONSULTAS[nome]
+        with self.trava:
+            return descricao, cabecalho, self._conectar().execute(sql, (limite,)).fetchall()
+
+# -------------------------
+# Índice da pasta FQHs
+# -------------------------
+class CatalogoPDF:
+    """
+    Índice da pasta FQHs (nome do PDF -> (tamanho, mtime_ns)), montado com uma única passada de
+    os.scandir no 1º uso e atualizado arquivo a arquivo (registrar) conforme os PDFs são conferidos.
+    A validade (pdfValido) é lida uma vez por versão do arquivo.
+    """
+    PASTA = os.path.join("AutoSiget3000", "FQHs")
+
+    def __init__(self, pasta=None):
+        self.pasta = pasta or CatalogoPDF.PASTA
+        self.arquivos = None  # montado no 1º uso
+        self.validos = {}     # nome -> ((tamanho, mtime_ns), válido)
+        self.trava = threading.Lock()
+
+    def _montar(self):
+        self.arquivos = {}
+        try:
+            with os.scandir(self.pasta) as it:
+                for item in it:
+                    if item.is_file() and item.name.lower().endswith(".pdf"):
+                        st = item.stat()
+                        self.arquivos[item.name] = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+
+    def registrar(self, nome_pdf):
+        """Atualiza só a entrada 'nome_pdf' (após salvar/conferir um PDF)."""
+        estado = estadoArquivo(os.path.join(self.pasta, nome_pdf))
+        with self.trava:
+            if self.arquivos is None:
+                self._montar()
+            if estado is None:
+                self.arquivos.pop(nome_pdf, None)
+            else:
+                self.arquivos[nome_pdf] = estado
+
+    def existe(self, nome_pdf):
+        """True se o PDF está na pasta e passa na conferência de cabeçalho/final."""
+        with self.trava:
+            if self.arquivos is None:
+                self._montar()
+            estado = self.arquivos.get(nome_pdf)
+            if estado is None:
+                return False
+            cache = self.validos.get(nome_pdf)
+            if cache is None or cache[0] != estado:
+                cache = (estado, pdfValido(os.path.join(self.pasta, nome_pdf)))
+                self.validos[nome_pdf] = cache
+            return cache[1]
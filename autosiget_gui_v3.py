@@ -1,57 +1,524 @@
 
+from __future__ import annotations  # anotações "ft.Page" não exigem o flet carregado
+
 # Bibliotecas nativas
+import time
+INICIO_SCRIPT = time.perf_counter()  # referência do --startup-profile
+
+import argparse
+import atexit
 import csv
+import json
 import os
-import time
+import queue
+import socket
+import sys
+from collections import deque
+from abc import ABC, abstractmethod
 from datetime import datetime
 import threading
+from typing import NamedTuple
+
+# Módulo do projeto, compartilhado com o modo console
+import autosiget_comum as comum
+from autosiget_comum import (PAUSAS_PADRAO, CatalogoPDF, Diario, Historico, Plano, Rastro, SnapshotBlocos,
+                             ValidadorCsv)
 
-# Bibliotecas externas
-import pyautogui
-import keyboard
-from tabulate import tabulate
-import flet as ft
+# Bibliotecas externas (importadas sob demanda)
+# keyboard: EscutadorModel.iniciar | tabulate: 1ª tabela | numpy: ValidadorCsv.validar (autosiget_comum)
+# pyperclip (opcional): DriverPyAutoGUIModel.colar; sem ele o texto é digitado
+# flet: carregarFlet(), ao abrir a janela
+ft = None
+
+def carregarFlet():
+    """Importa o flet (só necessário para as Views)"""
+    global ft
+    if ft is None:
+        import flet
+        ft = flet
+    return ft
+
+def tabulate(*args, **kwargs):
+    """Importa o tabulate no 1º uso e se substitui pela função real"""
+    global tabulate
+    from tabulate import tabulate as _tabulate
+    tabulate = _tabulate
+    return _tabulate(*args, **kwargs)
+
+class PerfilInicioModel:
+    """Marcas de tempo do carregamento do script até a 1ª janela (adaptado da classe PerfilInicio)"""
+    ativo = False
+    marcas = []
+    
+    @staticmethod
+    def marcar(etapa):
+        if PerfilInicioModel.ativo:
+            PerfilInicioModel.marcas.append((etapa, time.perf_counter() - INICIO_SCRIPT))
+    
+    @staticmethod
+    def relatorio(etapa_final):
+        if not PerfilInicioModel.ativo:
+            return
+        PerfilInicioModel.marcar(etapa_final)
+        PerfilInicioModel.ativo = False
+        print("Tempo de inicialização (desde o carregamento do script):")
+        anterior = 0.0
+        for etapa, t in PerfilInicioModel.marcas:
+            print(f"  {etapa:<28} {t * 1000:8.1f} ms  (+{(t - anterior) * 1000:.1f} ms)")
+            anterior = t
+        carregados = [m for m in ("flet", "pyautogui", "keyboard", "tabulate") if m in sys.modules]
+        print(f"  Bibliotecas já carregadas: {', '.join(carregados) or 'nenhuma'}")
 
 # -------------------------
 # MODEL - Lógica de Negócio
 # -------------------------
 
+class ExecucaoCancelada(Exception):
+    """Levantada por qualquer digitação ou pausa do driver de entrada depois que F12 é pressionado"""
+
+class OrcamentoLatenciaModel:
+    """Pausas intencionais (por tipo) x trabalho real de uma execução (adaptado da classe OrcamentoLatencia)"""
+    TIPOS = {
+        "acao": "Pausa após cada ação (PAUSE)",
+        "tecla": "Intervalo entre teclas",
+        "pausa": "Pausas de acomodação",
+        "arquivo": "Espera pelo PDF",
+        "operador": "Espera pelo operador (F10)",
+    }
+    
+    def __init__(self):
+        self.trava = threading.Lock()  # somado pela thread da execução; lido pela da interface
+        self.iniciar()
+    
+    def iniciar(self):
+        """Zera os contadores (início de cada execução)"""
+        with self.trava:
+            self.inicio = time.perf_counter()
+            self.segundos = dict.fromkeys(self.TIPOS, 0.0)
+    
+    def somar(self, tipo, segundos):
+        with self.trava:
+            self.segundos[tipo] += segundos
+    
+    def totais(self, dorme=True):
+        """[(tipo, segundos)] de cada pausa, mais o trabalho real e o total"""
+        with self.trava:
+            relogio = time.perf_counter() - self.inicio
+            segundos = dict(self.segundos)
+        pausas = sum(s for tipo, s in segundos.items() if tipo != "operador")
+        trabalho = max(0.0, relogio - segundos["operador"] - (pausas if dorme else 0.0))
+        totais = list(segundos.items()) + [("trabalho", trabalho)]
+        return totais + [("total", sum(s for _, s in totais))]
+    
+    def linhas(self, entrada):
+        """Texto do relatório para o painel de log e a linha para o arquivo de log"""
+        totais = self.totais(entrada.dorme)
+        total = totais[-1][1] or 1.0
+        rotulos = dict(self.TIPOS, trabalho="Trabalho real (teclas, log, disco)", total="Total")
+        texto = [f"Orçamento de latência (driver {entrada.nome}{'' if entrada.dorme else ', pausas simuladas'}):"]
+        texto += [f"  {rotulos[tipo]}: {s:.2f}s ({s / total:.0%})" for tipo, s in totais]
+        return texto, "ORCAMENTO_LATENCIA " + " ".join(f"{tipo}={s:.2f}s" for tipo, s in totais)
+
+class RastroModel(Rastro):
+    """
+    Trechos (spans) de uma execução no formato Chrome Trace Event (adaptado da classe Rastro).
+    Usa o relógio do driver de entrada atual (simulado no driver de gravação)
+    """
+    
+    def __init__(self, config):
+        super().__init__(lambda: config.entrada)
+
+class DriverEntradaModel(ABC):
+    """
+    Interface dos drivers de entrada (adaptado da classe DriverEntrada).
+    Cada write/press/hotkey termina com a pausa "acao" do perfil; toda pausa entra no orçamento.
+    """
+    nome = "base"
+    dorme = False   # as pausas gastam tempo de relógio de verdade
+    digita = False  # as teclas chegam de fato ao SIGET (só então o diário registra progresso)
+    
+    def __init__(self, cancelamento=None, orcamento=None, rastro=None):
+        # Sinal compartilhado com o EscutadorModel: marcado no instante do F12
+        self.cancelamento = cancelamento if cancelamento is not None else threading.Event()
+        self.orcamento = orcamento if orcamento is not None else OrcamentoLatenciaModel()
+        self.rastro = rastro  # RastroModel: marca as pausas explícitas
+    
+    def checar(self):
+        if self.cancelamento.is_set():
+            raise ExecucaoCancelada()
+    
+    @staticmethod
+    def pausaAcao():
+        return PerfilTempoModel.pausas()["acao"]
+    
+    def agora(self):
+        """Relógio do driver (s): o do sistema, ou o simulado no driver de gravação"""
+        return time.perf_counter()
+    
+    @abstractmethod
+    def write(self, teclas, interval=0.0):
+        ...
+    
+    @abstractmethod
+    def press(self, tecla, presses=1, interval=0.0):
+        ...
+    
+    @abstractmethod
+    def hotkey(self, *teclas):
+        ...
+    
+    @abstractmethod
+    def colar(self, texto):
+        """Cola 'texto' com Ctrl+V pela área de transferência; False se ela não estiver acessível"""
+    
+    @abstractmethod
+    def sleep(self, segundos, tipo="pausa"):
+        ...
+    
+    estadoArquivo = staticmethod(comum.estadoArquivo)  # (tamanho, mtime_ns) ou None
+    
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        """Espera o arquivo existir, diferir de 'anterior' e parar de crescer; False no timeout"""
+        limite = time.monotonic() + timeout
+        ultimo = None
+        desde = time.monotonic()
+        while True:
+            atual = self.estadoArquivo(caminho)
+            agora = time.monotonic()
+            if atual != ultimo:
+                ultimo, desde = atual, agora
+            elif atual is not None and atual != anterior and atual[0] > 0 and agora - desde >= estavel:
+                return True
+            if agora >= limite:
+                return False
+            self.sleep(intervalo, "arquivo")
+
+class DriverPyAutoGUIModel(DriverEntradaModel):
+    """
+    Driver real via pyautogui, tecla a tecla para o F12 interromper entre duas teclas (adaptado da classe DriverPyAutoGUI).
+    O PAUSE do pyautogui fica em 0: a pausa após cada ação é dormida aqui, cancelável e contada.
+    """
+    nome = "pyautogui"
+    dorme = True
+    digita = True
+    
+    def __init__(self, cancelamento=None, orcamento=None, failsafe=True, rastro=None):
+        super().__init__(cancelamento, orcamento, rastro)
+        self.failsafe = failsafe  # mouse no canto superior esquerdo aborta a digitação
+        self._pyautogui = None
+        self._pyperclip = None  # False = indisponível nesta sessão (não tenta de novo)
+    
+    @property
+    def pyautogui(self):
+        if self._pyautogui is None:
+            import pyautogui
+            pyautogui.PAUSE = 0.0
+            pyautogui.FAILSAFE = self.failsafe
+            self._pyautogui = pyautogui
+        return self._pyautogui
+    
+    def _enviar(self, funcao, *teclas):
+        """Chama o pyautogui; o failsafe (mouse num canto da tela) encerra a execução como o F12"""
+        self.checar()
+        try:
+            funcao(*teclas, _pause=False)
+        except self.pyautogui.FailSafeException:
+            self.cancelamento.set()
+            raise ExecucaoCancelada("failsafe do pyautogui: mouse num canto da tela")
+    
+    def write(self, teclas, interval=0.0):
+        press = self.pyautogui.press
+        for t in teclas:
+            self._enviar(press, t)
+            self.sleep(interval, "tecla")
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def press(self, tecla, presses=1, interval=0.0):
+        press = self.pyautogui.press
+        for _ in range(presses):
+            self._enviar(press, tecla)
+            self.sleep(interval, "tecla")
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def hotkey(self, *teclas):
+        self._enviar(self.pyautogui.hotkey, *teclas)
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def colar(self, texto):
+        self.checar()
+        if self._pyperclip is None:
+            try:
+                import pyperclip
+                self._pyperclip = pyperclip
+            except ImportError:
+                self._pyperclip = False
+        if not self._pyperclip:
+            return False
+        try:
+            self._pyperclip.copy(texto)
+            if self._pyperclip.paste() != texto:
+                return False
+        except self._pyperclip.PyperclipException:
+            return False
+        self.hotkey("ctrl", "v")
+        return True
+    
+    def sleep(self, segundos, tipo="pausa"):
+        self.orcamento.somar(tipo, segundos)
+        inicio = time.perf_counter()
+        try:
+            # Event.wait retorna assim que o F12 marca o cancelamento
+            if self.cancelamento.wait(segundos):
+                raise ExecucaoCancelada()
+        finally:
+            if tipo == "pausa" and self.rastro is not None and self.rastro.ativo:
+                self.rastro.marcar("sleep", "pausa", inicio, time.perf_counter(), {"s": segundos})
+
+class DriverGravacaoModel(DriverEntradaModel):
+    """Grava o fluxo de teclas com timestamp, sem enviar nem dormir (adaptado da classe DriverGravacao)"""
+    nome = "gravacao"
+    
+    def __init__(self, guardar=True, cancelamento=None, orcamento=None, rastro=None):
+        super().__init__(cancelamento, orcamento, rastro)
+        self.guardar = guardar  # False = mantém apenas os contadores
+        self.eventos = []
+        self.total_teclas = 0
+        self.t0 = time.perf_counter()
+        self.tempo_simulado = 0.0
+    
+    def _agora(self):
+        return time.perf_counter() - self.t0 + self.tempo_simulado
+    
+    def agora(self):
+        return self._agora()
+    
+    def _tecla(self, tecla, interval):
+        self.checar()
+        self.total_teclas += 1
+        if self.guardar:
+            self.eventos.append((self._agora(), "tecla", tecla))
+        self.tempo_simulado += interval
+    
+    def write(self, teclas, interval=0.0):
+        for t in teclas:
+            self._tecla(t, interval)
+        self.orcamento.somar("tecla", len(teclas) * interval)
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def press(self, tecla, presses=1, interval=0.0):
+        for _ in range(presses):
+            self._tecla(tecla, interval)
+        self.orcamento.somar("tecla", presses * interval)
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def hotkey(self, *teclas):
+        self.checar()
+        self.total_teclas += 1
+        if self.guardar:
+            self.eventos.append((self._agora(), "atalho", "+".join(teclas)))
+        self.sleep(self.pausaAcao(), "acao")
+    
+    def colar(self, texto):
+        self.checar()
+        if self.guardar:
+            self.eventos.append((self._agora(), "colar", texto))
+        self.hotkey("ctrl", "v")
+        return True
+    
+    def sleep(self, segundos, tipo="pausa"):
+        self.checar()
+        self.orcamento.somar(tipo, segundos)
+        if self.guardar:
+            self.eventos.append((self._agora(), "pausa", segundos))
+        if tipo == "pausa" and self.rastro is not None and self.rastro.ativo:
+            inicio = self._agora()
+            self.rastro.marcar("sleep", "pausa", inicio, inicio + segundos, {"s": segundos})
+        self.tempo_simulado += segundos
+    
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        # Não espera: registra a espera e responde com o que já está no disco
+        self.checar()
+        if self.guardar:
+            self.eventos.append((self._agora(), "arquivo", caminho))
+        atual = self.estadoArquivo(caminho)
+        return atual is not None and atual != anterior
+    
+    def teclas(self):
+        """Sequência de teclas/atalhos gravada (sem as pausas e esperas por arquivo)"""
+        return [valor for _, tipo, valor in self.eventos if tipo in ("tecla", "atalho")]
+
+class DriverNuloModel(DriverEntradaModel):
+    """Descarta toda entrada e não dorme (adaptado da classe DriverNulo)"""
+    nome = "nulo"
+    
+    def write(self, teclas, interval=0.0):
+        self.checar()
+    
+    def press(self, tecla, presses=1, interval=0.0):
+        self.checar()
+    
+    def hotkey(self, *teclas):
+        self.checar()
+    
+    def colar(self, texto):
+        self.checar()
+        return True
+    
+    def sleep(self, segundos, tipo="pausa"):
+        self.checar()
+    
+    def aguardarArquivo(self, caminho, anterior=None, timeout=30.0, estavel=0.5, intervalo=0.1):
+        self.checar()
+        atual = self.estadoArquivo(caminho)
+        return atual is not None and atual != anterior
+
+DRIVERS_ENTRADA = {d.nome: d for d in (DriverPyAutoGUIModel, DriverGravacaoModel, DriverNuloModel)}
+
 class ConfigModel:
     """Model para configurações globais"""
     def __init__(self):
         self.parar_execucao = False
-        self.LOG_DIR = "AutoSiget3000/LOGs"
-        os.makedirs(self.LOG_DIR, exist_ok=True)
+        self.cancelamento = threading.Event()  # marcado pelo F12; honrado por toda digitação/pausa
+        self.modo_rajada = True       # digita cada faixa em uma única sequência de teclas
+        self.modo_colar = False       # cola (Ctrl+V) o n.º da OSO e o nome do PDF em vez de digitar
+        self.pdf_estavel = 0.5        # o PDF é dado como salvo quando o tamanho fica parado por este tempo (s)
+        self.avanco_automatico = False  # digita as faixas do bloco em sequência, parando só no fim do bloco
+        self.pausa_entre_faixas = 0.5   # avanço automático: acomodação (s) do SIGET entre uma faixa e a próxima
+        self.parar_a_cada = 0           # avanço automático: também para a cada N faixas (0 = só no fim do bloco)
+        self.failsafe = True            # pyautogui: mouse no canto superior esquerdo aborta a digitação
+        self.orcamento = OrcamentoLatenciaModel()  # pausas x trabalho real da execução atual
+        self.rastro = RastroModel(self)            # trechos da execução atual (--rastro)
+        # driver de entrada (ver DRIVERS_ENTRADA); as pausas vêm do PerfilTempoModel
+        self.entrada = DriverPyAutoGUIModel(self.cancelamento, self.orcamento, self.failsafe, self.rastro)
+        self.LOG_DIR = "AutoSiget3000/LOGs"  # criada pelo EscritorLogModel na 1ª gravação
+        # segundos + pid: duas execuções iniciadas no mesmo minuto não dividem o arquivo
         self.nome_arquivo_log = os.path.join(
             self.LOG_DIR, 
-            f"log_{datetime.now().strftime('%Y%m%d_%H.%M')}.txt"
+            f"log_{datetime.now().strftime('%Y%m%d_%H.%M.%S')}_{os.getpid()}.txt"
         )
 
+class EscritorLogModel:
+    """Model para gravação do log em segundo plano (adaptado da classe EscritorLog)"""
+    def __init__(self, caminho: str, limite_linhas: int = 50, intervalo_flush: float = 0.5):
+        self.caminho = caminho
+        self.limite_linhas = limite_linhas
+        self.intervalo_flush = intervalo_flush
+        self.fila = queue.Queue()
+        self.thread = None
+        self.trava = threading.Lock()
+    
+    def escrever(self, linha: str):
+        """Enfileira uma linha (não bloqueia)"""
+        if self.thread is None:
+            self._iniciar()
+        self.fila.put(linha)
+    
+    def flush(self, timeout: float = 2.0):
+        """Bloqueia até que as linhas já enfileiradas estejam gravadas no disco"""
+        if self.thread is None:
+            return
+        feito = threading.Event()
+        self.fila.put(feito)
+        feito.wait(timeout)
+    
+    def fechar(self, timeout: float = 2.0):
+        """Grava o que falta e encerra a thread"""
+        with self.trava:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.fila.put(None)
+        thread.join(timeout)
+    
+    def _iniciar(self):
+        with self.trava:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._executar, name="EscritorLog", daemon=True)
+                self.thread.start()
+    
+    def _executar(self):
+        lote = []
+        limite_tempo = None
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            while True:
+                espera = None if not lote else max(0.0, limite_tempo - time.monotonic())
+                try:
+                    item = self.fila.get(timeout=espera)
+                except queue.Empty:
+                    item = False  # limite de tempo atingido
+                
+                if isinstance(item, str):
+                    if not lote:
+                        limite_tempo = time.monotonic() + self.intervalo_flush
+                    lote.append(item)
+                    if len(lote) < self.limite_linhas:
+                        continue
+                
+                if lote:
+                    f.write("\n".join(lote) + "\n")
+                    f.flush()
+                    lote = []
+                
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    return
+
 class LogModel:
     """Model para gerenciamento de logs (adaptado da classe Log)"""
     def __init__(self, config: ConfigModel):
         self.config = config
         self.log_callbacks = []
+        self.escritor = EscritorLogModel(config.nome_arquivo_log)
+        atexit.register(self.escritor.fechar)
     
     def add_callback(self, callback):
         """Adiciona callback para atualização da UI"""
         self.log_callbacks.append(callback)
     
+    def remove_callback(self, callback):
+        """Remove o callback de uma view que foi fechada"""
+        if callback in self.log_callbacks:
+            self.log_callbacks.remove(callback)
+    
     def save(self, mensagem: str):
-        """Registra eventos detalhados no arquivo de log (arquivo)."""
+        """Registra eventos detalhados no arquivo de log (gravação em segundo plano)."""
+        rastro = self.config.rastro
+        inicio = rastro.agora() if rastro.ativo else None
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         linha = f"[{timestamp}] {mensagem}"
-        with open(self.config.nome_arquivo_log, "a", encoding="utf-8") as f:
-            f.write(linha + "\n")
+        self.escritor.escrever(linha)
+        if inicio is not None:
+            rastro.marcar("log", "log", inicio, rastro.agora())
+    
+    def flush(self):
+        """Força a gravação das linhas pendentes (F12 / saída)"""
+        self.escritor.flush()
     
     def user(self, msg: str):
         """Reporte sucinto para o usuário (console e UI)."""
         print(msg)
         self.save(f"[UI] {msg}")
         # Notifica callbacks (UI)
-        for callback in self.log_callbacks:
+        for callback in list(self.log_callbacks):  # a view pode sair (voltar) durante o envio
             callback(msg)
 
+# Colunas do CSV: campo da FaixaModel -> nomes aceitos no cabeçalho (o 1º é o nome oficial)
+COLUNAS_CSV = {
+    "faixaInicio": ("FaixaInicio",),
+    "faixaFinal": ("FaixaFinal",),
+    "intervalo": ("Intervalo", "Interv"),
+    "percurso": ("Percurso", "Perc.", "Perc"),
+    "tempTerm": ("TempTerm", "T. Term"),
+    "frota": ("Frota",),
+    "linha": ("Linha",),
+    "dia": ("Dia",),
+    "sentido": ("Sentido",),
+    "oso": ("Oso",),
+    "linhaOso": ("LinhaOso",),
+}
+
 class UtilModel:
     """Model para funções utilitárias (adaptado da classe Util)"""
     @staticmethod
@@ -71,28 +538,228 @@ class UtilModel:
         if len(h) == 3 and h.isdigit():
             return f"0{h}"
         return h
+    
+    @staticmethod
+    def minutos(hora: str):
+        # 'HHMM' (ou 'HMM') -> minutos desde 00:00; -1 se não for um horário válido
+        if hora.isdigit() and 3 <= len(hora) <= 4:
+            h, m = int(hora[:-2]), int(hora[-2:])
+            if h < 24 and m < 60:
+                return h * 60 + m
+        return -1
+
+class FaixaModel(NamedTuple):
+    """Linha do CSV normalizada uma única vez no carregamento (adaptado da classe Faixa)"""
+    n_linha: int        # número da linha no arquivo (cabeçalho = 1)
+    id_bloco: str       # Linha_Dia_Sentido
+    faixaIni_dig: str
+    faixaFim_dig: str
+    faixaIni_log: str
+    faixaFim_log: str
+    ini_min: int        # minutos desde 00:00 (-1 se inválido)
+    fim_min: int
+    intervalo: str
+    percurso: str
+    tempTerm: str
+    frota: str
+    linha: str
+    dia: str
+    sentido: str
+    oso: str
+    linhaOso: str
+
+class PerfilTempoModel:
+    """
+    Pausas da digitação desta estação (adaptado da classe PerfilTempo).
+    Lê o perfil gravado por 'python app_4.0.py --calibrar' em AutoSiget3000/Perfis/<host>.json;
+    sem perfil valem os tempos padrão.
+    """
+    PASTA = os.path.join("AutoSiget3000", "Perfis")
+    PADRAO = PAUSAS_PADRAO  # definidos em autosiget_comum (os mesmos do console)
+    _valores = None
+    
+    @staticmethod
+    def caminho():
+        return os.path.join(PerfilTempoModel.PASTA, f"{socket.gethostname()}.json")
+    
+    @staticmethod
+    def pausas():
+        """Pausas em vigor (perfil desta estação sobre os padrões), lidas no 1º uso"""
+        if PerfilTempoModel._valores is None:
+            valores = dict(PerfilTempoModel.PADRAO)
+            try:
+                with open(PerfilTempoModel.caminho(), "r", encoding="utf-8") as f:
+                    gravadas = json.load(f).get("pausas", {})
+                valores.update({k: float(v) for k, v in gravadas.items() if k in valores})
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
+            PerfilTempoModel._valores = valores
+        return PerfilTempoModel._valores
+
+class DigitacaoModel:
+    """Model para digitação em rajada (adaptado da classe Digitacao)"""
+    @staticmethod
+    def compilarFaixa(faixaIni_dig, faixaFim_dig, Interv, tPerc, tTerm, frota, viradaIni=False, viradaFim=False):
+        # Campos separados por 'tab'; na virada de dia insere 'tab' + 'enter' entre pausas (float, em segundos)
+        p = PerfilTempoModel.pausas()
+        confirmar = [p["virada_antes"], "tab", "enter", p["virada_depois"]]
+        teclas = list(faixaIni_dig) + ["tab"]
+        if viradaIni:
+            teclas += confirmar
+        teclas += list(faixaFim_dig) + ["tab"]
+        if viradaFim:
+            teclas += confirmar
+        for valor in (Interv, tPerc, tTerm, frota):
+            teclas += list(valor) + ["tab"]
+        return teclas
+
+class EscutadorModel:
+    """Model para o hook único do teclado (adaptado da classe Escutador)"""
+    TECLAS = ("F9", "F10", "F12")
+    
+    def __init__(self, cancelamento: threading.Event, orcamento=None, rastro=None):
+        self.cancelamento = cancelamento
+        self.orcamento = orcamento  # soma a espera pelo operador (OrcamentoLatenciaModel)
+        self.rastro = rastro        # e a marca no rastro (RastroModel)
+        self.fila = queue.Queue()
+        self.pressionadas = set()
+        self.trava = threading.Lock()
+        self.ativo = False
+        self.teclado = None  # módulo keyboard, importado ao instalar o hook
+        self.automatico = None  # resposta automática (ex.: "F10"); None = usa o teclado
+    
+    def iniciar(self):
+        """Instala o hook (uma vez por sessão)"""
+        if self.automatico:
+            return
+        with self.trava:
+            if not self.ativo:
+                import keyboard
+                self.teclado = keyboard
+                keyboard.hook(self._evento)
+                self.ativo = True
+    
+    def _evento(self, ev):
+        # Executado na thread do hook; um evento por pressionamento (ignora repetição automática)
+        nome = (ev.name or "").upper()
+        if nome not in self.TECLAS:
+            return
+        if ev.event_type == self.teclado.KEY_DOWN:
+            if nome in self.pressionadas:
+                return
+            self.pressionadas.add(nome)
+            if nome == "F12":
+                self.cancelamento.set()  # interrompe na hora a digitação/pausa em andamento
+            self.fila.put(nome)
+        else:
+            self.pressionadas.discard(nome)
+    
+    def reiniciar(self):
+        """Descarta teclas pendentes e limpa o cancelamento (início de cada execução)"""
+        while True:
+            try:
+                self.fila.get_nowait()
+            except queue.Empty:
+                break
+        self.cancelamento.clear()
+    
+    def verificar(self):
+        """Consome (sem bloquear) as teclas pendentes; 'F12' tem prioridade"""
+        self.iniciar()
+        ultima = None
+        while True:
+            try:
+                tecla = self.fila.get_nowait()
+            except queue.Empty:
+                return ultima
+            if tecla == "F12":
+                return tecla
+            ultima = tecla
+    
+    def aguardar(self, teclas=TECLAS, timeout=None):
+        """Bloqueia até uma das teclas ser pressionada (descarta pressionamentos anteriores, exceto F12)"""
+        if self.automatico:
+            return self.automatico if self.automatico in teclas else teclas[0]
+        pendente = self.verificar()
+        if pendente == "F12" and "F12" in teclas:
+            return pendente
+        inicio = time.perf_counter()
+        try:
+            while True:
+                try:
+                    tecla = self.fila.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+                if tecla in teclas:
+                    return tecla
+        finally:
+            fim = time.perf_counter()
+            if self.orcamento is not None:
+                self.orcamento.somar("operador", fim - inicio)
+            if self.rastro is not None and self.rastro.ativo:
+                self.rastro.marcar("aguardar " + "/".join(teclas), "operador", inicio, fim)
+
+# Diário, snapshot e histórico: os mesmos do modo console (autosiget_comum)
+DiarioModel = Diario
+SnapshotBlocosModel = SnapshotBlocos
+
+class HistoricoModel(Historico):
+    """
+    Histórico de execuções, blocos, faixas e OSOs em SQLite (adaptado da classe Historico).
+    Mesmo banco e mesmo esquema da versão console, que também faz as consultas (--historico)
+    """
+    
+    def __init__(self, log_model: LogModel, config: ConfigModel, caminho=None):
+        super().__init__(log_model, lambda: config.entrada, "gui", caminho)
 
 class CSVModel:
     """Model para operações com CSV (adaptado da classe LCsv)"""
     def __init__(self, log_model: LogModel):
         self.log = log_model
     
+    @staticmethod
+    def colunasFaltando(fieldnames):
+        """Nomes oficiais das colunas obrigatórias ausentes (aceita os nomes alternativos)"""
+        presentes = set(fieldnames or [])
+        return [nomes[0] for nomes in COLUNAS_CSV.values() if not presentes.intersection(nomes)]
+    
     def load(self, caminho_csv: str):
-        """Carrega CSV e retorna linhas e fieldnames"""
+        """Carrega CSV e retorna linhas (FaixaModel) e fieldnames"""
         if not os.path.exists(caminho_csv):
             return None, None
         
+        intern = sys.intern
         try:
             with open(caminho_csv, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                fieldnames = [fn.strip() for fn in (reader.fieldnames or [])]
+                reader = csv.reader(f, delimiter=";")
+                fieldnames = [fn.strip() for fn in next(reader, [])]
+                posicoes = [
+                    next((fieldnames.index(n) for n in nomes if n in fieldnames), None)
+                    for nomes in COLUNAS_CSV.values()
+                ]
                 linhas = []
-                for row in reader:
-                    nova = {}
-                    for k, v in row.items():
-                        key = (k or "").strip()
-                        nova[key] = (v or "").strip()
-                    linhas.append(nova)
+                for valores in reader:
+                    if not valores:
+                        continue
+                    total = len(valores)
+                    # valores limpos e internados (os campos se repetem muito entre as linhas)
+                    ini, fim, interv, perc, term, frota, linha, dia, sentido, oso, linhaOso = [
+                        intern(valores[p].strip()) if p is not None and p < total else ""
+                        for p in posicoes
+                    ]
+                    ini_dig = UtilModel.formatHora_dig(ini)
+                    fim_dig = UtilModel.formatHora_dig(fim)
+                    linhas.append(FaixaModel(
+                        reader.line_num,
+                        intern(f"{linha}_{dia}_{sentido}"),
+                        ini_dig,
+                        fim_dig,
+                        intern(UtilModel.formatHora_log(ini)),
+                        intern(UtilModel.formatHora_log(fim)),
+                        UtilModel.minutos(ini_dig),
+                        UtilModel.minutos(fim_dig),
+                        interv, perc, term, frota, linha, dia, sentido, oso, linhaOso,
+                    ))
             
             self.log.save(f"CSV '{caminho_csv}' carregado. Registros: {len(linhas)}. Campos: {fieldnames}")
             return linhas, fieldnames
@@ -100,11 +767,15 @@ class CSVModel:
             self.log.user(f"Erro ao carregar CSV: {e}")
             return None, None
 
+# Validação prévia do CSV com o LogModel como registro (validar/resumo do autosiget_comum)
+ValidadorCsvModel = ValidadorCsv
+
 class ProgramaLinhaModel:
     """Model para programação de linha (adaptado da classe ProgramaLinha)"""
     def __init__(self, log_model: LogModel, config: ConfigModel):
         self.log = log_model
         self.config = config
+        self.compilador = PlanoModel(log_model, config)
     
     def genBlocos(self, linhas):
         """Gera blocos de programação"""
@@ -113,11 +784,7 @@ class ProgramaLinhaModel:
         inicio = 0
         
         for i, row in enumerate(linhas):
-            linha = row.get("Linha", row.get("Linha ", "")).strip()
-            dia = row.get("Dia", "").strip()
-            sentido = row.get("Sentido", "").strip()
-            
-            id_atual = f"{linha}_{dia}_{sentido}"
+            id_atual = row.id_bloco
             
             if chave_anterior is None:
                 chave_anterior = id_atual
@@ -142,163 +809,65 @@ class ProgramaLinhaModel:
                 "count": len(linhas) - inicio
             })
         
+        # Plano de virada de dia de cada bloco (lido pela digitação)
+        for bloco in blocos:
+            bloco["viradas"] = self.planejarViradas(linhas, bloco)
+        
         self.log.save(f"{len(blocos)} blocos gerados.")
         return blocos
     
-    def preenFaixa(self, row, linha_label, faixaFimAnterior=None):
-        """Preenche uma faixa horária (simulação de pyautogui)"""
-        
-        # --- Extração e Formatação ---
-        faixaIni_raw = row.get("FaixaInicio", row.get("FaixaInicio ", "")).strip()
-        faixaFim_raw = row.get("FaixaFinal", row.get("FaixaFinal ", "")).strip()
-        Interv = row.get("Interv", row.get("Interv", "")).strip()
-        tPerc = row.get("Percurso", row.get("Perc.", row.get("Perc", ""))).strip()
-        tTerm = row.get("TempTerm", row.get("T. Term", row.get("T. Term ", ""))).strip()
-        frota = row.get("Frota", "").strip()
-        
-        faixaIni_log = UtilModel.formatHora_log(faixaIni_raw)
-        faixaFim_log = UtilModel.formatHora_log(faixaFim_raw)
-        faixaIni_dig = UtilModel.formatHora_dig(faixaIni_raw)
-        faixaFim_dig = UtilModel.formatHora_dig(faixaFim_raw)
-        
-        # --- Simulação de PyAutoGUI ---
-        
-        # 1. Escreve FaixaInicio
-        pyautogui.write(faixaIni_dig)
-        self.log.save(f"[{linha_label}] escreveu FaixaInicio '{faixaIni_log}'")
+    @staticmethod
+    def planejarViradas(linhas, bloco):
+        """Par (viradaIni, viradaFim) de cada faixa do bloco, em minutos desde 00:00 (adaptado de ProgramaLinha.planejarViradas)"""
+        viradas = []
+        fim_anterior = -1
+        for row in linhas[bloco["inicio"]:bloco["fim"] + 1]:
+            viradaIni = 0 <= row.ini_min < fim_anterior
+            viradaFim = not viradaIni and 0 <= row.fim_min < row.ini_min
+            viradas.append((viradaIni, viradaFim))
+            if row.fim_min >= 0:
+                fim_anterior = row.fim_min
+        return tuple(viradas)
+    
+    def preenFaixa(self, row, linha_label, viradas=(False, False), ops=None):
+        """Preenche uma faixa horária executando as operações do plano (compiladas aqui se não vierem prontas)"""
         
-        # 2. Log para o usuário (tabela)
-        tabela = tabulate([[faixaIni_log, faixaFim_log, Interv, tPerc, tTerm, frota]],
+        # Log para o usuário (tabela)
+        tabela = tabulate([[row.faixaIni_log, row.faixaFim_log, row.intervalo, row.percurso, row.tempTerm, row.frota]],
                            headers=["F. Inicio", "F. Final", "Interv.", "T. Perc.", "T. Term", "Frota"],
                            tablefmt="rounded_grid")
         self.log.user(f"Preenchendo faixa:\n{tabela}")
         
-        # 3. Tab para FaixaFinal
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo FaixaFinal")
-        
-        faixaIniVerif = False
-        
-        # 4. Detecta virada de dia (FaixaInicio)
-        if faixaFimAnterior:
-            prev_ini = (faixaFimAnterior[0] or "").strip()
-            if prev_ini.isdigit() and faixaIni_raw.isdigit():
-                if int(faixaIni_raw) < int(prev_ini):
-                    self.log.save(f"[{linha_label}] virada detectada em Faixa Inicio")
-                    time.sleep(0.25)
-                    pyautogui.press("tab")
-                    pyautogui.press("enter")
-                    time.sleep(0.4)
-                    faixaIniVerif = True
-        
-        # 5. Escreve FaixaFinal
-        pyautogui.write(faixaFim_dig)
-        self.log.save(f"[{linha_label}] escreveu FaixaFinal '{faixaFim_log}'")
-        
-        # 6. Tab para Intervalo
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo Intervalo")
-        
-        # 7. Detecta virada de dia (FaixaFinal)
-        if faixaFimAnterior and not faixaIniVerif:
-            prev_fim = faixaIni_dig
-            if prev_fim.isdigit() and faixaFim_dig.isdigit():
-                if int(faixaFim_dig) < int(prev_fim):
-                    self.log.save(f"[{linha_label}] virada detectada em FaixaFinal")
-                    time.sleep(0.25)
-                    pyautogui.press("tab")
-                    pyautogui.press("enter")
-                    time.sleep(0.4)
-        
-        # 8. Escreve Intervalo
-        pyautogui.write(Interv)
-        self.log.save(f"[{linha_label}] escreveu Intervalo '{Interv}'")
-        time.sleep(0.1)
+        if ops is None:
+            ops = self.compilador.compilarFaixa(row, linha_label, viradas)
+        self.compilador.executar(ops)
         
-        # 9. Tab para Percurso
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo Tempo de Percurso")
-        time.sleep(0.1)
-        
-        # 10. Escreve Percurso
-        pyautogui.write(tPerc)
-        self.log.save(f"[{linha_label}] escreveu Percurso '{tPerc}'")
-        time.sleep(0.1)
-        
-        # 11. Tab para Terminal
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo Terminal")
-        time.sleep(0.1)
-        
-        # 12. Escreve Terminal
-        pyautogui.write(tTerm)
-        self.log.save(f"[{linha_label}] escreveu TempTerm '{tTerm}'")
-        time.sleep(0.1)
-        
-        # 13. Tab para Frota
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo Frota")
-        time.sleep(0.1)
-        
-        # 14. Escreve Frota
-        pyautogui.write(frota)
-        self.log.save(f"[{linha_label}] escreveu Frota '{frota}'")
-        time.sleep(0.1)
-        
-        # 15. Tab para Linha
-        pyautogui.press("tab")
-        self.log.save(f"[{linha_label}] tab → campo Linha (pronto para verificação)")
-        time.sleep(0.1)
-        
-        self.log.save(f"[{linha_label}] faixa preenchida ({faixaIni_log} → {faixaFim_log})")
         self.log.user(f"{linha_label} • Faixa preenchida | F10 para continuar | F9 para repetir | F12 para parar ")
 
+CatalogoPDFModel = CatalogoPDF  # índice da pasta FQHs (autosiget_comum)
+
 class PrintPDFModel:
     """Model para impressão de PDFs (adaptado da classe PrintPDF)"""
     def __init__(self, log_model: LogModel, config: ConfigModel):
         self.log = log_model
         self.config = config
+        self.compilador = PlanoModel(log_model, config)
     
     def tratarOSOs(self, osoBruta):
         """Trata e valida OSOs"""
         QuantidadeDeOsos = 0
         for row in osoBruta:
-            oso = row.get("Oso", row.get("Oso ", "")).strip()
-            if oso != "":
+            if row.oso != "":
                 QuantidadeDeOsos += 1
         
         osos = []
         
         for i, row in enumerate(osoBruta[:QuantidadeDeOsos]):
-            linha = row.get("LinhaOso", row.get("LinhaOso ", "")).strip()
-            oso = row.get("Oso", row.get("Oso ", "")).strip()
-            
-            if len(oso) == 6 and oso.isdigit():
-                fimOso = int(oso[4:])
-                
-                if fimOso == 0:
-                    oso_dig = oso[:4]
-                    linha_dig = linha[:4]
-                    osos.append({
-                        "n_oso": i + 1,
-                        "linha": linha_dig,
-                        "oso_dig": oso_dig,
-                        "oso": oso,
-                        "tipo": "BASE"
-                    })
-                else:
-                    oso_dig = oso[:4] + "-" + oso[4:]
-                    linha_dig = linha[:4] + "-" + linha[4:]
-                    osos.append({
-                        "n_oso": i + 1,
-                        "linha": linha_dig,
-                        "oso_dig": oso_dig,
-                        "oso": oso,
-                        "tipo": "DERIVADA"
-                    })
-            else:
-                self.log.user(f"OSO [{oso}] | formato inválido seguir o formato: [123456]")
+            dados = self.dadosOSO(row, i + 1)
+            if dados is None:
+                self.log.user(f"OSO [{row.oso}] | formato inválido seguir o formato: [123456]")
                 return None
+            osos.append(dados)
         
         filtroB = lambda x: x["tipo"] == "BASE"
         filtroD = lambda x: x["tipo"] == "DERIVADA"
@@ -308,65 +877,233 @@ class PrintPDFModel:
         self.log.user(f"{len(osos)} OSOs identificadas | B:{len(ososBase)} D:{len(ososDerivada)}")
         return osos
     
-    def imprimirPDF(self, row, fQH, OsoAtiva):
-        """Impressão de um PDF (simulação de pyautogui)"""
+    @staticmethod
+    def dadosOSO(row, n_oso):
+        """OSO da linha pronta para digitação, ou None fora do formato [123456] (adaptado de PrintPDF.dadosOSO)"""
+        linha = row.linhaOso
+        oso = row.oso
+        
+        if not (len(oso) == 6 and oso.isdigit()):
+            return None
+        
+        if int(oso[4:]) == 0:
+            return {"n_oso": n_oso, "linha": linha[:4], "oso_dig": oso[:4], "oso": oso, "tipo": "BASE"}
+        return {
+            "n_oso": n_oso,
+            "linha": linha[:4] + "-" + linha[4:],
+            "oso_dig": oso[:4] + "-" + oso[4:],
+            "oso": oso,
+            "tipo": "DERIVADA"
+        }
+    
+    @staticmethod
+    def nomePDF(row, fQH):
+        """Nome do PDF (sem extensão) salvo na pasta FQHs para a OSO"""
+        return f"{fQH} {row['linha']} {row['oso_dig']}"
+    
+    pdfValido = staticmethod(comum.pdfValido)  # cabeçalho %PDF- e final %%EOF
+    
+    def imprimirPDF(self, row, fQH, OsoAtiva, ops=None):
+        """Impressão de um PDF executando as operações do plano (compiladas aqui se não vierem prontas)"""
         
-        # --- Extração e Formatação ---
-        linha = row.get("linha", row.get("linha ", "")).strip()
-        oso = row.get("oso", row.get("oso ", "")).strip()
-        oso_dig = row.get("oso_dig", row.get("oso_dig ", "")).strip()
-        NomePDF = f"{fQH} {linha} {oso_dig}"
+        # --- Valores já tratados em tratarOSOs ---
+        oso_dig = row["oso_dig"]
+        NomePDF = self.nomePDF(row, fQH)
         caminho_pdf = os.path.join("AutoSiget3000", "FQHs", f"{NomePDF}.pdf")
+        estado = {"anterior": None, "salvo": False}
+        
+        def antesSalvar():
+            estado["anterior"] = self.config.entrada.estadoArquivo(caminho_pdf)  # F9 regrava um PDF que já existe
+        
+        def salvar():
+            # Espera o PDF aparecer na pasta FQHs, parar de crescer e estar completo
+            with self.config.rastro.trecho("aguardar PDF", "arquivo", {"pdf": NomePDF}):
+                estado["salvo"] = bool(self.config.entrada.aguardarArquivo(
+                    caminho_pdf, estado["anterior"],
+                    timeout=PerfilTempoModel.pausas()["timeout_pdf"], estavel=self.config.pdf_estavel
+                ) and self.pdfValido(caminho_pdf))
+        
+        if ops is None:
+            ops = self.compilador.compilarOSO(row, fQH)
+        self.compilador.executar(ops, {"antes_salvar": antesSalvar, "salvar": salvar})
+        pdf_salvo = estado["salvo"]
+        
+        # --- Verificação do arquivo ---
+        if pdf_salvo:
+            self.log.save(f"[{oso_dig}] PDF salvo com sucesso: {NomePDF}.pdf")
+            self.log.user(f"   {NomePDF}.pdf | Salvo com sucesso")
+        else:
+            self.log.save(f"[{oso_dig}] ERRO: PDF não encontrado após {PerfilTempoModel.pausas()['timeout_pdf']:.0f}s ({NomePDF}.pdf)")
+            self.log.user(f"   ERRO: {NomePDF}.pdf | PDF não encontrado")
+        self.log.user(f"[{oso_dig}] • F10 para continuar | F9 para repetir | F12 para parar ")
+        return pdf_salvo
+
+class PlanoModel(Plano):
+    """
+    Model do plano de ações (adaptado das classes Plano e Executor).
+    Compila as operações de cada faixa e OSO na ordem em que esta interface digita e as executa
+    num laço curto. Cache em AutoSiget3000/Planos/<hash>.gui.json (a sequência da OSO difere do console).
+    """
+    
+    def __init__(self, log_model: LogModel, config: ConfigModel):
+        self.log = log_model
+        self.config = config
+    
+    def _config(self):
+        """Configuração que muda as operações compiladas (outra configuração invalida o cache)"""
+        return {"modo_rajada": self.config.modo_rajada, "colar": self.config.modo_colar,
+                "pausas": {k: v for k, v in PerfilTempoModel.pausas().items() if k != "timeout_pdf"}}
+    
+    def compilarFaixa(self, row, linha_label, viradas=(False, False)):
+        """Operações de uma faixa (adaptado de Plano.compilarFaixa)"""
+        faixaIni_dig, faixaFim_dig = row.faixaIni_dig, row.faixaFim_dig
+        faixaIni_log, faixaFim_log = row.faixaIni_log, row.faixaFim_log
+        Interv, tPerc, tTerm, frota = row.intervalo, row.percurso, row.tempTerm, row.frota
+        viradaIni, viradaFim = viradas
+        p = PerfilTempoModel.pausas()
+        
+        ops = []
+        if viradaIni:
+            ops.append(["l", f"[{linha_label}] virada de dia em FaixaInicio ({faixaIni_log})"])
+        elif viradaFim:
+            ops.append(["l", f"[{linha_label}] virada de dia em FaixaFinal ({faixaFim_log})"])
+        
+        if self.config.modo_rajada:
+            # --- Faixa inteira numa sequência (um write por trecho contínuo) ---
+            intervalo = p["tecla"]
+            teclas = DigitacaoModel.compilarFaixa(faixaIni_dig, faixaFim_dig, Interv, tPerc, tTerm, frota,
+                                                  viradaIni=viradaIni, viradaFim=viradaFim)
+            trecho = []
+            for t in teclas:
+                if isinstance(t, float):
+                    if trecho:
+                        ops.append(["t", trecho, intervalo])
+                        trecho = []
+                    ops.append(["s", t])
+                else:
+                    trecho.append(t)
+            if trecho:
+                ops.append(["t", trecho, intervalo])
+            ops.append(["l", f"[{linha_label}] rajada enviada ({len(teclas)} teclas): "
+                             f"{faixaIni_log} | {faixaFim_log} | {Interv} | {tPerc} | {tTerm} | {frota}"])
+        else:
+            # --- Campo a campo ---
+            confirmarVirada = [["s", p["virada_antes"]], ["p", "tab", 1, 0.0], ["p", "enter", 1, 0.0],
+                               ["s", p["virada_depois"]]]
+            ops += [["t", faixaIni_dig, 0.0], ["l", f"[{linha_label}] escreveu FaixaInicio '{faixaIni_log}'"],
+                    ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo FaixaFinal"]]
+            if viradaIni:
+                ops += confirmarVirada
+            ops += [["t", faixaFim_dig, 0.0], ["l", f"[{linha_label}] escreveu FaixaFinal '{faixaFim_log}'"],
+                    ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo Intervalo"]]
+            if viradaFim:
+                ops += confirmarVirada
+            for valor, nome, proximo in ((Interv, "Intervalo", "Tempo de Percurso"), (tPerc, "Percurso", "Terminal"),
+                                         (tTerm, "TempTerm", "Frota"), (frota, "Frota", "Linha (pronto para verificação)")):
+                ops += [["t", valor, 0.0], ["l", f"[{linha_label}] escreveu {nome} '{valor}'"], ["s", p["campo"]],
+                        ["p", "tab", 1, 0.0], ["l", f"[{linha_label}] tab → campo {proximo}"], ["s", p["campo"]]]
+        
+        ops.append(["l", f"[{linha_label}] faixa preenchida ({faixaIni_log} → {faixaFim_log})"])
+        return self._juntarPausas(ops)
+    
+    def compilarOSO(self, row, fQH):
+        """Operações de impressão de uma OSO; pontos de controle 'antes_salvar' e 'salvar' em volta do Enter"""
+        oso, oso_dig = row["oso"], row["oso_dig"]
+        NomePDF = PrintPDFModel.nomePDF(row, fQH)
+        p = PerfilTempoModel.pausas()
+        
+        ops = []
+        if self.config.modo_colar:
+            ops += [["v", oso, p["campo"]], ["s", p["campo"]]]
+        else:
+            for ch in oso:
+                ops += [["t", ch, 0.0], ["s", p["campo"]]]
+        ops += [
+            ["l", f"[{oso_dig}] escreveu OSO '{oso}'"], ["u", f"Preenchendo OSO:     {oso_dig}"], ["s", p["foco"]],
+            ["p", "left", 6, p["campo"]], ["l", f"[{oso_dig}] 6x seta para esquerda"], ["s", p["campo"]],
+            ["p", "tab", 1, 0.0], ["l", f"[{oso_dig}] Insira o n.º da OSO -> Impressão Gráfica"], ["s", p["foco"]],
+            ["s", p["popup"]], ["p", "enter", 3, p["enter_popup"]],
+            ["l", f"[{oso_dig}] fechou o POP-UP e botou para imprimir"], ["s", p["apos_imprimir"]],
+            ["v" if self.config.modo_colar else "t", NomePDF, 0.0],
+            ["l", f"[{oso_dig}] escreveu nome do PDF '{NomePDF}'"],
+            ["u", f"Preenchendo NomePDF: {NomePDF}"], ["s", p["apos_nome"]],
+            ["c", "antes_salvar"], ["p", "enter", 1, 0.0], ["l", f"[{oso_dig}] confirmou salvar PDF"], ["c", "salvar"],
+            ["h", ["shift", "tab"]], ["l", f"[{oso_dig}] botão Imprimir -> Informe o N° da oso"], ["s", p["foco"]],
+        ]
+        return self._juntarPausas(ops)
+    
+    def compilar(self, linhas, blocos, hash_csv=None):
+        """Plano completo do CSV: faixas de cada bloco e OSOs válidas para FH e QH"""
+        plano_blocos = []
+        for bloco in blocos:
+            trecho = linhas[bloco["inicio"]:bloco["fim"] + 1]
+            plano_blocos.append({
+                "id_bloco": bloco["id_bloco"],
+                "inicio": bloco["inicio"],
+                "faixas": [self.compilarFaixa(row, bloco["id_bloco"], viradas)
+                           for row, viradas in zip(trecho, bloco["viradas"])],
+            })
         
-        # --- Simulação de PyAutoGUI ---
-        
-        # 1. Preenche o campo Insira o n.º da OSO
-        for ch in oso:
-            pyautogui.write(ch)
-            time.sleep(0.1)
-        self.log.save(f"[{oso_dig}] escreveu OSO '{oso}'")
-        self.log.user(f"Preenchendo OSO:     {oso_dig}")
-        time.sleep(0.2)
-        
-        # 2. 6x seta para esquerda
-        pyautogui.press('left', presses=6, interval=0.1)
-        self.log.save(f"[{oso_dig}] 6x seta para esquerda")
-        time.sleep(0.1)
-        
-        # 3. Tab para Impressão Gráfica
-        pyautogui.press('tab')
-        self.log.save(f"[{oso_dig}] Insira o n.º da OSO -> Impressão Gráfica")
-        time.sleep(0.2)
-        
-        # 4. Fecha POP-UP e imprime
-        time.sleep(0.5)
-        pyautogui.press("enter", presses=3, interval=0.3)
-        self.log.save(f"[{oso_dig}] fechou o POP-UP e botou para imprimir")
-        time.sleep(3)
-        
-        # 5. Digita o nome do PDF e confirma salvar
-        pyautogui.write(NomePDF)
-        self.log.save(f"[{oso_dig}] escreveu nome do PDF '{NomePDF}'")
-        self.log.user(f"Preenchendo NomePDF: {NomePDF}")
-        time.sleep(0.3)
-        
-        pyautogui.press("enter")
-        self.log.save(f"[{oso_dig}] confirmou salvar PDF")
-        time.sleep(3.5)
-        
-        # 6. Shift+Tab para voltar
-        pyautogui.hotkey('shift', 'tab')
-        self.log.save(f"[{oso_dig}] botão Imprimir -> Informe o N° da oso")
-        time.sleep(0.2)
-        
-        # --- Simulação de Verificação de Arquivo ---
-        # Como não podemos criar o PDF real, simulamos o sucesso/erro
-        # A verificação de os.path.exists(caminho_pdf) no código original é a chave.
-        # Aqui, vamos apenas logar a intenção.
+        osos = {"FH": {}, "QH": {}}
+        for i, row in enumerate(linhas):
+            dados = PrintPDFModel.dadosOSO(row, i + 1)
+            if dados is not None:
+                for fQH in osos:
+                    osos[fQH][dados["oso"]] = self.compilarOSO(dados, fQH)
         
-        self.log.save(f"[{oso_dig}] Simulação: PDF salvo com sucesso: {NomePDF}.pdf")
-        self.log.user(f"   {NomePDF}.pdf | Simulação de Salvo com sucesso")
-        self.log.user(f"[{oso_dig}] • F10 para continuar | F9 para repetir | F12 para parar ")
+        return {"versao": self.VERSAO, "csv": hash_csv, "config": self._config(), "blocos": plano_blocos, "osos": osos}
+    
+    def doCsv(self, linhas, blocos, hash_csv):
+        """Plano do CSV: do cache quando versão e configuração batem; senão compilado e gravado"""
+        return self.doCache(os.path.join(self.PASTA, f"{hash_csv[:16]}.gui.json"), self._config(),
+                            lambda: self.compilar(linhas, blocos, hash_csv), self.log)
+    
+    # Trechos do rastro por operação de teclado ("s" é marcada pelo driver; "l"/"u" pelo log)
+    TRECHOS = {"t": "write", "p": "press", "h": "hotkey", "v": "colar"}
+    
+    def executar(self, ops, pontos=None):
+        """Executa as operações no driver de entrada atual (adaptado de Executor.executar)"""
+        rastro = self.config.rastro
+        if not rastro.ativo:
+            self._laco(ops, pontos)
+            return
+        for op in ops:
+            nome = self.TRECHOS.get(op[0])
+            if nome is None:
+                self._laco([op], pontos)
+                continue
+            inicio = rastro.agora()
+            try:
+                self._laco([op], pontos)
+            finally:
+                teclas = op[1] if isinstance(op[1], str) else "+".join(op[1])
+                rastro.marcar(nome, "digitacao", inicio, rastro.agora(), {"teclas": teclas})
+    
+    def _laco(self, ops, pontos):
+        entrada = self.config.entrada
+        write, press, hotkey, sleep, colar = entrada.write, entrada.press, entrada.hotkey, entrada.sleep, entrada.colar
+        salvar, usuario = self.log.save, self.log.user
+        for op in ops:
+            codigo = op[0]
+            if codigo == "t":
+                write(op[1], interval=op[2])
+            elif codigo == "s":
+                sleep(op[1])
+            elif codigo == "l":
+                salvar(op[1])
+            elif codigo == "p":
+                press(op[1], presses=op[2], interval=op[3])
+            elif codigo == "h":
+                hotkey(*op[1])
+            elif codigo == "v":
+                if not colar(op[1]):
+                    salvar(f"COLAR indisponível (pyperclip), digitando '{op[1]}'")
+                    write(op[1], interval=op[2])
+            elif codigo == "u":
+                usuario(op[1])
+            elif codigo == "c":
+                if pontos and op[1] in pontos:
+                    pontos[op[1]]()
 
 # -------------------------
 # CONTROLLER
@@ -378,13 +1115,21 @@ class AppController:
         self.config = ConfigModel()
         self.log_model = LogModel(self.config)
         self.csv_model = CSVModel(self.log_model)
+        self.validador = ValidadorCsvModel(self.log_model)
         self.prog_linha_model = ProgramaLinhaModel(self.log_model, self.config)
         self.pdf_model = PrintPDFModel(self.log_model, self.config)
+        self.escutador = EscutadorModel(self.config.cancelamento, self.config.orcamento, self.config.rastro)
         
         self.dados = None
         self.cabecalho = None
         self.blocos = None
         self.osos = None
+        self.diario = None  # DiarioModel do CSV carregado
+        self.snapshot = SnapshotBlocosModel()  # último conteúdo digitado de cada bloco
+        self.catalogo = CatalogoPDFModel()     # PDFs já salvos na pasta FQHs
+        self.plano_model = PlanoModel(self.log_model, self.config)
+        self.plano = None   # operações compiladas do CSV carregado (PlanoModel)
+        self.historico = HistoricoModel(self.log_model, self.config)  # execuções/blocos/faixas/OSOs (SQLite)
     
     def carregar_csv(self, caminho_csv: str):
         """Carrega arquivo CSV"""
@@ -394,18 +1139,26 @@ class AppController:
             return False, f"Arquivo '{caminho_csv}' não encontrado ou erro de leitura."
         
         # Valida campos obrigatórios
-        chavesObrigatorias = {
-            "FaixaInicio", "FaixaFinal", "Interv", "Percurso", 
-            "TempTerm", "Frota", "Linha", "Dia", "Sentido", "Oso", "LinhaOso"
-        }
-        chavesCabecalho = set(h.strip() for h in (self.cabecalho or []))
-        chaveFaltando = chavesObrigatorias - chavesCabecalho
+        chaveFaltando = self.csv_model.colunasFaltando(self.cabecalho)
         
         if chaveFaltando:
             return False, f"Colunas obrigatórias faltando: {', '.join(chaveFaltando)}"
         
+        # Confere o CSV inteiro antes de qualquer tecla
+        erros = self.validador.validar(self.dados)
+        if erros:
+            return False, self.validador.resumo(erros)
+        
+        self.diario = DiarioModel.doCsv(caminho_csv)
+        self.compilar_plano()
         return True, f"CSV carregado com sucesso! {len(self.dados)} registros."
     
+    def compilar_plano(self):
+        """(Re)compila o plano do CSV carregado; necessário após mudar uma configuração do plano"""
+        if self.dados is not None and self.diario is not None:
+            self.plano = self.plano_model.doCsv(self.dados, self.prog_linha_model.genBlocos(self.dados),
+                                                self.diario.hash_csv)
+    
     def gerar_blocos(self):
         """Gera blocos de programação"""
         if self.dados is None:
@@ -437,6 +1190,71 @@ class AppController:
 # VIEW - Interface Gráfica
 # -------------------------
 
+class PainelLog:
+    """
+    Agrupa as mensagens de log de um ListView e atualiza a página no máximo uma vez por quadro.
+    
+    adicionar() pode ser chamado de qualquer thread (worker, callbacks do LogModel): só enfileira.
+    Uma thread própria junta o que chegou no intervalo, mantém as últimas 'limite' linhas num
+    deque e faz um único page.update() por quadro. parar() encerra essa thread quando a view fecha.
+    """
+    def __init__(self, page: ft.Page, log_area: ft.ListView, limite: int = 100, intervalo: float = 1 / 15):
+        self.page = page
+        self.log_area = log_area
+        self.intervalo = intervalo
+        self.fila = queue.SimpleQueue()
+        self.linhas = deque(maxlen=limite)
+        self.pendente = threading.Event()
+        self.trava = threading.Lock()
+        self.parado = False
+        self._thread = None
+    
+    def adicionar(self, mensagem: str):
+        if self.parado:
+            return
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.fila.put(f"[{timestamp}] {mensagem}")
+        self.pendente.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="PainelLog", daemon=True)
+            self._thread.start()
+    
+    def parar(self):
+        """Encerra a thread do painel (a view saiu da tela)"""
+        self.parado = True
+        self.pendente.set()
+    
+    def limpar(self):
+        with self.trava:
+            self._drenar()
+            self.linhas.clear()
+            self.log_area.controls.clear()
+        self.page.update()
+    
+    def _drenar(self):
+        novas = []
+        while True:
+            try:
+                novas.append(self.fila.get_nowait())
+            except queue.Empty:
+                return novas
+    
+    def _executar(self):
+        while not self.parado:
+            self.pendente.wait()
+            if self.parado:
+                return
+            time.sleep(self.intervalo)  # junta as mensagens que chegarem neste quadro
+            self.pendente.clear()
+            with self.trava:
+                novas = self._drenar()
+                if not novas:
+                    continue
+                # o deque descarta sozinho as linhas mais antigas
+                self.linhas.extend(ft.Text(texto, size=12, color=ft.Colors.BLACK) for texto in novas)
+                self.log_area.controls[:] = self.linhas
+            self.page.update()
+
 class BaseView:
     """View base com componentes comuns"""
     def __init__(self, controller: AppController):
@@ -659,11 +1477,31 @@ class ProgramacaoLinhaView(BaseView):
         self.lista_blocos = ft.ListView(spacing=5, expand=True)
         self.texto_status = ft.Text("", size=14)
         self.log_area = ft.ListView(spacing=5, expand=True, auto_scroll=True)
+        self.painel_log = PainelLog(page, self.log_area)
         self.is_processing = False
+        self.avanco_automatico = ft.Switch(
+            label="Confirmar por bloco (avança sozinho e só espera F10 no fim do bloco)",
+            value=self.controller.config.avanco_automatico,
+            on_change=self.alterar_avanco
+        )
+        self.campo_a_campo = ft.Switch(
+            label="Digitar campo a campo (mais lento; use se a estação perder teclas)",
+            value=not self.controller.config.modo_rajada,
+            on_change=self.alterar_campo_a_campo
+        )
         
         # Adiciona callback para logs
         self.controller.log_model.add_callback(self.adicionar_log)
     
+    def alterar_avanco(self, e):
+        """Liga/desliga o avanço automático dentro do bloco"""
+        self.controller.config.avanco_automatico = self.avanco_automatico.value
+    
+    def alterar_campo_a_campo(self, e):
+        """Liga/desliga a digitação campo a campo e recompila o plano com a nova estratégia"""
+        self.controller.config.modo_rajada = not self.campo_a_campo.value
+        self.controller.compilar_plano()
+    
     def build_view(self):
         """Constrói a view completa"""
         # Gera blocos automaticamente
@@ -698,6 +1536,8 @@ class ProgramacaoLinhaView(BaseView):
                                             size=13,
                                             color=ft.Colors.BLACK
                                         ),
+                                        self.avanco_automatico,
+                                        self.campo_a_campo,
                                         ft.Container(height=10),
                                         ft.Container(
                                             content=self.lista_blocos,
@@ -758,12 +1598,67 @@ class ProgramacaoLinhaView(BaseView):
                 ft.Text("Nenhum bloco disponível", color=ft.Colors.GREY_500)
             )
         else:
+            diario = self.controller.diario
+            ponto = diario.retomada(self.controller.blocos) if diario else None
+            if ponto:
+                idx, faixa = ponto
+                self.lista_blocos.controls.append(
+                    ft.ListTile(
+                        leading=ft.Icon(ft.Icons.RESTORE, color=ft.Colors.GREEN_700),
+                        title=ft.Text("Retomar da última posição confirmada", color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD),
+                        subtitle=ft.Text(f"{self.controller.blocos[idx]['id_bloco']} | faixa {faixa + 1}", color=ft.Colors.GREY_600),
+                        trailing=ft.ElevatedButton(
+                            "Retomar",
+                            on_click=lambda e, idx=idx: self.iniciar_bloco(idx, retomar=True),
+                            icon=ft.Icons.PLAY_ARROW,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.GREEN_700,
+                                color=ft.Colors.WHITE,
+                                padding=5,
+                                shape=ft.RoundedRectangleBorder(radius=5)
+                            )
+                        ),
+                        content_padding=ft.padding.symmetric(vertical=0, horizontal=10),
+                        dense=True
+                    )
+                )
+            # Re-execução incremental: blocos novos/alterados desde a última digitação
+            diff = self.controller.snapshot.diff(self.controller.dados, self.controller.blocos)
+            alterados = [i for i, (_, situacao) in enumerate(diff) if situacao != "igual"]
+            if self.controller.snapshot.blocos and len(alterados) < len(diff):
+                self.lista_blocos.controls.append(
+                    ft.ListTile(
+                        leading=ft.Icon(ft.Icons.DIFFERENCE, color=ft.Colors.BLUE_700),
+                        title=ft.Text(f"Blocos alterados: {len(alterados)} de {len(diff)}", color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD),
+                        subtitle=ft.Text(
+                            f"Próximo: {diff[alterados[0]][0]['id_bloco']}" if alterados else "Nada mudou desde a última digitação",
+                            color=ft.Colors.GREY_600
+                        ),
+                        trailing=ft.ElevatedButton(
+                            "Iniciar",
+                            on_click=lambda e, idx=alterados[0]: self.iniciar_bloco(idx),
+                            icon=ft.Icons.PLAY_ARROW,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.BLUE_700,
+                                color=ft.Colors.WHITE,
+                                padding=5,
+                                shape=ft.RoundedRectangleBorder(radius=5)
+                            )
+                        ) if alterados else None,
+                        content_padding=ft.padding.symmetric(vertical=0, horizontal=10),
+                        dense=True
+                    )
+                )
             for i, bloco in enumerate(self.controller.blocos):
+                feitas = diario.faixasConcluidas(bloco['id_bloco']) if diario else 0
+                confirmadas = f" | {min(feitas, bloco['count'])} confirmadas" if feitas else ""
+                if self.controller.snapshot.blocos:
+                    confirmadas += f" | {diff[i][1]}"
                 self.lista_blocos.controls.append(
                     ft.ListTile(
                         leading=ft.Icon(ft.Icons.CALENDAR_MONTH, color=ft.Colors.ORANGE_700),
                         title=ft.Text(bloco['id_bloco'], color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD),
-                        subtitle=ft.Text(f"{bloco['count']} faixas", color=ft.Colors.GREY_600),
+                        subtitle=ft.Text(f"{bloco['count']} faixas{confirmadas}", color=ft.Colors.GREY_600),
                         trailing=ft.ElevatedButton(
                             "Iniciar",
                             on_click=lambda e, idx=i: self.iniciar_bloco(idx),
@@ -782,14 +1677,18 @@ class ProgramacaoLinhaView(BaseView):
         
         self.page.update()
     
-    def iniciar_bloco(self, bloco_index: int):
-        """Inicia o processamento de um bloco"""
+    def iniciar_bloco(self, bloco_index: int, retomar: bool = False):
+        """Inicia o processamento de um bloco (retomar=True começa após as faixas já confirmadas)"""
         if self.is_processing:
             self.mostrar_alerta(self.page, "Aviso", "Um processo já está em execução.")
             return
             
         self.is_processing = True
         self.controller.config.parar_execucao = False
+        self.controller.escutador.reiniciar()
+        self.controller.config.orcamento.iniciar()
+        self.controller.config.rastro.iniciar()
+        self.controller.historico.iniciar("linha", self.controller.diario.hash_csv if self.controller.diario else None)
         self.adicionar_log(f"Iniciando bloco {bloco_index + 1}...")
         self.texto_status.value = "⏳ Processamento iniciado. Aguarde 3 segundos para posicionar o cursor no SIGET..."
         self.texto_status.color = ft.Colors.ORANGE_700
@@ -798,12 +1697,16 @@ class ProgramacaoLinhaView(BaseView):
         # Executa em thread separada para não travar a UI
         threading.Thread(
             target=self.processar_bloco,
-            args=(bloco_index,),
+            args=(bloco_index, retomar),
             daemon=True
         ).start()
     
-    def processar_bloco(self, bloco_index: int):
+    def processar_bloco(self, bloco_index: int, retomar: bool = False):
         """Processa um bloco (executado em thread separada)"""
+        diario = self.controller.diario
+        config = self.controller.config
+        historico = self.controller.historico
+        resultado = "ok"
         try:
             bloco = self.controller.blocos[bloco_index]
             linhas = self.controller.dados
@@ -812,12 +1715,22 @@ class ProgramacaoLinhaView(BaseView):
             count = bloco["count"]
             
             self.adicionar_log(f"Aguardando 3 segundos...")
-            time.sleep(3)
+            self.controller.config.entrada.sleep(3)
+            inicio_bloco = config.rastro.agora()  # trecho do bloco no rastro
+            historico.iniciarBloco(linhas, bloco)
             
             trecho = linhas[inicio:fim+1]
-            faixaFimAnterior = None
+            viradas = bloco["viradas"]  # plano de virada de dia (genBlocos)
+            ops_bloco = PlanoModel.faixasPorInicio(self.controller.plano).get(inicio)  # operações compiladas
+            if ops_bloco is not None and len(ops_bloco) != count:
+                ops_bloco = None
             
-            for offset in range(count):
+            # Na retomada começa após as faixas já confirmadas no diário
+            offset = diario.faixasConcluidas(bloco["id_bloco"]) if (diario and retomar) else 0
+            offset_inicial = offset
+            if offset:
+                self.adicionar_log(f"Retomando o bloco {bloco['id_bloco']} na faixa {offset + 1}/{count}")
+            while offset < count:
                 if self.controller.config.parar_execucao:
                     self.adicionar_log("Execução interrompida pelo usuário.")
                     break
@@ -827,63 +1740,96 @@ class ProgramacaoLinhaView(BaseView):
                 
                 self.adicionar_log(f">>> Processando faixa {offset+1}/{count}")
                 
-                self.controller.prog_linha_model.preenFaixa(
-                    row, 
-                    linha_label, 
-                    faixaFimAnterior=faixaFimAnterior
-                )
+                inicio_faixa = time.time()
+                try:
+                    with config.rastro.trecho(f"faixa {offset + 1}/{count}", "faixa", {"bloco": linha_label}):
+                        self.controller.prog_linha_model.preenFaixa(row, linha_label, viradas[offset],
+                                                                    ops_bloco[offset] if ops_bloco is not None else None)
+                except ExecucaoCancelada:
+                    historico.faixa(row, offset, inicio_faixa, None, "abortada")
+                    raise
+                digitada = time.time()
                 
-                faixaFimAnterior = (row.get("FaixaFim", ""))
+                # No avanço automático só para no fim do bloco (ou a cada N faixas)
+                digitadas = offset + 1 - offset_inicial
+                parada = (offset == count - 1 or not config.avanco_automatico
+                          or (config.parar_a_cada and digitadas % config.parar_a_cada == 0))
                 
-                self.adicionar_log(f"Faixa {offset+1} preenchida. Pressione F10 para continuar | F9 para repetir | F12 para parar")
-                
-                # Aguarda F10, F9 ou F12
-                while True:
-                    if keyboard.is_pressed("F12"):
-                        self.controller.config.parar_execucao = True
-                        self.adicionar_log("Parada solicitada (F12).")
-                        break
-                    if keyboard.is_pressed("F10"):
-                        time.sleep(0.18)
-                        self.adicionar_log(f"F10 pressionado — avançando para faixa {offset + 2}")
-                        break
-                    if keyboard.is_pressed("F9"):
-                        time.sleep(0.18)
-                        self.adicionar_log(f"F9 pressionado — repetindo faixa {offset + 1}")
-                        offset -= 1 # Repete a faixa atual
-                        break
-                    time.sleep(0.06)
-                
-                if self.controller.config.parar_execucao:
+                if parada:
+                    self.adicionar_log(f"Faixa {offset+1} preenchida. Pressione F10 para continuar | F9 para repetir | F12 para parar")
+                    
+                    # Aguarda F10, F9 ou F12 (bloqueante, sem polling)
+                    tecla = self.controller.escutador.aguardar()
+                else:
+                    # pausa de acomodação; um F9/F12 pressionado até aqui ainda vale
+                    try:
+                        config.entrada.sleep(config.pausa_entre_faixas)
+                    except ExecucaoCancelada:
+                        tecla = "F12"
+                    else:
+                        tecla = self.controller.escutador.verificar() or "F10"
+                historico.faixa(row, offset, inicio_faixa, digitada, HistoricoModel.RESULTADO_TECLA.get(tecla, "ok"))
+                if tecla == "F12":
+                    self.controller.config.parar_execucao = True
+                    self.adicionar_log("Parada solicitada (F12).")
+                    self.controller.log_model.flush()
                     break
+                if tecla == "F10":
+                    self.adicionar_log(f"F10 pressionado — avançando para faixa {offset + 2}")
+                    if diario and config.entrada.digita:  # ensaio (gravação/nulo) não conta como digitado
+                        diario.registrarFaixa(bloco["id_bloco"], offset)
+                    offset += 1
+                else:
+                    self.adicionar_log(f"F9 pressionado — repetindo faixa {offset + 1}")
             
             if not self.controller.config.parar_execucao:
+                if config.rastro.ativo:
+                    config.rastro.marcar(f"bloco {bloco['id_bloco']}", "bloco", inicio_bloco, config.rastro.agora(),
+                                         {"faixas": count})
+                historico.concluirBloco("ok")
+                if config.entrada.digita:  # ensaio não conta como digitado
+                    self.controller.snapshot.registrarBloco(linhas, bloco)
                 self.adicionar_log(f"Bloco {bloco['id_bloco']} finalizado!")
                 self.atualizar_status("✅ Processamento concluído!", ft.Colors.GREEN_700)
             else:
+                resultado = "abortada"
                 self.atualizar_status("🛑 Processamento interrompido.", ft.Colors.RED_700)
             
+        except ExecucaoCancelada as ex:
+            # F12 (ou failsafe) durante a digitação/pausa: nenhuma tecla é enviada depois dele
+            resultado = "abortada"
+            self.controller.config.parar_execucao = True
+            self.adicionar_log(f"Parada solicitada ({str(ex) or 'F12'}).")
+            self.controller.log_model.flush()
+            self.atualizar_status("🛑 Processamento interrompido.", ft.Colors.RED_700)
         except Exception as ex:
+            resultado = "erro"
             self.adicionar_log(f"Erro: {str(ex)}")
             self.atualizar_status(f"❌ Erro: {str(ex)}", ft.Colors.RED_700)
         finally:
             self.is_processing = False
-            self.page.update()
+            historico.concluir(resultado)
+            self.relatar_orcamento()
+            self.atualizar_lista_blocos()  # atualiza as faixas confirmadas / ponto de retomada
     
     def adicionar_log(self, mensagem: str):
-        """Adiciona mensagem ao log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_area.controls.append(
-            ft.Text(f"[{timestamp}] {mensagem}", size=12, color=ft.Colors.BLACK)
-        )
-        if len(self.log_area.controls) > 100:
-            self.log_area.controls.pop(0)
-        self.page.update()
+        """Adiciona mensagem ao log (a página é atualizada pelo PainelLog)"""
+        self.painel_log.adicionar(mensagem)
+    
+    def relatar_orcamento(self):
+        """Mostra no log quanto da execução foi pausa intencional e quanto foi trabalho real (e grava o rastro)"""
+        config = self.controller.config
+        texto, registro = config.orcamento.linhas(config.entrada)
+        for linha in texto:
+            self.adicionar_log(linha)
+        self.controller.log_model.save(registro)
+        caminho = config.rastro.concluir()
+        if caminho:
+            self.adicionar_log(f"Rastro da execução: {caminho} (abrir em ui.perfetto.dev)")
     
     def limpar_log(self, e):
         """Limpa o log"""
-        self.log_area.controls.clear()
-        self.page.update()
+        self.painel_log.limpar()
     
     def atualizar_status(self, mensagem: str, cor):
         """Atualiza o status"""
@@ -892,7 +1838,9 @@ class ProgramacaoLinhaView(BaseView):
         self.page.update()
     
     def voltar(self, e):
-        """Volta para a tela anterior"""
+        """Volta para a tela anterior; o log deixa de ser enviado a esta view"""
+        self.controller.log_model.remove_callback(self.adicionar_log)
+        self.painel_log.parar()
         self.page.views.pop()
         self.page.update()
 
@@ -904,6 +1852,7 @@ class ImpressaoPDFView(BaseView):
         self.lista_osos = ft.ListView(spacing=5, expand=True)
         self.texto_status = ft.Text("", size=14)
         self.log_area = ft.ListView(spacing=5, expand=True, auto_scroll=True)
+        self.painel_log = PainelLog(page, self.log_area)
         self.is_processing = False
         self.tipo_impressao = ft.Dropdown(
             label="Tipo de Impressão",
@@ -916,10 +1865,20 @@ class ImpressaoPDFView(BaseView):
             value="FH_ATIVA",
             expand=True
         )
+        self.modo_colar = ft.Switch(
+            label="Colar n.º da OSO e nome do PDF (Ctrl+V) em vez de digitar",
+            value=self.controller.config.modo_colar,
+            on_change=self.alterar_colar
+        )
         
         # Adiciona callback para logs
         self.controller.log_model.add_callback(self.adicionar_log)
     
+    def alterar_colar(self, e):
+        """Liga/desliga a colagem (Ctrl+V) e recompila o plano com a nova estratégia"""
+        self.controller.config.modo_colar = self.modo_colar.value
+        self.controller.compilar_plano()
+    
     def build_view(self):
         """Constrói a view completa"""
         # Gera OSOs automaticamente
@@ -950,6 +1909,7 @@ class ImpressaoPDFView(BaseView):
                                     [
                                         self.criar_titulo("Configurações", 18),
                                         self.tipo_impressao,
+                                        self.modo_colar,
                                     ],
                                     spacing=10
                                 )
@@ -1024,12 +1984,43 @@ class ImpressaoPDFView(BaseView):
                 ft.Text("Nenhuma OSO disponível", color=ft.Colors.GREY_500)
             )
         else:
+            # PDFs já impressos (diário ou pasta FQHs), por tipo
+            impressos = {
+                fQH: [self.ja_impresso(oso, fQH) for oso in self.controller.osos]
+                for fQH in ("FH", "QH")
+            }
+            if any(impressos["FH"]) or any(impressos["QH"]):
+                self.lista_osos.controls.append(
+                    ft.ListTile(
+                        leading=ft.Icon(ft.Icons.RESTORE, color=ft.Colors.GREEN_700),
+                        title=ft.Text("Retomar: próxima OSO sem PDF", color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD),
+                        subtitle=ft.Text(
+                            f"Já impressos: FH {sum(impressos['FH'])} | QH {sum(impressos['QH'])} de {len(self.controller.osos)}",
+                            color=ft.Colors.GREY_600
+                        ),
+                        trailing=ft.ElevatedButton(
+                            "Retomar",
+                            on_click=self.retomar_impressao,
+                            icon=ft.Icons.PRINT,
+                            style=ft.ButtonStyle(
+                                bgcolor=ft.Colors.GREEN_700,
+                                color=ft.Colors.WHITE,
+                                padding=5,
+                                shape=ft.RoundedRectangleBorder(radius=5)
+                            )
+                        ),
+                        content_padding=ft.padding.symmetric(vertical=0, horizontal=10),
+                        dense=True
+                    )
+                )
             for i, oso in enumerate(self.controller.osos):
+                salvos = [fQH for fQH in ("FH", "QH") if impressos[fQH][i]]
+                marca = f" | PDF: {' '.join(salvos)} ✓" if salvos else ""
                 self.lista_osos.controls.append(
                     ft.ListTile(
                         leading=ft.Icon(ft.Icons.PRINT, color=ft.Colors.ORANGE_700),
                         title=ft.Text(f"OSO {oso['oso_dig']} | Linha: {oso['linha']}", color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD),
-                        subtitle=ft.Text(f"Tipo: {oso['tipo']}", color=ft.Colors.GREY_600),
+                        subtitle=ft.Text(f"Tipo: {oso['tipo']}{marca}", color=ft.Colors.GREY_600),
                         trailing=ft.ElevatedButton(
                             "Imprimir",
                             on_click=lambda e, idx=i: self.iniciar_impressao(idx),
@@ -1048,6 +2039,22 @@ class ImpressaoPDFView(BaseView):
         
         self.page.update()
     
+    def ja_impresso(self, oso, fQH):
+        """PDF conferido numa execução anterior (diário) ou já presente e válido na pasta FQHs"""
+        nome_pdf = self.controller.pdf_model.nomePDF(oso, fQH) + ".pdf"
+        diario = self.controller.diario
+        return bool(diario and nome_pdf in diario.pdfs) or self.controller.catalogo.existe(nome_pdf)
+    
+    def retomar_impressao(self, e):
+        """Imprime a próxima OSO sem PDF (do tipo selecionado) no diário ou na pasta FQHs"""
+        tipo_valor = self.tipo_impressao.value or ""
+        fQH = "FH" if "FH" in tipo_valor else "QH"
+        for i, oso in enumerate(self.controller.osos or []):
+            if not self.ja_impresso(oso, fQH):
+                self.iniciar_impressao(i)
+                return
+        self.mostrar_alerta(self.page, "Aviso", f"Todos os PDFs {fQH} já foram impressos.")
+    
     def iniciar_impressao(self, oso_index: int):
         """Inicia a impressão de uma OSO"""
         if self.is_processing:
@@ -1056,6 +2063,10 @@ class ImpressaoPDFView(BaseView):
             
         self.is_processing = True
         self.controller.config.parar_execucao = False
+        self.controller.escutador.reiniciar()
+        self.controller.config.orcamento.iniciar()
+        self.controller.config.rastro.iniciar()
+        self.controller.historico.iniciar("pdf", self.controller.diario.hash_csv if self.controller.diario else None)
         self.adicionar_log(f"Iniciando impressão da OSO {oso_index + 1}...")
         self.texto_status.value = "⏳ Impressão iniciada. Aguarde 5 segundos para posicionar o cursor no SIGET..."
         self.texto_status.color = ft.Colors.ORANGE_700
@@ -1070,67 +2081,95 @@ class ImpressaoPDFView(BaseView):
     
     def processar_impressao(self, oso_index: int):
         """Processa a impressão (executado em thread separada)"""
+        historico = self.controller.historico
+        resultado = "ok"
         try:
             oso = self.controller.osos[oso_index]
             
             self.adicionar_log(f"Aguardando 5 segundos...")
-            time.sleep(5)
+            self.controller.config.entrada.sleep(5)
             
             # Extrai tipo de impressão
             tipo_valor = self.tipo_impressao.value
             fQH = "FH" if "FH" in tipo_valor else "QH"
             OsoAtiva = "ATIVA" in tipo_valor
+            plano = self.controller.plano
+            ops = plano["osos"][fQH].get(oso["oso"]) if plano else None
+            nome_pdf = self.controller.pdf_model.nomePDF(oso, fQH) + ".pdf"
             
-            self.adicionar_log(f"Processando OSO {oso['oso_dig']}...")
-            
-            self.controller.pdf_model.imprimirPDF(oso, fQH, OsoAtiva)
-            
-            self.adicionar_log(f"OSO {oso['oso_dig']} processada. Pressione F10 para continuar | F9 para repetir | F12 para parar")
-            
-            # Aguarda F10, F9 ou F12
             while True:
-                if keyboard.is_pressed("F12"):
+                self.adicionar_log(f"Processando OSO {oso['oso_dig']}...")
+                
+                id_oso = historico.iniciarOso(oso, fQH, nome_pdf)
+                try:
+                    with self.controller.config.rastro.trecho(f"OSO {oso['oso_dig']}", "oso"):
+                        pdf_salvo = self.controller.pdf_model.imprimirPDF(oso, fQH, OsoAtiva, ops)
+                except ExecucaoCancelada:
+                    historico.concluirOso(id_oso, None, None, "abortada")
+                    raise
+                impressa = time.time()
+                if pdf_salvo:
+                    if self.controller.diario:
+                        self.controller.diario.registrarPdf(nome_pdf)
+                    self.controller.catalogo.registrar(nome_pdf)
+                
+                self.adicionar_log(f"OSO {oso['oso_dig']} processada. Pressione F10 para continuar | F9 para repetir | F12 para parar")
+                
+                # Aguarda F10, F9 ou F12 (bloqueante, sem polling)
+                tecla = self.controller.escutador.aguardar()
+                historico.concluirOso(id_oso, impressa, pdf_salvo, HistoricoModel.RESULTADO_TECLA.get(tecla, "ok"))
+                if tecla == "F12":
                     self.controller.config.parar_execucao = True
                     self.adicionar_log("Parada solicitada (F12).")
+                    self.controller.log_model.flush()
                     break
-                if keyboard.is_pressed("F10"):
-                    time.sleep(0.18)
+                if tecla == "F10":
                     self.adicionar_log(f"F10 pressionado — avançando para próxima OSO")
                     break
-                if keyboard.is_pressed("F9"):
-                    time.sleep(0.18)
-                    self.adicionar_log(f"F9 pressionado — repetindo OSO")
-                    self.processar_impressao(oso_index) # Repete a OSO atual
-                    return
-                time.sleep(0.06)
+                self.adicionar_log(f"F9 pressionado — repetindo OSO") # Repete a OSO atual
             
             if not self.controller.config.parar_execucao:
                 self.adicionar_log(f"Impressão finalizada!")
                 self.atualizar_status("✅ Impressão concluída!", ft.Colors.GREEN_700)
             else:
+                resultado = "abortada"
                 self.atualizar_status("🛑 Impressão interrompida.", ft.Colors.RED_700)
             
+        except ExecucaoCancelada as ex:
+            # F12 (ou failsafe) durante a digitação/pausa: nenhuma tecla é enviada depois dele
+            resultado = "abortada"
+            self.controller.config.parar_execucao = True
+            self.adicionar_log(f"Parada solicitada ({str(ex) or 'F12'}).")
+            self.controller.log_model.flush()
+            self.atualizar_status("🛑 Impressão interrompida.", ft.Colors.RED_700)
         except Exception as ex:
+            resultado = "erro"
             self.adicionar_log(f"Erro: {str(ex)}")
             self.atualizar_status(f"❌ Erro: {str(ex)}", ft.Colors.RED_700)
         finally:
             self.is_processing = False
-            self.page.update()
+            historico.concluir(resultado)
+            self.relatar_orcamento()
+            self.atualizar_lista_osos()  # mostra a retomada após o 1º PDF conferido
     
     def adicionar_log(self, mensagem: str):
-        """Adiciona mensagem ao log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_area.controls.append(
-            ft.Text(f"[{timestamp}] {mensagem}", size=12, color=ft.Colors.BLACK)
-        )
-        if len(self.log_area.controls) > 100:
-            self.log_area.controls.pop(0)
-        self.page.update()
+        """Adiciona mensagem ao log (a página é atualizada pelo PainelLog)"""
+        self.painel_log.adicionar(mensagem)
+    
+    def relatar_orcamento(self):
+        """Mostra no log quanto da execução foi pausa intencional e quanto foi trabalho real (e grava o rastro)"""
+        config = self.controller.config
+        texto, registro = config.orcamento.linhas(config.entrada)
+        for linha in texto:
+            self.adicionar_log(linha)
+        self.controller.log_model.save(registro)
+        caminho = config.rastro.concluir()
+        if caminho:
+            self.adicionar_log(f"Rastro da execução: {caminho} (abrir em ui.perfetto.dev)")
     
     def limpar_log(self, e):
         """Limpa o log"""
-        self.log_area.controls.clear()
-        self.page.update()
+        self.painel_log.limpar()
     
     def atualizar_status(self, mensagem: str, cor):
         """Atualiza o status"""
@@ -1139,7 +2178,9 @@ class ImpressaoPDFView(BaseView):
         self.page.update()
     
     def voltar(self, e):
-        """Volta para a tela anterior"""
+        """Volta para a tela anterior; o log deixa de ser enviado a esta view"""
+        self.controller.log_model.remove_callback(self.adicionar_log)
+        self.painel_log.parar()
         self.page.views.pop()
         self.page.update()
 
@@ -1192,6 +2233,24 @@ def main(page: ft.Page):
     page.on_view_pop = view_pop
     
     page.go(page.route)
+    PerfilInicioModel.relatorio("1ª janela desenhada")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AutoSIGET 3000 - interface gráfica")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="mostra o tempo do carregamento do script até a 1ª janela")
+    parser.add_argument("--rastro", nargs="?", const="", metavar="ARQUIVO",
+                        help="grava o rastro de cada execução (Chrome Trace Event, abrir em ui.perfetto.dev); "
+                             f"sem ARQUIVO, um por execução em {RastroModel.PASTA}")
+    parser.add_argument("--timeout-pdf", type=float, metavar="S",
+                        help="espera máxima (s) pelo PDF na pasta FQHs, no lugar da do perfil da estação")
+    args, _ = parser.parse_known_args()
+    PerfilInicioModel.ativo = args.startup_profile
+    if args.timeout_pdf is not None:
+        PerfilTempoModel.pausas()["timeout_pdf"] = max(0.0, args.timeout_pdf)
+    RastroModel.habilitado = args.rastro is not None
+    RastroModel.caminho = args.rastro or None
+    PerfilInicioModel.marcar("script carregado")
+    carregarFlet()
+    PerfilInicioModel.marcar("flet importado")
     ft.app(target=main)
@@ -0,0 +1,244 @@
+
+"""
+Benchmark de throughput do pipeline CSV → blocos → teclas.
+
+Gera CSVs sintéticos no formato do exemplo.csv (1k, 10k e 100k faixas por padrão),
+com muitos blocos Linha/Dia/Sentido, e mede cada etapa:
+    - LCsv.load / CSVModel.load
+    - genBlocos
+    - tratarOSOs
+    - preenBlocos completo (driver de gravação + F10 automático, sem tela)
+
+Para cada etapa informa tempo, faixas/s, pico de memória (tracemalloc) e a quantidade
+de teclas emitidas. Nas etapas de digitação também informa o tempo que a digitação
+levaria no SIGET (pausas simuladas pelo driver de gravação).
+
+Uso:
+    python benchmark_autosiget.py
+    python benchmark_autosiget.py --tamanhos 1000 10000 --json baseline.json
+"""
+
+#Bibliotecas nativas
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Bibliotecas
+# pip install tabulate
+from tabulate import tabulate
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+CABECALHO = ["FaixaInicio", "FaixaFinal", "Interv", "Percurso", "TempTerm",
+             "Frota", "Linha", "Dia", "Sentido", "Oso", "LinhaOso"]
+DIAS = ("Util", "Sab", "Dom")
+INTERVALOS = (5, 7, 10, 12, 15, 20, 30, 45, 60)
+
+# -------------------------
+# Geração do CSV sintético
+# -------------------------
+def gerarCsv(caminho: str, n_faixas: int, semente: int = 3000):
+    """Grava um CSV com 'n_faixas' faixas em blocos de 5 a 25 faixas (Linha_Dia_Sentido)."""
+    rnd = random.Random(semente)
+    linha = 1000
+    dia_idx = 0
+    sentido = 0
+    escritas = 0
+
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        f.write(";".join(CABECALHO) + "\n")
+        while escritas < n_faixas:
+            tamanho = min(rnd.randint(5, 25), n_faixas - escritas)
+            minuto = rnd.randint(240, 330)
+            for _ in range(tamanho):
+                interv = rnd.choice(INTERVALOS)
+                fim = minuto + interv * rnd.randint(0, 8)
+                ini_txt = f"{(minuto // 60) % 24:02d}{minuto % 60:02d}"
+                fim_txt = f"{(fim // 60) % 24:02d}{fim % 60:02d}"
+                oso = 100000 + escritas
+                linha_oso = f"{linha}" if oso % 100 == 0 else f"{linha}{oso % 100:02d}"
+                f.write(";".join([
+                    ini_txt, fim_txt, str(interv), str(rnd.randint(20, 220)), "5",
+                    str(rnd.randint(1, 13)), str(linha), DIAS[dia_idx], str(sentido),
+                    str(oso), linha_oso,
+                ]) + "\n")
+                escritas += 1
+                minuto = fim + rnd.randint(10, 40)
+
+            # próximo bloco: alterna sentido, depois dia, depois linha
+            sentido = 1 - sentido
+            if sentido == 0:
+                dia_idx = (dia_idx + 1) % len(DIAS)
+                if dia_idx == 0:
+                    linha += 1
+
+# -------------------------
+# Carregamento dos módulos
+# -------------------------
+def carregarModulo(nome: str, arquivo: str):
+    spec = importlib.util.spec_from_file_location(nome, os.path.join(PASTA, arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def carregarApp():
+    app = carregarModulo("autosiget_app", "app_4.0.py")
+    app.LIMPAR_CONSOLE = False
+    app.escutador.automatico = "F10"
+    app.definirEntrada(app.DriverGravacao(guardar=False))
+    return app
+
+def carregarGui():
+    """Retorna (controller, módulo) da GUI ou (None, motivo) se ela não puder ser importada."""
+    try:
+        gui = carregarModulo("autosiget_gui", "autosiget_gui_v3.py")
+    except ImportError as e:
+        return None, str(e)
+    controller = gui.AppController()
+    controller.escutador.automatico = "F10"
+    controller.config.entrada = gui.DriverGravacaoModel(guardar=False)
+    return controller, gui
+
+# -------------------------
+# Medição
+# -------------------------
+def medir(funcao, memoria=True):
+    """Executa 'funcao' e retorna (resultado, segundos, pico_bytes). O pico é medido numa 2ª execução."""
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return resultado, segundos, pico
+
+def linhaResultado(etapa, n, segundos, pico, teclas=None, simulado=None):
+    return {
+        "etapa": etapa,
+        "faixas": n,
+        "segundos": round(segundos, 4),
+        "faixas_s": round(n / segundos) if segundos > 0 else None,
+        "pico_mib": round(pico / 2**20, 2) if pico is not None else None,
+        "teclas": teclas,
+        "siget_s": round(simulado, 1) if simulado is not None else None,
+    }
+
+def benchmarkApp(app, caminho_csv, n, memoria):
+    resultados = []
+
+    (linhas, _), seg, pico = medir(lambda: app.LCsv.load(caminho_csv), memoria)
+    resultados.append(linhaResultado("LCsv.load", n, seg, pico))
+
+    blocos, seg, pico = medir(lambda: app.ProgramaLinha.genBlocos(linhas), memoria)
+    resultados.append(linhaResultado("ProgramaLinha.genBlocos", n, seg, pico))
+
+    _, seg, pico = medir(lambda: app.PrintPDF.tratarOSOs(linhas), memoria)
+    resultados.append(linhaResultado("PrintPDF.tratarOSOs", n, seg, pico))
+
+    drivers = []
+    def preencher():
+        drivers.append(app.definirEntrada(app.DriverGravacao(guardar=False)))
+        app.ProgramaLinha.preenBlocos(linhas, blocos, 0)
+    _, seg, pico = medir(preencher, memoria)
+    driver = drivers[0]
+    resultados.append(linhaResultado("ProgramaLinha.preenBlocos", n, seg, pico,
+                                     driver.total_teclas, driver.tempo_simulado))
+
+    app.escritorLog.flush()
+    return resultados
+
+def benchmarkGui(controller, gui, caminho_csv, n, memoria):
+    resultados = []
+
+    (linhas, _), seg, pico = medir(lambda: controller.csv_model.load(caminho_csv), memoria)
+    resultados.append(linhaResultado("CSVModel.load", n, seg, pico))
+
+    blocos, seg, pico = medir(lambda: controller.prog_linha_model.genBlocos(linhas), memoria)
+    resultados.append(linhaResultado("ProgramaLinhaModel.genBlocos", n, seg, pico))
+
+    _, seg, pico = medir(lambda: controller.pdf_model.tratarOSOs(linhas), memoria)
+    resultados.append(linhaResultado("PrintPDFModel.tratarOSOs", n, seg, pico))
+
+    drivers = []
+    def preencher():
+        # Mesmo percurso de ProgramacaoLinhaView.processar_bloco, para todos os blocos
+        driver = controller.config.entrada = gui.DriverGravacaoModel(guardar=False)
+        drivers.append(driver)
+        for bloco in blocos:
+            trecho = linhas[bloco["inicio"]:bloco["fim"] + 1]
+            for row, viradas in zip(trecho, bloco["viradas"]):
+                controller.prog_linha_model.preenFaixa(row, bloco["id_bloco"], viradas)
+                controller.escutador.aguardar()
+    _, seg, pico = medir(preencher, memoria)
+    driver = drivers[0]
+    resultados.append(linhaResultado("ProgramaLinhaModel.preenFaixa (todos os blocos)", n, seg, pico,
+                                     driver.total_teclas, driver.tempo_simulado))
+
+    controller.log_model.flush()
+    return resultados
+
+# -------------------------
+# Programa principal
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline CSV → blocos → teclas do AutoSIGET.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="quantidades de faixas dos CSVs sintéticos (padrão: 1000 10000 100000)")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="não mede o pico de memória (evita a 2ª execução com tracemalloc)")
+    parser.add_argument("--sem-gui", action="store_true", help="não mede os Models da GUI")
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    memoria = not args.sem_memoria
+    resultados = []
+
+    with tempfile.TemporaryDirectory(prefix="autosiget_bench_") as pasta_tmp:
+        # Os módulos criam AutoSiget3000/ no diretório atual
+        os.chdir(pasta_tmp)
+        with open(os.devnull, "w", encoding="utf-8") as nulo:
+            with contextlib.redirect_stdout(nulo):
+                app = carregarApp()
+                controller, gui = (None, "desativado (--sem-gui)") if args.sem_gui else carregarGui()
+
+            if controller is None:
+                print(f"GUI ignorada: {gui}")
+
+            for n in args.tamanhos:
+                caminho_csv = os.path.join(pasta_tmp, f"sintetico_{n}.csv")
+                gerarCsv(caminho_csv, n)
+                print(f"Medindo {n} faixas...", file=sys.stderr)
+
+                with contextlib.redirect_stdout(nulo):
+                    resultados += benchmarkApp(app, caminho_csv, n, memoria)
+                    if controller is not None:
+                        resultados += benchmarkGui(controller, gui, caminho_csv, n, memoria)
+
+        app.escritorLog.fechar()
+        if controller is not None:
+            controller.log_model.escritor.fechar()
+        os.chdir(PASTA)
+
+    headers = ["Etapa", "Faixas", "Tempo (s)", "Faixas/s", "Pico (MiB)", "Teclas", "SIGET (s)"]
+    tabela = [[r["etapa"], r["faixas"], r["segundos"], r["faixas_s"], r["pico_mib"], r["teclas"], r["siget_s"]]
+              for r in resultados]
+    print(tabulate(tabela, headers=headers, tablefmt="rounded_grid", missingval="-"))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.json}")
+
+if __name__ == "__main__":
+    main()
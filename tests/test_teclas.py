@@ -0,0 +1,127 @@
+"""
+Fluxo de teclas que o exemplo.csv envia ao SIGET, gravado pelo DriverGravacao (sem tela e sem pyautogui).
+Cobre a rajada, a digitação campo a campo e a colagem (--colar), incluindo a confirmação da virada
+de dia e a ordem do diálogo de impressão de cada OSO.
+"""
+import contextlib
+import importlib.util
+import io
+import os
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(RAIZ, "exemplo.csv")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """app_4.0.py recém-carregado, sem operador, gravando as teclas; AutoSiget3000/ fica em tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(RAIZ)
+    spec = importlib.util.spec_from_file_location("autosiget_app_teste", os.path.join(RAIZ, "app_4.0.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.LIMPAR_CONSOLE = False
+    modulo.CONTAGEM_BLOCO = 0
+    modulo.escutador.automatico = "F10"
+    modulo.definirEntrada(modulo.DriverGravacao())
+    yield modulo
+    modulo.escritorLog.flush()
+
+
+def faixa(inicio, fim, intervalo, percurso, terminal, frota):
+    """Teclas de uma faixa sem virada de dia: cada campo seguido de tab."""
+    teclas = []
+    for campo in (inicio, fim, intervalo, percurso, terminal, frota):
+        teclas += list(campo) + ["tab"]
+    return teclas
+
+
+def trechos(driver):
+    """Teclas agrupadas por envio contínuo: cada pausa gravada fecha um trecho."""
+    grupos, atual = [], []
+    for _, tipo, valor in driver.eventos:
+        if tipo in ("tecla", "atalho"):
+            atual.append(valor)
+        elif tipo == "pausa" and atual:
+            grupos.append(atual)
+            atual = []
+    if atual:
+        grupos.append(atual)
+    return grupos
+
+
+def digitarBloco(app, id_bloco):
+    linhas, _ = app.LCsv.load(CSV)
+    blocos = [b for b in app.ProgramaLinha.genBlocos(linhas) if b["id_bloco"] == id_bloco]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert app.ProgramaLinha.preenBlocos(linhas, blocos, 0) is not None
+    return app.entrada
+
+
+def imprimirOSOs(app, quantidade):
+    linhas, _ = app.LCsv.load(CSV)
+    with contextlib.redirect_stdout(io.StringIO()):
+        osos = app.PrintPDF.tratarOSOs(linhas)
+        app.PrintPDF.preencher_PDFs(osos[:quantidade], 0, "QH", True)
+    return app.entrada
+
+
+# Bloco 1118_Dom_0 do exemplo.csv; a última faixa (23:50 → 00:00) vira o dia em FaixaFinal
+BLOCO_VIRADA = [
+    faixa("0500", "0520", "20", "27", "5", "2"),
+    faixa("0554", "0627", "33", "33", "5", "3"),
+    faixa("0703", "1415", "36", "35", "5", "3"),
+    faixa("1451", "1939", "36", "33", "5", "2"),
+    faixa("2039", "2309", "50", "31", "5", "2"),
+]
+VIRADA = list("2350") + ["tab"] + list("0000") + ["tab", "tab", "enter"] + ["0", "tab"] + list("23") + \
+    ["tab", "5", "tab", "1", "tab"]
+
+
+@pytest.mark.parametrize("rajada", [True, False], ids=["rajada", "campo_a_campo"])
+def test_bloco_com_virada_de_dia(app, rajada):
+    app.MODO_RAJADA = rajada
+    driver = digitarBloco(app, "1118_Dom_0")
+    assert driver.teclas() == sum(BLOCO_VIRADA, []) + VIRADA
+
+
+def test_rajada_envia_a_faixa_de_uma_vez(app):
+    grupos = trechos(digitarBloco(app, "1118_Dom_0"))
+    assert grupos[:5] == BLOCO_VIRADA
+    # a confirmação da virada fica entre pausas próprias, fora da rajada
+    assert grupos[5:] == [list("2350") + ["tab"] + list("0000") + ["tab"], ["tab", "enter"],
+                          ["0", "tab"] + list("23") + ["tab", "5", "tab", "1", "tab"]]
+
+
+def test_campo_a_campo_pausa_entre_os_campos(app):
+    app.MODO_RAJADA = False
+    grupos = trechos(digitarBloco(app, "1118_Dom_0"))
+    assert grupos[:12] == [list("0500"), ["tab"], list("0520"), ["tab"], list("20"), ["tab"],
+                           list("27"), ["tab"], ["5"], ["tab"], ["2"], ["tab"]]
+    assert grupos[-14:] == [list("2350"), ["tab"], list("0000"), ["tab"], ["tab"], ["enter"], ["0"], ["tab"],
+                            list("23"), ["tab"], ["5"], ["tab"], ["1"], ["tab"]]
+
+
+def dialogoOSO(oso, nome_pdf):
+    """OSO dígito a dígito, popup de impressão, nome do PDF, salvar e volta ao campo da OSO."""
+    return (list(oso) + ["tab", "enter", "enter", "enter"] + list(nome_pdf)
+            + ["enter", "shift+tab"] + ["left"] * 6)
+
+
+def test_dialogo_de_impressao(app):
+    driver = imprimirOSOs(app, 2)
+    assert driver.teclas() == (dialogoOSO("476700", "QH 1001 4767")
+                               + dialogoOSO("476701", "QH 1001-01 4767-01"))
+
+
+def test_colar_troca_a_digitacao_por_ctrl_v(app):
+    app.MODO_COLAR = True
+    driver = imprimirOSOs(app, 2)
+    assert driver.teclas() == ["ctrl+v", "tab", "enter", "enter", "enter", "ctrl+v",
+                               "enter", "shift+tab"] + ["left"] * 6 + \
+                              ["ctrl+v", "tab", "enter", "enter", "enter", "ctrl+v",
+                               "enter", "shift+tab"] + ["left"] * 6
+    coladas = [valor for _, tipo, valor in driver.eventos if tipo == "colar"]
+    assert coladas == ["476700", "QH 1001 4767", "476701", "QH 1001-01 4767-01"]